@@ -0,0 +1,103 @@
+"""Compare the per-material and node-group color backends on a re-sync.
+
+Run headless from packages/blender-plugin:
+
+    blender --background --factory-startup --python bench/bench_backends.py
+
+Each size is synced once, then a payload with a tenth of the colors
+changed is applied. The update is timed through the depsgraph evaluation
+it triggers, and the IDs the depsgraph re-evaluated are counted: every
+updated material is a potential EEVEE shader update.
+"""
+
+import os
+import sys
+import time
+
+import bpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import token_beam  # noqa: E402
+
+SIZES = (100, 1_000, 5_000)
+CHANGED = 0.1
+
+
+def _make_colors(count, shift=0.0):
+    changed_every = int(1 / CHANGED)
+    return [
+        {
+            "name": f"color-{index}",
+            "value": (
+                (index % 256) / 255.0,
+                0.25 + (shift if index % changed_every == 0 else 0.0),
+                0.5,
+                1.0,
+            ),
+            "collection": f"Collection {index % 3}",
+            "mode": "Light" if index % 2 else "Dark",
+        }
+        for index in range(count)
+    ]
+
+
+class _UpdateCounter:
+    def __init__(self):
+        self.materials = 0
+        self.node_groups = 0
+
+    def __call__(self, _scene, depsgraph):
+        for update in depsgraph.updates:
+            if isinstance(update.id, bpy.types.Material):
+                self.materials += 1
+            elif isinstance(update.id, bpy.types.NodeTree):
+                self.node_groups += 1
+
+
+def _reset(scene, backend):
+    scene.token_beam_colors.clear()
+    for material in list(bpy.data.materials):
+        if material.name.startswith("TB_"):
+            bpy.data.materials.remove(material)
+    for tree in list(bpy.data.node_groups):
+        if tree.name.startswith(token_beam.NODE_GROUP_PREFIX):
+            bpy.data.node_groups.remove(tree)
+    token_beam.TokenBeamMaterialIndex.clear()
+    token_beam.TokenBeamNodeGroups.clear()
+    scene.token_beam_state.color_backend = backend
+
+
+def _measure(scene, backend, size):
+    _reset(scene, backend)
+    token_beam._apply_colors(scene, _make_colors(size))
+    bpy.context.view_layer.update()
+
+    counter = _UpdateCounter()
+    bpy.app.handlers.depsgraph_update_post.append(counter)
+    try:
+        start = time.perf_counter()
+        token_beam._apply_colors(scene, _make_colors(size, shift=0.5))
+        bpy.context.view_layer.update()
+        elapsed = (time.perf_counter() - start) * 1000.0
+    finally:
+        bpy.app.handlers.depsgraph_update_post.remove(counter)
+    return elapsed, counter
+
+
+def main():
+    token_beam.register()
+    try:
+        scene = bpy.context.scene
+        print(f"{'tokens':>8} {'backend':<12} {'update ms':>10} {'materials':>10} {'groups':>7}")
+        for size in SIZES:
+            for backend in ("MATERIALS", "NODE_GROUP"):
+                elapsed, counter = _measure(scene, backend, size)
+                print(f"{size:>8} {backend:<12} {elapsed:>10.2f} "
+                      f"{counter.materials:>10} {counter.node_groups:>7}")
+        _reset(scene, "MATERIALS")
+    finally:
+        token_beam.unregister()
+
+
+main()
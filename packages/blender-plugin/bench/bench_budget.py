@@ -0,0 +1,100 @@
+"""Measure how a sync is spread over drain ticks under the apply budget.
+
+Run headless from packages/blender-plugin:
+
+    blender --background --factory-startup --python bench/bench_budget.py
+
+Each size is queued through the mailbox and drained tick by tick, once
+for an initial sync and once for a re-sync with a tenth of the colors
+changed. The number of ticks, the longest tick (what the viewport would
+stall for) and the total time are reported for each color backend, with
+the default budget and with the budget turned off.
+"""
+
+import os
+import sys
+import time
+
+import bpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import token_beam  # noqa: E402
+
+SIZES = (1_000, 10_000)
+BUDGETS = (token_beam.APPLY_BUDGET_MS, 0.0)
+
+
+def _make_colors(count, shift=0.0):
+    return [
+        {
+            "name": f"color-{index}",
+            "value": (
+                (index % 256) / 255.0,
+                0.25 + (shift if index % 10 == 0 else 0.0),
+                0.5,
+                1.0,
+            ),
+            "collection": f"Collection {index % 3}",
+            "mode": "Light" if index % 2 else "Dark",
+        }
+        for index in range(count)
+    ]
+
+
+def _reset(scene, backend):
+    scene.token_beam_colors.clear()
+    for material in list(bpy.data.materials):
+        if material.name.startswith("TB_"):
+            bpy.data.materials.remove(material)
+    for tree in list(bpy.data.node_groups):
+        if tree.name.startswith(token_beam.NODE_GROUP_PREFIX):
+            bpy.data.node_groups.remove(tree)
+    token_beam.TokenBeamMaterialIndex.clear()
+    token_beam.TokenBeamNodeGroups.clear()
+    scene.token_beam_state.color_backend = backend
+
+
+def _drain(colors):
+    token_beam.TokenBeamRuntime.mailbox.put_colors(colors)
+    ticks = []
+    while True:
+        start = time.perf_counter()
+        token_beam._drain_events()
+        ticks.append((time.perf_counter() - start) * 1000.0)
+        if not token_beam.TokenBeamRuntime.applies:
+            return ticks
+
+
+def main():
+    token_beam.register()
+    preferences = token_beam._addon_preferences(bpy.context)
+    if preferences is None:
+        print("token_beam is not enabled as an add-on; measuring the default budget only")
+    try:
+        scene = bpy.context.scene
+        if not len(scene.token_beam_sessions):
+            scene.token_beam_sessions.add()
+        print(f"{'tokens':>8} {'backend':<12} {'budget':>7} {'sync':<8} "
+              f"{'ticks':>6} {'max ms':>8} {'total ms':>9}")
+        for size in SIZES:
+            for backend in ("MATERIALS", "NODE_GROUP"):
+                for budget in BUDGETS:
+                    if preferences is not None:
+                        preferences.apply_budget = budget
+                    elif budget != token_beam.APPLY_BUDGET_MS:
+                        continue
+                    _reset(scene, backend)
+                    for label, colors in (("initial", _make_colors(size)),
+                                          ("update", _make_colors(size, shift=0.5))):
+                        ticks = _drain(colors)
+                        print(f"{size:>8} {backend:<12} {budget:>7.1f} {label:<8} "
+                              f"{len(ticks):>6} {max(ticks):>8.2f} {sum(ticks):>9.2f}")
+        _reset(scene, "MATERIALS")
+        if preferences is not None:
+            preferences.apply_budget = token_beam.APPLY_BUDGET_MS
+    finally:
+        token_beam.unregister()
+
+
+main()
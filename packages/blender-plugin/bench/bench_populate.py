@@ -0,0 +1,80 @@
+"""Compare bulk vs per-item population of ``scene.token_beam_colors``.
+
+Run headless from packages/blender-plugin:
+
+    blender --background --factory-startup --python bench/bench_populate.py
+
+Only the collection writes are timed; materials and the palette are not
+touched.
+"""
+
+import os
+import sys
+import time
+
+import bpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import token_beam  # noqa: E402
+
+SIZES = (100, 1_000, 10_000)
+REPEATS = 5
+
+
+def _make_colors(count):
+    return [
+        {
+            "name": f"color-{index}",
+            "value": ((index % 256) / 255.0, 0.25, 0.5, 1.0),
+            "collection": f"Collection {index % 3}",
+            "mode": "Light" if index % 2 else "Dark",
+        }
+        for index in range(count)
+    ]
+
+
+def _populate_loop(items, colors):
+    """The pre-bulk implementation: add() plus five RNA writes per token."""
+    items.clear()
+    for color in colors:
+        item = items.add()
+        item.token_name = color["name"]
+        item.value = color["value"]
+        item.collection = color["collection"]
+        item.mode = color["mode"]
+        item.material_name = token_beam._token_material_name(
+            color["name"], color["collection"], color["mode"]
+        )
+
+
+def _populate_bulk(items, colors):
+    items.clear()
+    token_beam._write_colors_bulk(items, colors)
+
+
+def _best_of(func, items, colors):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(items, colors)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0
+
+
+def main():
+    token_beam.register()
+    try:
+        items = bpy.context.scene.token_beam_colors
+        print(f"{'tokens':>8} {'loop ms':>10} {'bulk ms':>10} {'speedup':>8}")
+        for size in SIZES:
+            colors = _make_colors(size)
+            loop_ms = _best_of(_populate_loop, items, colors)
+            bulk_ms = _best_of(_populate_bulk, items, colors)
+            print(f"{size:>8} {loop_ms:>10.2f} {bulk_ms:>10.2f} {loop_ms / bulk_ms:>7.1f}x")
+        items.clear()
+    finally:
+        token_beam.unregister()
+
+
+main()
@@ -8,12 +8,35 @@ bl_info = {
     "category": "3D View",
 }
 
+import bisect
+import heapq
 import json
+import os
 import re
+import selectors
+import socket
 import threading
-import queue
+import time
+import uuid
+import zlib
+from collections import deque
+from itertools import compress
 
 import bpy
+from bpy.app.handlers import persistent
+
+from .token_beam_core import (
+    BINARY_ENCODING,
+    TRACE_ENV,
+    SyncTracer,
+    expand_hex,
+    iter_color_groups,
+    message_fingerprint,
+    normalize_hex,
+    normalize_session_token,
+    read_envelope,
+    resolve_server_url,
+)
 
 SYNC_SERVER_URL = "wss://tokenbeam.dev"
 
@@ -23,6 +46,11 @@ try:
 except ImportError:
     websocket = None
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 class TokenBeamColor(bpy.types.PropertyGroup):
     pass
@@ -36,6 +64,44 @@ TokenBeamColor.__annotations__ = {
     "collection": bpy.props.StringProperty(name="Collection"),
     "mode": bpy.props.StringProperty(name="Mode"),
     "material_name": bpy.props.StringProperty(name="Material", default=""),
+    # uid of the TokenBeamSession the token came from; each session's
+    # items form one contiguous block of the collection
+    "session": bpy.props.StringProperty(name="Session", default=""),
+}
+
+
+class TokenBeamRampBinding(bpy.types.PropertyGroup):
+    pass
+
+
+# A Color Ramp node kept in sync with the tokens of one session's
+# collection/mode. Exactly one owner pointer is set; the node is looked up
+# by name in it.
+TokenBeamRampBinding.__annotations__ = {
+    "session": bpy.props.StringProperty(name="Session"),
+    "collection": bpy.props.StringProperty(name="Collection"),
+    "mode": bpy.props.StringProperty(name="Mode"),
+    "material": bpy.props.PointerProperty(type=bpy.types.Material),
+    "world": bpy.props.PointerProperty(type=bpy.types.World),
+    "node_group": bpy.props.PointerProperty(type=bpy.types.NodeTree),
+    "node_name": bpy.props.StringProperty(name="Node"),
+}
+
+
+class TokenBeamColorBinding(bpy.types.PropertyGroup):
+    pass
+
+
+# A material input a token color was applied to with Apply Color; it is
+# rewritten whenever that token changes.
+TokenBeamColorBinding.__annotations__ = {
+    "session": bpy.props.StringProperty(name="Session"),
+    "collection": bpy.props.StringProperty(name="Collection"),
+    "mode": bpy.props.StringProperty(name="Mode"),
+    "token_name": bpy.props.StringProperty(name="Token"),
+    "material": bpy.props.PointerProperty(type=bpy.types.Material),
+    "node_name": bpy.props.StringProperty(name="Node"),
+    "socket_name": bpy.props.StringProperty(name="Socket", default="Base Color"),
 }
 
 
@@ -51,116 +117,932 @@ def _linear_to_srgb(channel):
     return 1.055 * (channel ** (1.0 / 2.4)) - 0.055
 
 
+_SRGB_TO_LINEAR_LUT = tuple(_srgb_to_linear(i / 255.0) for i in range(256))
+
+if np is not None:
+    _LINEAR_LUT_NP = np.array(_SRGB_TO_LINEAR_LUT, dtype=np.float64)
+    # ASCII code -> nibble value; 0xFF marks characters that are not hex digits
+    _NIBBLE_LUT_NP = np.full(256, 0xFF, dtype=np.uint8)
+    for _offset, _char in enumerate("0123456789abcdef"):
+        _NIBBLE_LUT_NP[ord(_char)] = _offset
+        _NIBBLE_LUT_NP[ord(_char.upper())] = _offset
+
+
 def _hex_to_rgba(hex_value):
-    value = hex_value.strip().lstrip("#")
-    if len(value) == 3:
-        value = "".join([ch * 2 for ch in value])
-    if len(value) == 6:
-        value += "FF"
-    if len(value) != 8:
+    value = normalize_hex(hex_value)
+    if value is None:
         raise ValueError("Invalid hex color")
-
-    red_srgb = int(value[0:2], 16) / 255.0
-    green_srgb = int(value[2:4], 16) / 255.0
-    blue_srgb = int(value[4:6], 16) / 255.0
-    alpha = int(value[6:8], 16) / 255.0
+    packed = int(value, 16)
+    lut = _SRGB_TO_LINEAR_LUT
     return (
-        _srgb_to_linear(red_srgb),
-        _srgb_to_linear(green_srgb),
-        _srgb_to_linear(blue_srgb),
-        alpha,
+        lut[packed >> 24],
+        lut[(packed >> 16) & 0xFF],
+        lut[(packed >> 8) & 0xFF],
+        (packed & 0xFF) / 255.0,
     )
 
 
-def _normalize_token(raw):
-    stripped = raw.strip().replace("beam://", "")
-    if not re.match(r"^[0-9a-fA-F]+$", stripped):
-        return None
-    return f"beam://{stripped.upper()}"
+def _hex_batch_to_rgba(hex_values):
+    """Convert hex colors to linear RGBA tuples; returns ``(rgba_values, invalid)``."""
+    decoded = dict.fromkeys(hex_values)
+
+    if np is not None:
+        unique = list(decoded)
+        # Fast path for the common "#rrggbb" form; anything the length check
+        # rejects becomes a placeholder that fails digit validation below
+        expanded = [
+            raw[1:] + "FF" if len(raw) == 7 and raw[0] == "#" else (expand_hex(raw) or "--------")
+            for raw in unique
+        ]
+        if unique:
+            # Non-ASCII characters map to "?" one-to-one, keeping rows aligned
+            ascii_digits = "".join(expanded).encode("ascii", "replace")
+            nibbles = _NIBBLE_LUT_NP[np.frombuffer(ascii_digits, dtype=np.uint8)].reshape(-1, 8)
+            valid = (nibbles != 0xFF).all(axis=1)
+            channels = nibbles[:, 0::2].astype(np.uint16) * 16 + nibbles[:, 1::2]
+            channels[~valid] = 0
+            rgba = np.empty((len(unique), 4), dtype=np.float64)
+            rgba[:, :3] = _LINEAR_LUT_NP[channels[:, :3]]
+            rgba[:, 3] = channels[:, 3] / 255.0
+            valid = valid.tolist()
+            decoded.update(zip(compress(unique, valid), map(tuple, compress(rgba.tolist(), valid))))
+    else:
+        lut = _SRGB_TO_LINEAR_LUT
+        for raw in decoded:
+            digits = normalize_hex(raw)
+            if digits is None:
+                continue
+            packed = int(digits, 16)
+            decoded[raw] = (
+                lut[packed >> 24],
+                lut[(packed >> 16) & 0xFF],
+                lut[(packed >> 8) & 0xFF],
+                (packed & 0xFF) / 255.0,
+            )
+
+    rgba_values = [decoded[raw] for raw in hex_values]
+    invalid = [index for index, rgba in enumerate(rgba_values) if rgba is None]
+    return rgba_values, invalid
+
+
+def _decode_groups(groups):
+    """Decode color groups into color dicts, one list per group."""
+    hex_values = [value for _c, _m, tokens in groups for _name, value in tokens]
+    rgba_values, invalid = _hex_batch_to_rgba(hex_values)
+    if invalid:
+        flat_tokens = [token for _c, _m, tokens in groups for token in tokens]
+        skipped = ", ".join(
+            f"{flat_tokens[index][0]} = {flat_tokens[index][1]}" for index in invalid[:10]
+        )
+        if len(invalid) > 10:
+            skipped += f", ... ({len(invalid) - 10} more)"
+        print(f"[Token Beam] Skipping {len(invalid)} invalid colors: {skipped}")
+
+    decoded = []
+    values = iter(rgba_values)
+    for collection_name, mode_name, tokens in groups:
+        colors = []
+        for (name, _value), rgba in zip(tokens, values):
+            if rgba is None:
+                continue
+            colors.append(
+                {
+                    "name": name,
+                    "value": rgba,
+                    "collection": collection_name,
+                    "mode": mode_name,
+                }
+            )
+        decoded.append(colors)
+    return decoded
+
+
+class TokenBeamSyncCache:
+    """Fingerprints of a session's last sync, used to skip payloads that changed nothing."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.message = None
+        self.groups = {}
+        self.signature = None
+
+    def extract(self, groups):
+        """Return the colors of ``[(collection, mode, tokens)]`` groups, or None when unchanged."""
+        signature = tuple(groups)
+        if signature == self.signature:
+            return None
 
+        cached = self.groups
+        stale = [
+            index for index, group in enumerate(groups)
+            if cached.get(group[:2], (None,))[0] != group[2]
+        ]
+        decoded = dict(zip(stale, _decode_groups([groups[index] for index in stale])))
 
-def _extract_colors(payload):
-    colors = []
-    collections = payload.get("collections", [])
-    for collection in collections:
-        for mode in collection.get("modes", []):
-            for token in mode.get("tokens", []):
-                if token.get("type") != "color":
-                    continue
-                try:
-                    rgba = _hex_to_rgba(str(token.get("value", "")))
-                except (ValueError, IndexError):
-                    print(f"[Token Beam] Skipping invalid color: {token.get('name', '?')} = {token.get('value', '?')}")
-                    continue
+        colors = []
+        next_groups = {}
+        for index, (collection_name, mode_name, tokens) in enumerate(groups):
+            key = (collection_name, mode_name)
+            if index in decoded:
+                group_colors = decoded[index]
+            else:
+                group_colors = cached[key][1]
+            next_groups[key] = (tokens, group_colors)
+            colors.extend(group_colors)
 
-                colors.append(
-                    {
-                        "name": token.get("name", "unnamed"),
-                        "value": rgba,
-                        "collection": collection.get("name", ""),
-                        "mode": mode.get("name", ""),
-                    }
-                )
-    return colors
+        self.groups = next_groups
+        self.signature = signature
+        return colors
 
 
-def _token_material_name(token_name, collection="", mode=""):
+_UNSAFE_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_]+")
+
+
+def _token_material_name(token_name, collection="", mode="", namespace=""):
     parts = []
+    if namespace:
+        parts.append(namespace)
     if collection:
         parts.append(collection)
     parts.append(token_name)
     if mode and mode != "Value":
         parts.append(mode)
     combined = "_".join(parts)
-    safe_name = re.sub(r"[^a-zA-Z0-9_]+", "_", combined).strip("_")
+    safe_name = _UNSAFE_NAME_CHARS.sub("_", combined).strip("_")
     if not safe_name:
         safe_name = "unnamed"
     return f"TB_{safe_name}"
 
 
-def _ensure_token_material(token_name, rgba, collection="", mode=""):
-    material_name = _token_material_name(token_name, collection, mode)
-    material = bpy.data.materials.get(material_name)
-    if material is None:
-        material = bpy.data.materials.new(name=material_name)
+def _scan_principled(material):
+    """Find the Principled BSDF node in a material's node tree."""
+    if not material or not material.use_nodes or not material.node_tree:
+        return None
+    for node in material.node_tree.nodes:
+        if node.type == "BSDF_PRINCIPLED":
+            return node
+    return None
+
 
-    material.use_nodes = True
+class TokenBeamMaterialIndex:
+    """Session cache: token key -> material name -> (material, Principled node)."""
 
-    principled = None
-    if material.node_tree:
-        for node in material.node_tree.nodes:
-            if node.type == "BSDF_PRINCIPLED":
-                principled = node
-                break
+    token_materials = {}
+    entries = {}
+    pointers = {}
+    written = set()
+    material_count = 0
+
+    @classmethod
+    def clear(cls):
+        cls.token_materials.clear()
+        cls.entries.clear()
+        cls.pointers.clear()
+        cls.written.clear()
+        cls.material_count = 0
+
+    @classmethod
+    def material_name(cls, token_name, collection="", mode="", namespace=""):
+        key = (namespace, collection, mode, token_name)
+        name = cls.token_materials.get(key)
+        if name is None:
+            name = _token_material_name(token_name, collection, mode, namespace)
+            cls.token_materials[key] = name
+        return name
+
+    @classmethod
+    def lookup(cls, material_name):
+        entry = cls.entries.get(material_name)
+        if entry is None:
+            return None
+        try:
+            if entry[0].name == material_name:
+                return entry
+        except ReferenceError:
+            pass
+        cls.forget(material_name)
+        return None
+
+    @classmethod
+    def store(cls, material, principled):
+        material_name = material.name
+        entry = (material, principled)
+        cls.entries[material_name] = entry
+        cls.pointers[material.as_pointer()] = material_name
+        if material.node_tree is not None:
+            cls.pointers[material.node_tree.as_pointer()] = material_name
+        cls.material_count = len(bpy.data.materials)
+        return entry
+
+    @classmethod
+    def forget(cls, material_name):
+        if cls.entries.pop(material_name, None) is None:
+            return
+        stale = [ptr for ptr, name in cls.pointers.items() if name == material_name]
+        for ptr in stale:
+            del cls.pointers[ptr]
+
+    @classmethod
+    def mark_written(cls, material):
+        cls.written.add(material.as_pointer())
+        if material.node_tree is not None:
+            cls.written.add(material.node_tree.as_pointer())
 
+    @classmethod
+    def prune(cls, depsgraph):
+        written = cls.written
+        cls.written = set()
+        if not cls.entries:
+            return
+
+        if len(bpy.data.materials) < cls.material_count:
+            # Something was deleted; lookup() drops entries whose ID is gone
+            for material_name in list(cls.entries):
+                cls.lookup(material_name)
+            cls.material_count = len(bpy.data.materials)
+
+        for update in depsgraph.updates:
+            pointer = update.id.original.as_pointer()
+            if pointer in written:
+                continue
+            material_name = cls.pointers.get(pointer)
+            if material_name is not None:
+                cls.forget(material_name)
+
+
+def _principled_node(material):
+    """Principled BSDF of ``material``, served from the index when possible."""
+    entry = TokenBeamMaterialIndex.lookup(material.name)
+    if entry is not None and entry[0] == material:
+        return entry[1]
+    principled = _scan_principled(material)
+    TokenBeamMaterialIndex.store(material, principled)
+    return principled
+
+
+def _ensure_token_material(token_name, rgba, collection="", mode="", namespace="", node_group=None):
+    """Create or update the material of a token; returns its name."""
+    material_name = TokenBeamMaterialIndex.material_name(token_name, collection, mode, namespace)
+    entry = TokenBeamMaterialIndex.lookup(material_name)
+    if entry is None:
+        material = bpy.data.materials.get(material_name)
+        if material is None:
+            material = bpy.data.materials.new(name=material_name)
+        if not material.use_nodes:
+            material.use_nodes = True
+        entry = TokenBeamMaterialIndex.store(material, _scan_principled(material))
+
+    material, principled = entry
+    TokenBeamMaterialIndex.mark_written(material)
     if principled is not None:
         principled.inputs["Base Color"].default_value = rgba
+        if node_group is not None:
+            _link_token_socket(material, principled, node_group, _token_socket_name(token_name))
 
     material.diffuse_color = rgba
     return material_name
 
 
+# Token colors can also live in shared node groups: per session
+# collection/mode, groups of RGB nodes that feed one output socket per
+# token. Token materials (and user materials the colors were applied to)
+# take their Base Color from a group node, so a sync rewrites the groups
+# instead of every material. Each group node carries every socket of its
+# group, so groups are capped at NODE_GROUP_SOCKETS tokens and further
+# tokens go to numbered groups ("... / Light 2").
+NODE_GROUP_PREFIX = "Token Beam Colors"
+NODE_GROUP_SOCKETS = 64
+
+# Longest ID, node and socket name Blender stores (MAX_NAME - 1)
+MAX_NAME_LENGTH = 63
+
+
+def _token_node_group_name(collection="", mode="", namespace=""):
+    """Name of the first node group of a collection/mode."""
+    parts = [NODE_GROUP_PREFIX]
+    if namespace:
+        parts.append(namespace)
+    if collection:
+        parts.append(collection)
+    if mode and mode != "Value":
+        parts.append(mode)
+    return " / ".join(parts)[:MAX_NAME_LENGTH - 4]
+
+
+def _token_socket_name(token_name):
+    name = token_name or "unnamed"
+    if len(name) <= MAX_NAME_LENGTH:
+        return name
+    # Keep tokens that only differ past the cut apart
+    return f"{name[:MAX_NAME_LENGTH - 9]}~{zlib.crc32(name.encode()):08x}"
+
+
+class TokenBeamNodeGroups:
+    """Session cache of the token node groups of each collection/mode."""
+
+    families = {}
+
+    @classmethod
+    def clear(cls):
+        cls.families.clear()
+
+    @classmethod
+    def find(cls, base, socket_name):
+        """Entry of the group holding a token's socket, or None."""
+        family = cls._family(base)
+        entry = family[1].get(socket_name)
+        if entry is None:
+            return None
+        try:
+            if entry[2][socket_name].name and entry[0].name.startswith(base):
+                return entry
+        except (KeyError, ReferenceError):
+            pass
+        del cls.families[base]
+        return cls._family(base)[1].get(socket_name)
+
+    @classmethod
+    def place(cls, base, socket_name):
+        """Entry of the group holding a token's socket, adding the socket when the token is new."""
+        entry = cls.find(base, socket_name)
+        if entry is not None:
+            return entry
+        entries, tokens = cls._family(base)
+        for candidate in entries:
+            if len(candidate[2]) < NODE_GROUP_SOCKETS:
+                entry = candidate
+                break
+        else:
+            number = len(entries) + 1
+            name = base if number == 1 else f"{base} {number}"
+            tree = bpy.data.node_groups.get(name) or bpy.data.node_groups.new(name, "ShaderNodeTree")
+            entry = cls._load(tree)
+            entries.append(entry)
+        _add_token_socket(entry, socket_name)
+        tokens[socket_name] = entry
+        return entry
+
+    @classmethod
+    def _family(cls, base):
+        family = cls.families.get(base)
+        if family is not None:
+            return family
+        numbered = []
+        for tree in bpy.data.node_groups:
+            name = tree.name
+            if name == base:
+                numbered.append((1, tree))
+            elif name.startswith(base + " ") and name[len(base) + 1:].isdigit():
+                numbered.append((int(name[len(base) + 1:]), tree))
+        entries = [cls._load(tree) for _number, tree in sorted(numbered, key=lambda pair: pair[0])]
+        tokens = {socket_name: entry for entry in entries for socket_name in entry[2]}
+        family = cls.families[base] = (entries, tokens)
+        return family
+
+    @staticmethod
+    def _load(tree):
+        output = None
+        sources = {}
+        for node in tree.nodes:
+            if node.type == "GROUP_OUTPUT" and output is None:
+                output = node
+            elif node.type == "RGB":
+                sources[node.label] = node
+        if output is None:
+            output = tree.nodes.new("NodeGroupOutput")
+            output.location = (300.0, 0.0)
+        return [tree, output, sources]
+
+
+def _add_token_socket(entry, socket_name):
+    tree, output, sources = entry
+    tree.interface.new_socket(name=socket_name, in_out="OUTPUT", socket_type="NodeSocketColor")
+    node = tree.nodes.new("ShaderNodeRGB")
+    node.label = socket_name
+    node.location = (0.0, -200.0 * len(sources))
+    tree.links.new(node.outputs[0], output.inputs[socket_name])
+    sources[socket_name] = node
+
+
+def _sync_token_node_groups(upserts, removed=(), namespace=""):
+    """Write new or changed token colors into the session's node groups, dropping removed ones."""
+    for (collection, mode, token_name), color in upserts:
+        socket_name = _token_socket_name(token_name)
+        entry = TokenBeamNodeGroups.place(
+            _token_node_group_name(collection, mode, namespace), socket_name
+        )
+        entry[2][socket_name].outputs[0].default_value = color["value"]
+
+    for collection, mode, token_name in removed:
+        base = _token_node_group_name(collection, mode, namespace)
+        socket_name = _token_socket_name(token_name)
+        entry = TokenBeamNodeGroups.find(base, socket_name)
+        if entry is None:
+            continue
+        tree, _output, sources = entry
+        tree.nodes.remove(sources.pop(socket_name))
+        TokenBeamNodeGroups.families[base][1].pop(socket_name, None)
+        item = tree.interface.items_tree.get(socket_name)
+        if item is not None:
+            tree.interface.remove(item)
+
+
+def _token_node_group(collection, mode, token_name, namespace=""):
+    """Node group holding a token's socket, or None."""
+    entry = TokenBeamNodeGroups.find(
+        _token_node_group_name(collection, mode, namespace), _token_socket_name(token_name)
+    )
+    return entry[0] if entry is not None else None
+
+
+def _is_token_group_node(node):
+    return (
+        node.type == "GROUP"
+        and node.node_tree is not None
+        and node.node_tree.name.startswith(NODE_GROUP_PREFIX)
+    )
+
+
+def _link_token_socket(material, principled, tree, socket_name):
+    """Feed ``principled``'s Base Color from a token socket of ``tree``; False if it has none."""
+    base_color = principled.inputs["Base Color"]
+    for link in base_color.links:
+        if link.from_node.type == "GROUP" and link.from_node.node_tree == tree \
+                and link.from_socket.name == socket_name:
+            return True
+
+    node_tree = material.node_tree
+    group_node = None
+    for node in node_tree.nodes:
+        if node.type == "GROUP" and node.node_tree == tree:
+            group_node = node
+            break
+    if group_node is None:
+        group_node = node_tree.nodes.new("ShaderNodeGroup")
+        group_node.node_tree = tree
+        group_node.location = (principled.location[0] - 250.0, principled.location[1])
+    socket = group_node.outputs.get(socket_name)
+    if socket is None:
+        return False
+    node_tree.links.new(socket, base_color)
+    return True
+
+
+def _unlink_token_socket(material, principled, rgba):
+    """Give ``principled`` its Base Color back as a plain value."""
+    base_color = principled.inputs["Base Color"]
+    node_tree = material.node_tree
+    for link in list(base_color.links):
+        group_node = link.from_node
+        if not _is_token_group_node(group_node):
+            continue
+        node_tree.links.remove(link)
+        if not any(socket.is_linked for socket in group_node.outputs):
+            node_tree.nodes.remove(group_node)
+    base_color.default_value = rgba
+
+
+def _use_node_groups(scene):
+    return scene.token_beam_state.color_backend == "NODE_GROUP"
+
+
+def _rebind_token_materials(scene):
+    """Move every synced token onto the scene's color backend; returns the materials moved."""
+    node_groups = _use_node_groups(scene)
+    namespaces = {
+        session.uid: _session_namespace(session) for session in scene.token_beam_sessions
+    }
+    bound = 0
+    for item in scene.token_beam_colors:
+        namespace = namespaces.get(item.session, "")
+        key = _color_key(item.collection, item.mode, item.token_name)
+        rgba = tuple(item.value)
+        if node_groups:
+            _sync_token_node_groups([(key, {"value": rgba})], (), namespace)
+        material = bpy.data.materials.get(item.material_name)
+        if material is None:
+            continue
+        principled = _principled_node(material)
+        if principled is None:
+            continue
+        TokenBeamMaterialIndex.mark_written(material)
+        if node_groups:
+            tree = _token_node_group(item.collection, item.mode, item.token_name, namespace)
+            _link_token_socket(material, principled, tree, _token_socket_name(item.token_name))
+        else:
+            _unlink_token_socket(material, principled, rgba)
+        bound += 1
+
+    if not node_groups:
+        for tree in list(bpy.data.node_groups):
+            if tree.name.startswith(NODE_GROUP_PREFIX) and tree.users == 0:
+                bpy.data.node_groups.remove(tree)
+        TokenBeamNodeGroups.clear()
+    return bound
+
+
+def _color_key(collection, mode, token_name):
+    """Identity of a synced token across payloads."""
+    return (collection, mode, token_name)
+
+
+def _rgba_equal(a, b, tolerance=1e-6):
+    # Stored values round-trip through float32 RNA properties
+    return all(abs(x - y) <= tolerance for x, y in zip(a, b))
+
+
+def _diff_colors_steps(current, incoming):
+    """Diff incoming colors against ``current``; returns ``(ordered, added, changed, removed)``."""
+    ordered = []
+    seen = set()
+    added = []
+    changed = []
+    for offset in range(0, len(incoming), APPLY_CHUNK):
+        for color in incoming[offset:offset + APPLY_CHUNK]:
+            key = _color_key(color.get("collection", ""), color.get("mode", ""), color["name"])
+            if key in seen:
+                continue
+            seen.add(key)
+            ordered.append((key, color))
+            stored = current.get(key)
+            if stored is None:
+                added.append((key, color))
+            elif not _rgba_equal(stored, color["value"]):
+                changed.append((key, color))
+        yield "diffing", min(offset + APPLY_CHUNK, len(incoming)), len(incoming)
+
+    removed = []
+    stored_keys = list(current)
+    for offset in range(0, len(stored_keys), APPLY_CHUNK):
+        removed += [key for key in stored_keys[offset:offset + APPLY_CHUNK] if key not in seen]
+        yield "diffing", min(offset + APPLY_CHUNK, len(stored_keys)), len(stored_keys)
+    return ordered, added, changed, removed
+
+
+def _session_block(items, session):
+    """Return ``(start, count)`` of the contiguous items synced by ``session``."""
+    total = len(items)
+    if not total:
+        return 0, 0
+    if items[0].session == session and items[total - 1].session == session:
+        return 0, total
+    start = None
+    for index, item in enumerate(items):
+        if item.session == session:
+            if start is None:
+                start = index
+        elif start is not None:
+            return start, index - start
+    if start is None:
+        return total, 0
+    return start, total - start
+
+
+def _write_colors_bulk(items, colors, start=0, count=None, session="", namespace=""):
+    """Overwrite ``items[start:start + count]`` with ``colors`` using bulk RNA access."""
+    _run_steps(_write_colors_bulk_steps(items, colors, start, count, session, namespace))
+
+
+def _write_colors_bulk_steps(items, colors, start=0, count=None, session="", namespace=""):
+    """``_write_colors_bulk`` as a generator yielding ``("items", done, total)``."""
+    total = len(items)
+    if count is None:
+        count = total - start
+    end = start + count
+    target = len(colors)
+    if count > target:
+        # Removing from the end of the block shifts the fewest items
+        for index in range(end - 1, start + target - 1, -1):
+            items.remove(index)
+            if (end - index) % APPLY_CHUNK == 0:
+                yield "items", 0, target
+    else:
+        for offset in range(target - count):
+            items.add()
+            if end < total:
+                items.move(total + offset, end + offset)
+            if (offset + 1) % APPLY_CHUNK == 0:
+                yield "items", 0, target
+
+    total = len(items)
+    flat = [0.0] * (total * 4)
+    if target < total:
+        items.foreach_get("value", flat)
+    for index, color in enumerate(colors, start):
+        flat[index * 4:index * 4 + 4] = color["value"]
+    if total:
+        items.foreach_set("value", flat)
+
+    material_name = TokenBeamMaterialIndex.material_name
+    for offset in range(0, target, APPLY_CHUNK):
+        chunk = colors[offset:offset + APPLY_CHUNK]
+        # Slice again after every yield; the collection may have been
+        # reallocated in between
+        block = items[start + offset:start + offset + len(chunk)]
+        for index, (item, color) in enumerate(zip(block, chunk), offset):
+            collection = color.get("collection", "")
+            mode = color.get("mode", "")
+            item.token_name = color["name"]
+            item.collection = collection
+            item.mode = mode
+            item.material_name = material_name(color["name"], collection, mode, namespace)
+            if session and index >= count:
+                item.session = session
+        yield "items", offset + len(chunk), target
+
+
+def _write_token_colors(scene, changed, added, namespace=""):
+    """Push changed and added tokens to the color backend; returns the names of added materials."""
+    if not _use_node_groups(scene):
+        material_names = [
+            _ensure_token_material(
+                color["name"], color["value"], color.get("collection", ""),
+                color.get("mode", ""), namespace,
+            )
+            for _key, color in changed + added
+        ]
+        # Only added tokens need a name on their new item
+        return material_names[len(changed):]
+
+    return [
+        _ensure_token_material(
+            token_name, color["value"], collection, mode, namespace,
+            _token_node_group(collection, mode, token_name, namespace),
+        )
+        for (collection, mode, token_name), color in added
+    ]
+
+
+def _drop_token_colors_steps(scene, removed, current, namespace=""):
+    """Take removed tokens out of the node groups, giving their materials their last color."""
+    if not removed or not _use_node_groups(scene):
+        return
+    for offset in range(0, len(removed), APPLY_CHUNK):
+        chunk = removed[offset:offset + APPLY_CHUNK]
+        for key in chunk:
+            collection, mode, token_name = key
+            material = bpy.data.materials.get(
+                TokenBeamMaterialIndex.material_name(token_name, collection, mode, namespace)
+            )
+            principled = _principled_node(material) if material is not None else None
+            if principled is not None:
+                TokenBeamMaterialIndex.mark_written(material)
+                _unlink_token_socket(material, principled, tuple(current[key]))
+        _sync_token_node_groups((), chunk, namespace)
+        yield "materials", offset + len(chunk), len(removed)
+
+
+# Tokens handled between two checks of the apply budget
+APPLY_CHUNK = 32
+
+# Milliseconds of a drain tick spent applying a sync before yielding back
+# to Blender, unless the add-on preferences say otherwise
+APPLY_BUDGET_MS = 4.0
+
+
+def _run_steps(steps):
+    """Run a ``*_steps`` generator to the end and return its value."""
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+
+def _apply_colors(scene, colors, sync_id=None, session="", namespace=""):
+    """Apply a session's synced color list to the scene; returns ``(added, changed, removed)``."""
+    return _run_steps(_apply_colors_steps(scene, colors, sync_id, session, namespace))
+
+
+def _apply_colors_steps(scene, colors, sync_id=None, session="", namespace=""):
+    """``_apply_colors`` in resumable ``(stage, done, total)`` steps; closable until it commits."""
+    tracer = TokenBeamRuntime.tracer
+    runtime = TokenBeamRuntime
+    items = scene.token_beam_colors
+
+    # Read the stored block; another session's sync that moved it in the
+    # meantime means reading it again
+    while True:
+        while runtime.committing not in (None, session):
+            yield "waiting", 0, len(colors)
+        revision = runtime.colors_revision
+        start, count = _session_block(items, session)
+        values = [0.0] * (len(items) * 4)
+        if count:
+            items.foreach_get("value", values)
+        order = []
+        current = {}
+        for offset in range(0, count, APPLY_CHUNK):
+            if offset:
+                yield "reading", offset, count
+                if runtime.colors_revision != revision or runtime.committing not in (None, session):
+                    break
+            block_start = start + offset
+            block = items[block_start:min(block_start + APPLY_CHUNK, start + count)]
+            for index, item in enumerate(block, block_start):
+                key = _color_key(item.collection, item.mode, item.token_name)
+                order.append(key)
+                current[key] = values[index * 4:index * 4 + 4]
+        else:
+            break
+
+    ordered, added, changed, removed = yield from _diff_colors_steps(current, colors)
+
+    # Colors of existing tokens wait for the commit; a sync cancelled
+    # before it must leave them matching the items
+    material_names = []
+    with tracer.span(sync_id, "materials"):
+        if _use_node_groups(scene):
+            # Every group node carries all sockets of its group, so groups
+            # are completed before materials link to them
+            for offset in range(0, len(added), APPLY_CHUNK):
+                _sync_token_node_groups(added[offset:offset + APPLY_CHUNK], (), namespace)
+                yield "sockets", min(offset + APPLY_CHUNK, len(added)), len(added)
+        for offset in range(0, len(added), APPLY_CHUNK):
+            material_names += _write_token_colors(
+                scene, [], added[offset:offset + APPLY_CHUNK], namespace
+            )
+            yield "materials", len(material_names), len(added)
+
+    # Items are written by one session at a time
+    while runtime.committing not in (None, session):
+        yield "waiting", 0, len(ordered)
+    runtime.committing = session
+    try:
+        return (yield from _commit_colors(
+            scene, ordered, added, changed, removed, order, current, material_names,
+            sync_id, session, namespace,
+        ))
+    finally:
+        runtime.committing = None
+
+
+def _commit_colors(scene, ordered, added, changed, removed, order, current, material_names,
+                   sync_id=None, session="", namespace=""):
+    """Write a diffed sync into the session's materials, items, palette and ramps."""
+    tracer = TokenBeamRuntime.tracer
+    items = scene.token_beam_colors
+    with tracer.span(sync_id, "materials"):
+        node_groups = _use_node_groups(scene)
+        for offset in range(0, len(changed), APPLY_CHUNK):
+            chunk = changed[offset:offset + APPLY_CHUNK]
+            if node_groups:
+                _sync_token_node_groups(chunk, (), namespace)
+            else:
+                _write_token_colors(scene, chunk, [], namespace)
+            yield "materials", min(offset + APPLY_CHUNK, len(changed)), len(changed)
+        yield from _drop_token_colors_steps(scene, removed, current, namespace)
+        yield from _update_color_bindings_steps(scene, changed + added, session)
+
+    # Other sessions' syncs may have moved the block since it was read
+    start, count = _session_block(items, session)
+    palette_name = _palette_name(namespace)
+    if not count or len(added) * 2 > len(ordered):
+        # Initial load or a full re-sync: rewriting everything in bulk is
+        # cheaper than patching item by item
+        colors = [color for _key, color in ordered]
+        with tracer.span(sync_id, "items"):
+            yield from _write_colors_bulk_steps(items, colors, start, count, session, namespace)
+        if added or changed or removed:
+            TokenBeamRuntime.colors_revision += 1
+        with tracer.span(sync_id, "palette"):
+            yield from _sync_palette_steps(colors, palette_name, not namespace)
+        with tracer.span(sync_id, "ramps"):
+            yield from _update_bound_ramps_steps(scene, ordered, None, session)
+        return len(added), len(changed), len(removed)
+
+    todo = len(changed) + len(removed) + len(added)
+    with tracer.span(sync_id, "items"):
+        if changed:
+            position = dict(zip(order, range(start, start + len(order))))
+            for offset in range(0, len(changed), APPLY_CHUNK):
+                for key, color in changed[offset:offset + APPLY_CHUNK]:
+                    items[position[key]].value = color["value"]
+                yield "items", min(offset + APPLY_CHUNK, len(changed)), todo
+
+        if removed:
+            removed_keys = set(removed)
+            kept = []
+            for offset in range(0, len(order), APPLY_CHUNK):
+                for key in order[offset:offset + APPLY_CHUNK]:
+                    if key in removed_keys:
+                        # Everything before it that stays is already in kept
+                        items.remove(start + len(kept))
+                    else:
+                        kept.append(key)
+                scanned = min(offset + APPLY_CHUNK, len(order))
+                yield "items", len(changed) + scanned - len(kept), todo
+            order = kept
+
+        # New items are appended and, unless this block is the last one,
+        # moved up to the end of the block
+        at_tail = start + len(order) == len(items)
+        for index, ((key, color), material_name) in enumerate(zip(added, material_names), 1):
+            item = items.add()
+            item.token_name = color["name"]
+            item.value = color["value"]
+            item.collection = color.get("collection", "")
+            item.mode = color.get("mode", "")
+            item.material_name = material_name
+            item.session = session
+            if not at_tail:
+                items.move(len(items) - 1, start + len(order))
+            order.append(key)
+            if index % APPLY_CHUNK == 0:
+                yield "items", len(changed) + len(removed) + index, todo
+
+        # Follow the payload order; only moves items that are out of place.
+        # Items are placed front to back and the rest keep their relative
+        # order, so an item sits behind those placed so far, offset by the
+        # unplaced items that were in front of it before the reorder
+        target_order = [key for key, _color in ordered]
+        reordered = order != target_order
+        if reordered:
+            position = dict(zip(order, range(len(order))))
+            placed = []
+            for target, key in enumerate(target_order):
+                source = position[key]
+                at = target + source - bisect.bisect_left(placed, source)
+                if at != target:
+                    items.move(start + at, start + target)
+                bisect.insort(placed, source)
+                if (target + 1) % APPLY_CHUNK == 0:
+                    yield "items", target + 1, len(target_order)
+
+    if added or changed or removed or reordered:
+        TokenBeamRuntime.colors_revision += 1
+        with tracer.span(sync_id, "palette"):
+            yield from _sync_palette_steps(
+                [color for _key, color in ordered], palette_name, not namespace
+            )
+        if reordered:
+            affected = None
+        else:
+            affected = {key[:2] for key, _color in added + changed}
+            affected.update(key[:2] for key in removed)
+        with tracer.span(sync_id, "ramps"):
+            yield from _update_bound_ramps_steps(scene, ordered, affected, session)
+
+    return len(added), len(changed), len(removed)
+
+
 PALETTE_NAME = "Token Beam"
 
 
-def _sync_palette(colors):
+def _palette_name(namespace=""):
+    """Palette of a session; the default session keeps the plain name."""
+    return f"{PALETTE_NAME} - {namespace}" if namespace else PALETTE_NAME
+
+
+def _sync_palette(colors, name=PALETTE_NAME, assign=True):
     """Sync colors to a native Blender palette (linear RGB, RGB only)."""
-    palette = bpy.data.palettes.get(PALETTE_NAME)
-    if palette is None:
-        palette = bpy.data.palettes.new(PALETTE_NAME)
-
-    # Clear existing palette colors
-    while len(palette.colors) > 0:
-        palette.colors.remove(palette.colors[0])
-
-    for color in colors:
-        entry = palette.colors.new()
-        rgba = color["value"]
-        entry.color = (
-            rgba[0],
-            rgba[1],
-            rgba[2],
-        )
+    return _run_steps(_sync_palette_steps(colors, name, assign))
+
+
+def _sync_palette_steps(colors, name=PALETTE_NAME, assign=True):
+    """``_sync_palette`` as a generator yielding ``("palette", done, total)``."""
+    palette = bpy.data.palettes.get(name)
+    created = palette is None
+    if created:
+        palette = bpy.data.palettes.new(name)
+
+    entries = palette.colors
+    target = len(colors)
+    count = len(entries)
+    resized = count != target
+
+    # Palette colors live in a linked list, where indexing walks from the
+    # head; the tail is taken a chunk at a time and new entries are written
+    # as they are added
+    while len(entries) > target:
+        for entry in entries[max(target, len(entries) - APPLY_CHUNK):]:
+            entries.remove(entry)
+        yield "palette", 0, target
+
+    recolored = False
+    kept = min(count, target)
+    for offset in range(0, kept, APPLY_CHUNK):
+        chunk = colors[offset:min(offset + APPLY_CHUNK, kept)]
+        block = entries[offset:offset + len(chunk)]
+        current = [channel for entry in block for channel in entry.color]
+        wanted = [channel for color in chunk for channel in color["value"][:3]]
+        if not _rgba_equal(current, wanted):
+            for entry, color in zip(block, chunk):
+                entry.color = color["value"][:3]
+            recolored = True
+        yield "palette", offset + len(chunk), target
+
+    for index in range(kept, target):
+        entries.new().color = colors[index]["value"][:3]
+        if (index + 1 - kept) % APPLY_CHUNK == 0:
+            yield "palette", index + 1, target
+
+    if not (created or resized or recolored):
+        return False
+    if not (assign or created):
+        return True
 
     # Auto-assign palette to all paint settings so it shows in our panel
     # and in the brush color picker without manual selection
@@ -172,172 +1054,1110 @@ def _sync_palette(colors):
                 ps.palette = palette
     except Exception:
         pass
+    return True
+
+
+# Blender's ColorRamp holds at most 32 elements (MAXCOLORBAND)
+RAMP_MAX_ELEMENTS = 32
+
+
+def _fill_ramp(ramp, rgba_values):
+    """Rewrite a ColorRamp in place with evenly spaced colors."""
+    rgba_values = rgba_values[:RAMP_MAX_ELEMENTS]
+    count = len(rgba_values)
+    if count == 0:
+        return
+    elements = ramp.elements
+    while len(elements) < count:
+        elements.new(1.0)
+    while len(elements) > count:
+        elements.remove(elements[len(elements) - 1])
+
+    if count > 1:
+        positions = [index / (count - 1) for index in range(count)]
+    else:
+        positions = [0.5]
+    flat = [0.0] * (count * 4)
+    for index, rgba in enumerate(rgba_values):
+        flat[index * 4:index * 4 + 4] = rgba
+    elements.foreach_set("position", positions)
+    elements.foreach_set("color", flat)
+
+
+def _ramp_binding_owner(binding):
+    """Return ``(owner_id, node_tree)`` for a binding, or ``(None, None)``."""
+    for owner in (binding.material, binding.world):
+        if owner is not None:
+            return owner, owner.node_tree
+    if binding.node_group is not None:
+        return binding.node_group, binding.node_group
+    return None, None
+
+
+def _binding_matches(binding, group):
+    collection, mode = group
+    return (not binding.collection or binding.collection == collection) and (
+        not binding.mode or binding.mode == mode
+    )
+
+
+def _update_bound_ramps_steps(scene, ordered, affected, session=""):
+    """Rewrite bound Color Ramps of ``session`` in the ``affected`` groups (None for all)."""
+    bindings = scene.token_beam_ramps
+    if not any(binding.session == session for binding in bindings):
+        return
+
+    # The first colors of each (collection, mode) with their payload
+    # positions; a ramp holds no more than that from any one group
+    heads = {}
+    for offset in range(0, len(ordered), APPLY_CHUNK):
+        for position, (key, color) in enumerate(ordered[offset:offset + APPLY_CHUNK], offset):
+            head = heads.setdefault(key[:2], [])
+            if len(head) < RAMP_MAX_ELEMENTS:
+                head.append((position, color["value"]))
+        yield "ramps", min(offset + APPLY_CHUNK, len(ordered)), len(ordered)
+
+    # Bindings may be added between steps; stale ones are removed as they
+    # are found
+    index = 0
+    visited = 0
+    while index < len(bindings):
+        if visited and visited % APPLY_CHUNK == 0:
+            yield "ramps", visited, len(bindings)
+        binding = bindings[index]
+        visited += 1
+        if binding.session != session or (
+            affected is not None
+            and not any(_binding_matches(binding, group) for group in affected)
+        ):
+            index += 1
+            continue
+        owner, node_tree = _ramp_binding_owner(binding)
+        node = node_tree.nodes.get(binding.node_name) if node_tree is not None else None
+        if node is None or node.type != "VALTORGB":
+            bindings.remove(index)
+            continue
+        matched = sorted(
+            entry
+            for group, head in heads.items() if _binding_matches(binding, group)
+            for entry in head
+        )
+        _fill_ramp(node.color_ramp, [rgba for _position, rgba in matched])
+        owner.update_tag()
+        index += 1
+
+
+class TokenBeamBindingIndex:
+    """Session cache over ``scene.token_beam_bindings`` by token and by target socket."""
+
+    scene_pointer = None
+    count = -1
+    by_token = {}
+    by_target = {}
+
+    @classmethod
+    def clear(cls):
+        cls.scene_pointer = None
+        cls.count = -1
+        cls.by_token = {}
+        cls.by_target = {}
+
+    @classmethod
+    def ensure(cls, scene):
+        bindings = scene.token_beam_bindings
+        if cls.scene_pointer == scene.as_pointer() and cls.count == len(bindings):
+            return cls
+        by_token = {}
+        by_target = {}
+        for position, binding in enumerate(bindings):
+            key = (binding.session, binding.collection, binding.mode, binding.token_name)
+            by_token.setdefault(key, []).append(position)
+            if binding.material is not None:
+                target = (binding.material.as_pointer(), binding.node_name, binding.socket_name)
+                by_target[target] = position
+        cls.scene_pointer = scene.as_pointer()
+        cls.count = len(bindings)
+        cls.by_token = by_token
+        cls.by_target = by_target
+        return cls
+
+
+def _bind_color(scene, material, node, socket_name, color_item):
+    """Record that ``node``'s input ``socket_name`` in ``material`` shows ``color_item``'s token."""
+    bindings = scene.token_beam_bindings
+    index = TokenBeamBindingIndex.ensure(scene)
+    position = index.by_target.get((material.as_pointer(), node.name, socket_name))
+    if position is None:
+        binding = bindings.add()
+        binding.material = material
+        binding.node_name = node.name
+        binding.socket_name = socket_name
+    else:
+        binding = bindings[position]
+        # The token key changes; rebuild on the next lookup
+        TokenBeamBindingIndex.clear()
+    binding.session = color_item.session
+    binding.collection = color_item.collection
+    binding.mode = color_item.mode
+    binding.token_name = color_item.token_name
+
+
+def _unbind_material(scene, material, node_name=None):
+    """Forget the bindings of ``material`` (of one node when given); returns how many."""
+    bindings = scene.token_beam_bindings
+    removed = 0
+    for position in range(len(bindings) - 1, -1, -1):
+        binding = bindings[position]
+        if binding.material == material and (node_name is None or binding.node_name == node_name):
+            bindings.remove(position)
+            removed += 1
+    return removed
+
+
+def _update_color_bindings_steps(scene, updates, session=""):
+    """Write updated token colors into the sockets they were applied to; returns the count."""
+    bindings = scene.token_beam_bindings
+    if not updates or not len(bindings):
+        return 0
+    written = 0
+    for offset in range(0, len(updates), APPLY_CHUNK):
+        # Colors may have been bound or unbound since the last chunk
+        by_token = TokenBeamBindingIndex.ensure(scene).by_token
+        stale = []
+        for key, color in updates[offset:offset + APPLY_CHUNK]:
+            for position in by_token.get((session,) + key, ()):
+                binding = bindings[position]
+                material = binding.material
+                node_tree = material.node_tree if material is not None else None
+                node = node_tree.nodes.get(binding.node_name) if node_tree is not None else None
+                socket = node.inputs.get(binding.socket_name) if node is not None else None
+                if socket is None:
+                    stale.append(position)
+                    continue
+                rgba = color["value"]
+                TokenBeamMaterialIndex.mark_written(material)
+                socket.default_value = rgba
+                if binding.socket_name == "Base Color":
+                    material.diffuse_color = rgba
+                written += 1
+
+        for position in sorted(stale, reverse=True):
+            bindings.remove(position)
+        yield "materials", min(offset + APPLY_CHUNK, len(updates)), len(updates)
+    return written
+
+
+class TokenBeamSession(bpy.types.PropertyGroup):
+    pass
+
+
+# One paired session. ``uid`` namespaces its items in token_beam_colors;
+# the default session (the one the Connect button creates) has an empty
+# uid and keeps un-prefixed material and palette names, other sessions
+# prefix theirs with the session name.
+TokenBeamSession.__annotations__ = {
+    "name": bpy.props.StringProperty(name="Name", default="Session"),
+    "uid": bpy.props.StringProperty(name="ID", default=""),
+    "session_token": bpy.props.StringProperty(name="Token", default=""),
+    "status": bpy.props.StringProperty(name="Status", default="Disconnected"),
+    "is_connected": bpy.props.BoolProperty(name="Connected", default=False),
+}
+
+
+def _session_namespace(session):
+    return session.name if session.uid else ""
+
+
+DEFAULT_SESSION_NAME = "Default"
 
 
 class TokenBeamState(bpy.types.PropertyGroup):
     pass
 
 
+def _search_collections(_self, context, _edit_text):
+    return sorted({item.collection for item in context.scene.token_beam_colors if item.collection})
+
+
+def _search_modes(_self, context, _edit_text):
+    return sorted({item.mode for item in context.scene.token_beam_colors if item.mode})
+
+
+def _search_sessions(_self, context, _edit_text):
+    return [session.name for session in context.scene.token_beam_sessions]
+
+
+def _filter_session_uid(scene, state):
+    """uid of the session picked in the Session filter, or None for all."""
+    if not state.filter_session:
+        return None
+    for session in scene.token_beam_sessions:
+        if session.name == state.filter_session:
+            return session.uid
+    return None
+
+
+def _on_color_backend_changed(state, context):
+    # Syncs being applied start over on the new backend
+    _restart_applies()
+    _rebind_token_materials(context.scene)
+
+
 TokenBeamState.__annotations__ = {
+    # Token and status of the Connect button shown before any session exists
     "session_token": bpy.props.StringProperty(name="Token", default=""),
     "status": bpy.props.StringProperty(name="Status", default="Disconnected"),
-    "is_connected": bpy.props.BoolProperty(name="Connected", default=False),
+    "active_color_index": bpy.props.IntProperty(name="Active Color", default=0),
+    "color_backend": bpy.props.EnumProperty(
+        name="Token Colors",
+        description="Where synced token colors are written",
+        items=(
+            ("MATERIALS", "Per Material", "Write the Base Color of every token material"),
+            (
+                "NODE_GROUP",
+                "Node Groups",
+                "Keep colors in one shared node group per collection and mode; token "
+                "materials and applied colors link to it, so a sync rewrites the groups only",
+            ),
+        ),
+        default="MATERIALS",
+        update=_on_color_backend_changed,
+    ),
+    "filter_session": bpy.props.StringProperty(
+        name="Session",
+        description="Only list colors from this session (empty shows all)",
+        default="",
+        search=_search_sessions,
+    ),
+    "filter_collection": bpy.props.StringProperty(
+        name="Collection",
+        description="Only list colors from this collection (empty shows all)",
+        default="",
+        search=_search_collections,
+    ),
+    "filter_mode": bpy.props.StringProperty(
+        name="Mode",
+        description="Only list colors from this mode (empty shows all)",
+        default="",
+        search=_search_modes,
+    ),
+}
+
+
+class TokenBeamPreferences(bpy.types.AddonPreferences):
+    bl_idname = __package__
+
+    def draw(self, _context):
+        self.layout.prop(self, "server_url")
+        self.layout.prop(self, "apply_budget")
+        self.layout.prop(self, "trace_syncs")
+
+
+def _on_trace_syncs_changed(preferences, _context):
+    _refresh_tracing(preferences)
+
+
+TokenBeamPreferences.__annotations__ = {
+    "server_url": bpy.props.StringProperty(
+        name="Sync Server",
+        description=(
+            "WebSocket URL of the sync server (empty uses the default). "
+            "The TOKEN_BEAM_SYNC_URL environment variable takes precedence"
+        ),
+        default="",
+    ),
+    "apply_budget": bpy.props.FloatProperty(
+        name="Apply Budget (ms)",
+        description=(
+            "Time each UI tick may spend applying a received sync; larger syncs are "
+            "applied over several ticks. 0 applies every sync at once"
+        ),
+        default=APPLY_BUDGET_MS,
+        min=0.0,
+        soft_max=50.0,
+    ),
+    "trace_syncs": bpy.props.BoolProperty(
+        name="Trace Syncs",
+        description=(
+            "Time every stage of each sync, show rolling percentiles in the panel "
+            "and allow exporting a Chrome trace. The TOKEN_BEAM_TRACE environment "
+            "variable also turns this on"
+        ),
+        default=False,
+        update=_on_trace_syncs_changed,
+    ),
 }
 
 
+def _addon_preferences(context):
+    try:
+        return context.preferences.addons[__package__].preferences
+    except (AttributeError, KeyError):
+        return None
+
+
+def _sync_server_url(context):
+    """Endpoint to connect to; raises ValueError for a malformed URL."""
+    preferences = _addon_preferences(context)
+    configured = preferences.server_url if preferences is not None else ""
+    return resolve_server_url(SYNC_SERVER_URL, configured)
+
+
+def _refresh_tracing(preferences):
+    enabled = bool(os.environ.get(TRACE_ENV)) or (
+        preferences is not None and preferences.trace_syncs
+    )
+    tracer = TokenBeamRuntime.tracer
+    if enabled and not tracer.enabled:
+        tracer.clear()
+    tracer.enabled = enabled
+
+
+# RFC 7692: a compressed message is a raw DEFLATE stream whose final
+# empty stored block (these four bytes) is left off on the wire
+DEFLATE_TAIL = b"\x00\x00\xff\xff"
+
+
+def _parse_deflate_extension(header_value):
+    """Parse a Sec-WebSocket-Extensions header into permessage-deflate parameters or None."""
+    for extension in header_value.split(","):
+        parts = [part.strip() for part in extension.split(";")]
+        if parts[0].lower() != "permessage-deflate":
+            continue
+        params = {}
+        for part in parts[1:]:
+            name, _, value = part.partition("=")
+            params[name.strip().lower()] = value.strip().strip('"')
+        return params
+    return None
+
+
+if websocket is not None:
+
+    class _InflatingFrameBuffer(websocket.frame_buffer):
+        """websocket-client frame reader with permessage-deflate support."""
+
+        def __init__(self, recv_fn, skip_utf8_validation, params, connection):
+            super().__init__(recv_fn, skip_utf8_validation)
+            self._connection = connection
+            self._window_bits = int(params.get("server_max_window_bits") or 15)
+            self._reset_per_message = "server_no_context_takeover" in params
+            self._inflater = zlib.decompressobj(-self._window_bits)
+            self._message_compressed = False
+            self._frame_compressed = False
+
+        def recv_header(self):
+            super().recv_header()
+            fin, rsv1, rsv2, rsv3, opcode, has_mask, length_bits = self.header
+            if opcode in (websocket.ABNF.OPCODE_TEXT, websocket.ABNF.OPCODE_BINARY):
+                self._message_compressed = bool(rsv1)
+            self._frame_compressed = self._message_compressed and opcode in (
+                websocket.ABNF.OPCODE_TEXT,
+                websocket.ABNF.OPCODE_BINARY,
+                websocket.ABNF.OPCODE_CONT,
+            )
+            if rsv1:
+                self.header = (fin, 0, rsv2, rsv3, opcode, has_mask, length_bits)
+
+        def recv_frame(self):
+            frame = super().recv_frame()
+            if not self._frame_compressed:
+                return frame
+
+            started = time.perf_counter()
+            wire_bytes = len(frame.data)
+            data = self._inflater.decompress(frame.data)
+            if frame.fin:
+                data += self._inflater.decompress(DEFLATE_TAIL)
+                if self._reset_per_message:
+                    self._inflater = zlib.decompressobj(-self._window_bits)
+            frame.data = data
+            connection = self._connection
+            connection.wire_bytes += wire_bytes
+            connection.inflated_bytes += len(data)
+            connection.inflate_ms += (time.perf_counter() - started) * 1000.0
+            return frame
+
+
+class TokenBeamMailbox:
+    """Hand-off from the network thread to Blender's main thread, keyed by session uid."""
+
+    def __init__(self, max_events=64):
+        self._lock = threading.Lock()
+        self._events = deque()
+        self._max_events = max_events
+        self._colors = {}
+        self._status = {}
+        self.superseded = 0
+        self.dropped = 0
+        # Set by every put and cleared by take(); read without the lock by
+        # the drain timer to skip idle ticks
+        self.pending = False
+
+    def put(self, kind, value, session=""):
+        with self._lock:
+            if len(self._events) >= self._max_events:
+                self._events.popleft()
+                self.dropped += 1
+            self._events.append((session, kind, value))
+            self.pending = True
+
+    def put_colors(self, colors, sync_id=None, session=""):
+        with self._lock:
+            if session in self._colors:
+                self.superseded += 1
+            self._colors[session] = (colors, time.perf_counter(), sync_id)
+            self.pending = True
+
+    def put_status(self, text, session=""):
+        with self._lock:
+            self._status[session] = text
+            self.pending = True
+
+    def take(self):
+        """Return ``(events, colors, status)`` and empty the mailbox."""
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+            colors, self._colors = self._colors, {}
+            status, self._status = self._status, {}
+            self.pending = False
+        return events, colors, status
+
+    def discard(self, session):
+        """Drop everything still pending for ``session``."""
+        with self._lock:
+            self._events = deque(event for event in self._events if event[0] != session)
+            self._colors.pop(session, None)
+            self._status.pop(session, None)
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._colors = {}
+            self._status = {}
+            self.superseded = 0
+            self.dropped = 0
+            self.pending = False
+
+
+class TokenBeamNetwork:
+    """One network thread shared by every session's WebSocket."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = deque()
+        self._thread = None
+        self._selector = None
+        self._wake_send = None
+        self._readers = {}
+        self._timers = []
+        self._timer_seq = 0
+
+    def submit(self, function, *args, **kwargs):
+        """Run ``function`` on the network thread, starting it if needed."""
+        with self._lock:
+            self._jobs.append((function, args, kwargs))
+            if self._thread is not None:
+                wake = self._wake_send
+            else:
+                wake = None
+                self._selector = selectors.DefaultSelector()
+                wake_recv, self._wake_send = socket.socketpair()
+                wake_recv.setblocking(False)
+                self._selector.register(wake_recv, selectors.EVENT_READ)
+                self._readers = {}
+                self._timers = []
+                self._thread = threading.Thread(
+                    target=self._run,
+                    args=(self._selector, wake_recv, self._wake_send),
+                    name="Token Beam network",
+                    daemon=True,
+                )
+                self._thread.start()
+        if wake is not None:
+            try:
+                wake.send(b"\0")
+            except OSError:
+                # The wake-up pipe is full, so the thread is awake anyway
+                pass
+
+    # -- websocket-client dispatcher interface (network thread) ------------
+
+    def signal(self, _sig, _handler):
+        # Blender owns the process signal handlers
+        pass
+
+    def abort(self):
+        pass
+
+    def read(self, sock, callback):
+        self._prune()
+        self._readers[sock] = callback
+        self._selector.register(sock, selectors.EVENT_READ)
+
+    def timeout(self, seconds, callback, *args):
+        self._timer_seq += 1
+        heapq.heappush(
+            self._timers, (time.monotonic() + (seconds or 0), self._timer_seq, callback, args)
+        )
+
+    def buffwrite(self, sock, data, send, handle_disconnect):
+        # Called from whichever thread sends; the message is small and
+        # written straight away, but a failure is handled on our thread
+        try:
+            send(sock, data)
+        except Exception as error:
+            self.submit(handle_disconnect, error)
+
+    # -- loop ---------------------------------------------------------------
+
+    def _run(self, selector, wake_recv, wake_send):
+        while True:
+            with self._lock:
+                jobs = list(self._jobs)
+                self._jobs.clear()
+                if not (jobs or self._readers or self._timers):
+                    self._thread = None
+                    break
+            for function, args, kwargs in jobs:
+                self._call(function, *args, **kwargs)
+            self._prune()
+
+            now = time.monotonic()
+            while self._timers and self._timers[0][0] <= now:
+                _deadline, _seq, callback, args = heapq.heappop(self._timers)
+                self._call(callback, *args)
+            if self._timers:
+                timeout = max(0.0, self._timers[0][0] - time.monotonic())
+            elif self._readers:
+                timeout = None
+            else:
+                # Only the exit check is left
+                timeout = 0.0
+
+            for key, _events in selector.select(timeout):
+                if key.fileobj is wake_recv:
+                    try:
+                        wake_recv.recv(4096)
+                    except OSError:
+                        pass
+                    continue
+                self._dispatch(key.fileobj)
+
+        selector.close()
+        wake_recv.close()
+        wake_send.close()
+
+    def _dispatch(self, sock):
+        callback = self._readers.get(sock)
+        if callback is None:
+            return
+        # TLS may hold further records that select() cannot see
+        pending = getattr(sock, "pending", None)
+        while True:
+            keep = self._call(callback)
+            if not keep or sock.fileno() == -1:
+                self._unregister(sock)
+                return
+            if pending is None or not pending():
+                return
+
+    def _prune(self):
+        """Forget sockets that were closed without being unregistered."""
+        for sock in [sock for sock in self._readers if sock.fileno() == -1]:
+            self._unregister(sock)
+
+    def _unregister(self, sock):
+        if self._readers.pop(sock, None) is None:
+            return
+        try:
+            self._selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+
+    @staticmethod
+    def _call(function, *args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        except Exception as error:
+            print(f"[Token Beam] Network thread error: {error}")
+            return False
+
+
+class TokenBeamConnection:
+    """Network side of one session: its WebSocketApp, sync cache and stats."""
+
+    def __init__(self, session, token):
+        self.session = session
+        self.token = token
+        self.ws_app = None
+        # Cleared once the socket is closed, from either side
+        self.alive = True
+        self.sync_cache = TokenBeamSyncCache()
+        # permessage-deflate totals
+        self.wire_bytes = 0
+        self.inflated_bytes = 0
+        self.inflate_ms = 0.0
+        self.connect_started = time.perf_counter()
+        self.first_colors_ms = None
+        self.last_wait_ms = None
+
+    def start(self, endpoint):
+        self.ws_app = websocket.WebSocketApp(
+            endpoint,
+            # Outgoing messages (pair/pong) are tiny and always sent
+            # uncompressed, which RFC 7692 allows
+            header=["Sec-WebSocket-Extensions: permessage-deflate; client_max_window_bits"],
+            on_open=self._on_open,
+            on_message=self._on_message,
+            on_error=self._on_error,
+            on_close=self._on_close,
+        )
+        TokenBeamRuntime.network.submit(
+            self.ws_app.run_forever, dispatcher=TokenBeamRuntime.network
+        )
+
+    def close(self):
+        self.alive = False
+        if self.ws_app is not None:
+            TokenBeamRuntime.network.submit(self.ws_app.close)
+
+    def send(self, message):
+        self.ws_app.send(message)
+
+    def _post_status(self, text):
+        TokenBeamRuntime.mailbox.put_status(text, session=self.session)
+
+    def _on_open(self, ws):
+        self._post_status("Connected - pairing...")
+        params = _parse_deflate_extension(
+            ws.sock.getheaders().get("sec-websocket-extensions", "")
+        )
+        if params is not None:
+            reader = ws.sock.frame_buffer
+            ws.sock.frame_buffer = _InflatingFrameBuffer(
+                reader.recv, reader.skip_utf8_validation, params, self
+            )
+        try:
+            ws.send(
+                json.dumps(
+                    {
+                        "type": "pair",
+                        "clientType": "blender",
+                        "sessionToken": self.token,
+                        "encodings": [BINARY_ENCODING],
+                    }
+                )
+            )
+        except Exception as error:
+            self._post_status(f"Error: {error}")
+
+    def _on_message(self, ws, message):
+        received = time.perf_counter()
+        tracer = TokenBeamRuntime.tracer
+        sync_cache = self.sync_cache
+        fingerprint = message_fingerprint(message)
+        if fingerprint == sync_cache.message:
+            # Byte-identical resend of the last sync
+            return
+
+        try:
+            data, payload_at = read_envelope(message)
+        except ValueError:
+            return
+
+        msg_type = data.get("type")
+        sync_id = None
+        if msg_type == "sync" and tracer.enabled:
+            sync_id = tracer.next_sync_id()
+            sent_at = data.get("sentAt")
+            if isinstance(sent_at, (int, float)):
+                tracer.add_since_epoch(sync_id, "network", sent_at, received)
+            tracer.add(sync_id, "parse", received, time.perf_counter())
+
+        if msg_type == "pair":
+            TokenBeamRuntime.mailbox.put("connected", True, session=self.session)
+            origin = data.get("origin", "unknown")
+            self._post_status(f"Paired with {origin} - waiting for data...")
+            return
+
+        if msg_type == "sync":
+            if payload_at is None:
+                self._post_status("No payload in sync message")
+                return
+            with tracer.span(sync_id, "extract"):
+                try:
+                    groups = list(iter_color_groups(message, payload_at))
+                except ValueError:
+                    self._post_status("Malformed sync message")
+                    return
+                sync_cache.message = fingerprint
+                colors = sync_cache.extract(groups)
+            if colors is None:
+                return
+            TokenBeamRuntime.mailbox.put_colors(colors, sync_id, session=self.session)
+            if colors:
+                self._post_status(f"{len(colors)} colors synced")
+            else:
+                self._post_status("No colors found in payload")
+            return
+
+        if msg_type == "error":
+            error_text = data.get("error", "Unknown error")
+            if isinstance(error_text, str) and error_text.startswith("[warn]"):
+                self._post_status(error_text[7:].strip())
+            elif error_text == "Invalid session token":
+                self._post_status("Session not found")
+            else:
+                self._post_status(f"Error: {error_text}")
+            return
+
+        if msg_type == "ping":
+            if tracer.ping_received():
+                # The server's reply to our own round-trip ping
+                return
+            try:
+                ws.send(json.dumps({"type": "pong"}))
+            except Exception:
+                pass
+
+    def _on_error(self, ws, error):
+        self.alive = False
+        TokenBeamRuntime.mailbox.put("connected", False, session=self.session)
+        self._post_status(f"Error: {error}")
+
+    def _on_close(self, ws, close_status_code, close_message):
+        self.alive = False
+        TokenBeamRuntime.mailbox.put("connected", False, session=self.session)
+        self._post_status("Disconnected")
+
+
+# Drain timer backs off from roughly one UI tick to this ceiling while idle.
+# Nothing can wake a Blender timer from the network thread, so the ceiling
+# is the most a sync waits after an idle stretch; idle ticks return early
+DRAIN_INTERVAL_MIN = 1.0 / 60.0
+DRAIN_INTERVAL_MAX = 0.05
+
+# Seconds between round-trip pings while tracing
+PING_INTERVAL = 2.0
+
+
 class TokenBeamRuntime:
-    ws_app = None
-    ws_thread = None
-    event_queue = queue.Queue()
-    timer_running = False
+    network = TokenBeamNetwork()
+    # TokenBeamConnection per session uid, until the session disconnects
+    connections = {}
+    mailbox = TokenBeamMailbox()
+    drain_interval = DRAIN_INTERVAL_MIN
+    # Bumped whenever token_beam_colors changes; keys the UI list cache
+    colors_revision = 0
+    color_list_cache = {}
+    tracer = SyncTracer()
+    last_ping = 0.0
+    # Pings go to one session at a time, in turn
+    ping_turn = 0
+    # TokenBeamApply per session uid while its latest sync is being applied
+    applies = {}
+    # uid of the session whose sync is being committed; syncs are committed
+    # one session at a time
+    committing = None
+    progress_shown = False
+
+
+class TokenBeamApply:
+    """A session's sync being applied to the scene over several drain ticks."""
+
+    def __init__(self, session, namespace, colors, sync_id):
+        self.session = session
+        self.namespace = namespace
+        self.colors = colors
+        self.sync_id = sync_id
+        self.started = time.perf_counter()
+        self.steps = None
+        self.stage = "queued"
+        self.done = 0
+        self.total = len(colors)
+        self.then = None
+
+    def run(self, scene, deadline):
+        """Apply until ``deadline`` (perf_counter); True once finished."""
+        if self.steps is None:
+            self.steps = _apply_colors_steps(
+                scene, self.colors, self.sync_id, self.session, self.namespace
+            )
+        try:
+            while True:
+                self.stage, self.done, self.total = next(self.steps)
+                if self.stage == "waiting" or time.perf_counter() >= deadline:
+                    return False
+        except StopIteration:
+            self.steps = None
+            TokenBeamRuntime.tracer.add(self.sync_id, "apply", self.started, time.perf_counter())
+            return True
+
+    def cancel(self, force=False):
+        """Stop applying so the next ``run`` starts over; False once the sync is committing."""
+        if self.steps is not None:
+            if TokenBeamRuntime.committing == self.session and not force:
+                return False
+            self.steps.close()
+            self.steps = None
+        self.stage = "queued"
+        self.done = 0
+        return True
+
+
+def _cancel_applies():
+    """Drop every sync being applied."""
+    for job in TokenBeamRuntime.applies.values():
+        job.cancel(force=True)
+    TokenBeamRuntime.applies.clear()
+
+
+def _restart_applies(force=False):
+    """Start pending syncs over on the next drain tick; committing ones only with ``force``."""
+    for job in TokenBeamRuntime.applies.values():
+        job.cancel(force)
+
+
+def _apply_budget(context):
+    """Seconds a drain tick may spend applying syncs; None for no limit."""
+    preferences = _addon_preferences(context)
+    budget = preferences.apply_budget if preferences is not None else APPLY_BUDGET_MS
+    return budget / 1000.0 if budget > 0.0 else None
+
+
+def _show_apply_progress(context):
+    """Show the progress of unfinished applies in the status bar."""
+    workspace = getattr(context, "workspace", None)
+    if workspace is None:
+        return
+    jobs = TokenBeamRuntime.applies.values()
+    if jobs:
+        progress = ", ".join(f"{job.stage} {job.done}/{job.total}" for job in jobs)
+        workspace.status_text_set(f"Token Beam: applying colors ({progress})")
+        TokenBeamRuntime.progress_shown = True
+    elif TokenBeamRuntime.progress_shown:
+        workspace.status_text_set(None)
+        TokenBeamRuntime.progress_shown = False
+
+
+def _live_connection(session):
+    """The session's connection while its socket is open or opening."""
+    connection = TokenBeamRuntime.connections.get(session.uid)
+    if connection is not None and connection.alive:
+        return connection
+    return None
+
+
+def _close_connection(session_uid):
+    connection = TokenBeamRuntime.connections.pop(session_uid, None)
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+    TokenBeamRuntime.mailbox.discard(session_uid)
+
 
+def _close_all_connections():
+    for session_uid in list(TokenBeamRuntime.connections):
+        _close_connection(session_uid)
+    TokenBeamRuntime.mailbox.reset()
 
-def _runtime_is_connected():
-    ws_app = TokenBeamRuntime.ws_app
-    ws_thread = TokenBeamRuntime.ws_thread
-    return ws_app is not None and ws_thread is not None and ws_thread.is_alive()
+
+def _default_session(scene):
+    for session in scene.token_beam_sessions:
+        if not session.uid:
+            return session
+    return None
 
 
 class TOKENBEAM_OT_connect(bpy.types.Operator):
     bl_idname = "token_beam.connect"
     bl_label = "Connect"
-    bl_description = "Connect to Token Beam sync server"
+    bl_description = "Connect a session to the Token Beam sync server"
+
+    # -1 connects the default session, creating it from the panel's token
+    session_index: bpy.props.IntProperty(default=-1)
 
     def execute(self, context):
-        state = context.scene.token_beam_state
+        scene = context.scene
+        state = scene.token_beam_state
+        sessions = scene.token_beam_sessions
+
+        if self.session_index >= len(sessions):
+            return {"CANCELLED"}
+        if self.session_index >= 0:
+            session = sessions[self.session_index]
+            token = session.session_token
+        else:
+            session = _default_session(scene)
+            token = session.session_token if session is not None else state.session_token
+        # Errors land on the panel's status line until the session exists
+        status_owner = session if session is not None else state
 
         if websocket is None:
-            state.status = "Error: websocket-client not found"
+            status_owner.status = "Error: websocket-client not found"
             self.report({"ERROR"}, "websocket-client not found. Reinstall the extension from the .zip file.")
             return {"CANCELLED"}
 
-        normalized = _normalize_token(state.session_token)
+        normalized = normalize_session_token(token)
         if not normalized:
-            state.status = "Invalid token format"
+            status_owner.status = "Invalid token format"
             return {"CANCELLED"}
 
-        if TokenBeamRuntime.ws_app is not None:
-            state.status = "Already connected"
+        if session is None:
+            session = sessions.add()
+            session.name = DEFAULT_SESSION_NAME
+            session.session_token = token
+
+        if _live_connection(session) is not None:
+            session.status = "Already connected"
             return {"FINISHED"}
 
-        endpoint = SYNC_SERVER_URL
+        if session.uid and (
+            not session.name.strip()
+            or sum(1 for other in sessions if other.uid and other.name == session.name) > 1
+        ):
+            # The name prefixes this session's materials and palette
+            session.status = "Needs a unique name"
+            return {"CANCELLED"}
 
-        def on_open(ws):
-            TokenBeamRuntime.event_queue.put(("status", "Connected - pairing..."))
-            try:
-                ws.send(
-                    json.dumps(
-                        {
-                            "type": "pair",
-                            "clientType": "blender",
-                            "sessionToken": normalized,
-                        }
-                    )
-                )
-            except Exception as error:
-                TokenBeamRuntime.event_queue.put(("status", f"Error: {error}"))
+        try:
+            endpoint = _sync_server_url(context)
+        except ValueError as error:
+            session.status = "Invalid server URL"
+            self.report({"ERROR"}, str(error))
+            return {"CANCELLED"}
 
-        def on_message(ws, message):
-            try:
-                data = json.loads(message)
-            except Exception:
-                return
+        _close_connection(session.uid)
+        _refresh_tracing(_addon_preferences(context))
+        TokenBeamRuntime.last_ping = time.perf_counter()
 
-            msg_type = data.get("type")
+        connection = TokenBeamConnection(session.uid, normalized)
+        TokenBeamRuntime.connections[session.uid] = connection
+        connection.start(endpoint)
 
-            if msg_type == "pair":
-                TokenBeamRuntime.event_queue.put(("connected", True))
-                origin = data.get("origin", "unknown")
-                TokenBeamRuntime.event_queue.put(
-                    ("status", f"Paired with {origin} - waiting for data...")
-                )
-                return
+        _ensure_timer(context)
+        session.is_connected = False
+        session.status = "Connecting..."
+        return {"FINISHED"}
 
-            if msg_type == "sync":
-                payload = data.get("payload")
-                if not isinstance(payload, dict):
-                    TokenBeamRuntime.event_queue.put(("status", "No payload in sync message"))
-                    return
-                colors = _extract_colors(payload)
-                TokenBeamRuntime.event_queue.put(("colors", colors))
-                if colors:
-                    TokenBeamRuntime.event_queue.put(
-                        ("status", f"{len(colors)} colors synced")
-                    )
-                else:
-                    TokenBeamRuntime.event_queue.put(("status", "No colors found in payload"))
-                return
 
-            if msg_type == "error":
-                error_text = data.get("error", "Unknown error")
-                if isinstance(error_text, str) and error_text.startswith("[warn]"):
-                    TokenBeamRuntime.event_queue.put(("status", error_text[7:].strip()))
-                elif error_text == "Invalid session token":
-                    TokenBeamRuntime.event_queue.put(("status", "Session not found"))
-                else:
-                    TokenBeamRuntime.event_queue.put(("status", f"Error: {error_text}"))
-                return
+class TOKENBEAM_OT_disconnect(bpy.types.Operator):
+    bl_idname = "token_beam.disconnect"
+    bl_label = "Disconnect"
+    bl_description = "Disconnect a session from the Token Beam sync server"
 
-            if msg_type == "ping":
-                try:
-                    ws.send(json.dumps({"type": "pong"}))
-                except Exception:
-                    pass
-
-        def on_error(ws, error):
-            TokenBeamRuntime.event_queue.put(("connected", False))
-            TokenBeamRuntime.event_queue.put(("status", f"Error: {error}"))
-            TokenBeamRuntime.ws_app = None
-            TokenBeamRuntime.ws_thread = None
-
-        def on_close(ws, close_status_code, close_message):
-            TokenBeamRuntime.event_queue.put(("connected", False))
-            TokenBeamRuntime.event_queue.put(("status", "Disconnected"))
-            TokenBeamRuntime.ws_app = None
-            TokenBeamRuntime.ws_thread = None
-
-        ws_app = websocket.WebSocketApp(
-            endpoint,
-            on_open=on_open,
-            on_message=on_message,
-            on_error=on_error,
-            on_close=on_close,
-        )
+    # -1 disconnects every session
+    session_index: bpy.props.IntProperty(default=-1)
 
-        ws_thread = threading.Thread(target=ws_app.run_forever, daemon=True)
-        TokenBeamRuntime.ws_app = ws_app
-        TokenBeamRuntime.ws_thread = ws_thread
-        ws_thread.start()
+    def execute(self, context):
+        sessions = context.scene.token_beam_sessions
+        if self.session_index >= len(sessions):
+            return {"CANCELLED"}
+        if self.session_index >= 0:
+            targets = [sessions[self.session_index]]
+        else:
+            targets = list(sessions)
+
+        for session in targets:
+            _close_connection(session.uid)
+            session.is_connected = False
+            session.status = "Disconnected"
+        # A sync that already arrived is still applied
+        if not (TokenBeamRuntime.connections or TokenBeamRuntime.applies):
+            _stop_timer()
+        return {"FINISHED"}
 
-        _ensure_timer(context)
-        state.status = "Connecting..."
+
+class TOKENBEAM_OT_add_session(bpy.types.Operator):
+    bl_idname = "token_beam.add_session"
+    bl_label = "Add Session"
+    bl_description = (
+        "Add a session with its own pairing token. Its colors are listed alongside the "
+        "others, and its materials and palette are prefixed with the session name"
+    )
+
+    def execute(self, context):
+        scene = context.scene
+        sessions = scene.token_beam_sessions
+        has_default = _default_session(scene) is not None
+        names = {session.name for session in sessions}
+
+        session = sessions.add()
+        if not has_default:
+            session.name = DEFAULT_SESSION_NAME
+            session.session_token = scene.token_beam_state.session_token
+            return {"FINISHED"}
+
+        session.uid = uuid.uuid4().hex
+        number = len(sessions)
+        while f"Session {number}" in names:
+            number += 1
+        session.name = f"Session {number}"
         return {"FINISHED"}
 
 
-class TOKENBEAM_OT_disconnect(bpy.types.Operator):
-    bl_idname = "token_beam.disconnect"
-    bl_label = "Disconnect"
-    bl_description = "Disconnect from Token Beam sync server"
+class TOKENBEAM_OT_remove_session(bpy.types.Operator):
+    bl_idname = "token_beam.remove_session"
+    bl_label = "Remove Session"
+    bl_description = (
+        "Disconnect the session and remove its synced colors. "
+        "Its materials and palette are kept; its Color Ramps and applied colors stop updating"
+    )
+
+    session_index: bpy.props.IntProperty(default=-1)
 
     def execute(self, context):
-        state = context.scene.token_beam_state
-        if TokenBeamRuntime.ws_app is not None:
-            try:
-                TokenBeamRuntime.ws_app.close()
-            except Exception:
-                pass
+        scene = context.scene
+        sessions = scene.token_beam_sessions
+        if not 0 <= self.session_index < len(sessions):
+            return {"CANCELLED"}
 
-        TokenBeamRuntime.ws_app = None
-        TokenBeamRuntime.ws_thread = None
-        state.is_connected = False
-        state.status = "Disconnected"
+        session_uid = sessions[self.session_index].uid
+        if TokenBeamRuntime.committing not in (None, session_uid):
+            # Removing the block would move the items another session's
+            # sync is writing
+            self.report({"WARNING"}, "Another session is writing its colors; try again in a moment")
+            return {"CANCELLED"}
+        _close_connection(session_uid)
+        job = TokenBeamRuntime.applies.pop(session_uid, None)
+        if job is not None:
+            job.cancel(force=True)
+
+        items = scene.token_beam_colors
+        start, count = _session_block(items, session_uid)
+        for index in range(start + count - 1, start - 1, -1):
+            items.remove(index)
+        if count:
+            TokenBeamRuntime.colors_revision += 1
+
+        bindings = scene.token_beam_ramps
+        for index in range(len(bindings) - 1, -1, -1):
+            if bindings[index].session == session_uid:
+                bindings.remove(index)
+
+        bindings = scene.token_beam_bindings
+        for index in range(len(bindings) - 1, -1, -1):
+            if bindings[index].session == session_uid:
+                bindings.remove(index)
+
+        sessions.remove(self.session_index)
+        # A sync that already arrived is still applied
+        if not (TokenBeamRuntime.connections or TokenBeamRuntime.applies):
+            _stop_timer()
         return {"FINISHED"}
 
 
 class TOKENBEAM_OT_add_color_ramp(bpy.types.Operator):
     bl_idname = "token_beam.add_color_ramp"
     bl_label = "Add Color Ramp"
-    bl_description = "Add a Color Ramp node with synced Token Beam colors"
+    bl_description = (
+        "Add a Color Ramp node with the synced Token Beam colors shown in the list. "
+        "The ramp stays bound to its session, collection and mode and updates on every sync"
+    )
 
     @classmethod
     def poll(cls, context):
@@ -348,34 +2168,35 @@ class TOKENBEAM_OT_add_color_ramp(bpy.types.Operator):
 
     def execute(self, context):
         scene = context.scene
-        colors = scene.token_beam_colors
-        node_tree = context.space_data.edit_tree
+        state = scene.token_beam_state
+        space = context.space_data
+        node_tree = space.edit_tree
+
+        # A ramp follows one session: the filtered one, else the active color's
+        items = scene.token_beam_colors
+        session_uid = _filter_session_uid(scene, state)
+        if session_uid is None:
+            active = min(max(state.active_color_index, 0), len(items) - 1)
+            session_uid = items[active].session
+        collection = state.filter_collection
+        mode = state.filter_mode
+        rgba_values = [
+            tuple(item.value)
+            for item in items
+            if item.session == session_uid
+            and (not collection or item.collection == collection)
+            and (not mode or item.mode == mode)
+        ]
+        if not rgba_values:
+            self.report({"WARNING"}, "No synced colors match the current filter")
+            return {"CANCELLED"}
 
         node = node_tree.nodes.new("ShaderNodeValToRGB")
-        ramp = node.color_ramp
-
-        n = len(colors)
-
-        # Adjust element count to match color count
-        while len(ramp.elements) < n:
-            ramp.elements.new(0.0)
-        while len(ramp.elements) > n:
-            ramp.elements.remove(ramp.elements[-1])
-
-        # Distribute colors evenly
-        for i, item in enumerate(colors):
-            el = ramp.elements[i]
-            el.position = (i / (n - 1)) if n > 1 else 0.5
-            el.color = tuple(item.value)
-
-        # Position node offset from existing nodes
-        max_x = 0
-        for existing in node_tree.nodes:
-            if existing != node:
-                right = existing.location.x + existing.width
-                if right > max_x:
-                    max_x = right
-        node.location = (max_x + 50, 0)
+        _fill_ramp(node.color_ramp, rgba_values)
+        node["token_beam_collection"] = collection
+        node["token_beam_mode"] = mode
+        node.label = f"Token Beam: {collection or 'All'} / {mode or 'All'}"
+        node.location = space.cursor_location
 
         # Select only the new node
         for existing in node_tree.nodes:
@@ -383,10 +2204,99 @@ class TOKENBEAM_OT_add_color_ramp(bpy.types.Operator):
         node.select = True
         node_tree.nodes.active = node
 
-        self.report({"INFO"}, f"Added Color Ramp with {n} colors")
+        binding = scene.token_beam_ramps.add()
+        binding.session = session_uid
+        binding.collection = collection
+        binding.mode = mode
+        binding.node_name = node.name
+        if node_tree != space.node_tree:
+            # Editing inside a node group
+            binding.node_group = node_tree
+        elif isinstance(space.id, bpy.types.Material):
+            binding.material = space.id
+        elif isinstance(space.id, bpy.types.World):
+            binding.world = space.id
+        else:
+            scene.token_beam_ramps.remove(len(scene.token_beam_ramps) - 1)
+            self.report({"INFO"}, f"Added Color Ramp with {len(rgba_values)} colors (not live-bound)")
+            return {"FINISHED"}
+
+        if len(rgba_values) > RAMP_MAX_ELEMENTS:
+            self.report(
+                {"WARNING"},
+                f"Color Ramps hold at most {RAMP_MAX_ELEMENTS} colors; "
+                f"used the first {RAMP_MAX_ELEMENTS} of {len(rgba_values)}",
+            )
+        else:
+            self.report({"INFO"}, f"Added Color Ramp with {len(rgba_values)} colors")
         return {"FINISHED"}
 
 
+class TOKENBEAM_UL_colors(bpy.types.UIList):
+    """Synced colors; Blender only calls draw_item for visible rows."""
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        if self.layout_type == "GRID":
+            layout.prop(item, "value", text="")
+            return
+
+        row = layout.row(align=True)
+        swatch = row.row(align=True)
+        swatch.ui_units_x = 2
+        swatch.prop(item, "value", text="")
+        row.label(text=item.token_name)
+        apply_op = row.operator("token_beam.apply_color", text="", icon="FORWARD")
+        apply_op.color_index = index
+
+    def filter_items(self, context, data, propname):
+        items = getattr(data, propname)
+        state = context.scene.token_beam_state
+        cache_key = (
+            data.as_pointer(),
+            len(items),
+            TokenBeamRuntime.colors_revision,
+            state.filter_session,
+            state.filter_collection,
+            state.filter_mode,
+            self.filter_name,
+            self.use_filter_sort_alpha,
+        )
+        cache = TokenBeamRuntime.color_list_cache
+        cached = cache.get(self.list_id)
+        if cached is not None and cached[0] == cache_key:
+            return cached[1], cached[2]
+
+        session_filter = _filter_session_uid(context.scene, state)
+        collection_filter = state.filter_collection
+        mode_filter = state.filter_mode
+        name_filter = self.filter_name.lower()
+        shown = self.bitflag_filter_item
+        flags = []
+        for item in items:
+            visible = (
+                (session_filter is None or item.session == session_filter)
+                and (not collection_filter or item.collection == collection_filter)
+                and (not mode_filter or item.mode == mode_filter)
+                and (not name_filter or name_filter in item.token_name.lower())
+            )
+            flags.append(shown if visible else 0)
+
+        order = []
+        if self.use_filter_sort_alpha:
+            order = bpy.types.UI_UL_list.sort_items_by_name(items, "token_name")
+
+        cache[self.list_id] = (cache_key, flags, order)
+        return flags, order
+
+
+def _draw_filters(layout, scene, state):
+    row = layout.row(align=True)
+    if len(scene.token_beam_sessions) > 1:
+        row.prop(state, "filter_session", text="", icon="LINKED")
+    row.prop(state, "filter_collection", text="", icon="FILTER")
+    row.prop(state, "filter_mode", text="")
+
+
 class TOKENBEAM_PT_shader_panel(bpy.types.Panel):
     bl_label = "Token Beam"
     bl_idname = "TOKENBEAM_PT_shader_panel"
@@ -409,13 +2319,49 @@ class TOKENBEAM_PT_shader_panel(bpy.types.Panel):
             return
 
         # Compact swatch grid
-        grid = layout.grid_flow(columns=6, align=True, even_columns=True)
-        for item in colors:
-            grid.prop(item, "value", text="")
+        state = scene.token_beam_state
+        _draw_filters(layout, scene, state)
+        layout.template_list(
+            "TOKENBEAM_UL_colors", "shader_grid", scene, "token_beam_colors",
+            state, "active_color_index", type="GRID", columns=6, rows=4,
+        )
 
         # Add Color Ramp button
         layout.separator()
         layout.operator("token_beam.add_color_ramp", icon="COLOR")
+        layout.operator("token_beam.unbind_color", icon="UNLINKED")
+
+
+def _draw_session(layout, session, index):
+    box = layout.box()
+    connection = _live_connection(session)
+
+    row = box.row(align=True)
+    fields = row.row(align=True)
+    # Renaming a live session would orphan its prefixed materials
+    fields.enabled = connection is None
+    fields.prop(session, "name", text="")
+    fields.prop(session, "session_token", text="")
+    if connection is not None:
+        row.operator("token_beam.disconnect", text="", icon="CANCEL").session_index = index
+    else:
+        row.operator("token_beam.connect", text="", icon="LINKED").session_index = index
+    row.operator("token_beam.remove_session", text="", icon="X").session_index = index
+
+    box.label(text=f"Status: {session.status}")
+    if connection is None:
+        return
+    if connection.first_colors_ms is not None:
+        box.label(
+            text=f"Latency: first colors {connection.first_colors_ms:.0f} ms, "
+            f"last queue wait {connection.last_wait_ms:.0f} ms"
+        )
+    if connection.wire_bytes:
+        ratio = connection.inflated_bytes / connection.wire_bytes
+        box.label(
+            text=f"Compressed: {connection.wire_bytes / 1024:.1f} KB on wire "
+            f"({ratio:.1f}x), inflate {connection.inflate_ms:.1f} ms"
+        )
 
 
 class TOKENBEAM_PT_panel(bpy.types.Panel):
@@ -429,16 +2375,32 @@ class TOKENBEAM_PT_panel(bpy.types.Panel):
         layout = self.layout
         scene = context.scene
         state = scene.token_beam_state
-        runtime_connected = _runtime_is_connected() and state.is_connected
-
-        layout.prop(state, "session_token", text="Token")
+        sessions = scene.token_beam_sessions
 
-        if runtime_connected:
-            layout.operator("token_beam.disconnect", text="Disconnect", icon="CANCEL")
-        else:
+        if len(sessions) == 0:
+            layout.prop(state, "session_token", text="Token")
             layout.operator("token_beam.connect", text="Connect", icon="LINKED")
-
-        layout.label(text=f"Status: {state.status}")
+            layout.label(text=f"Status: {state.status}")
+        else:
+            for index, session in enumerate(sessions):
+                _draw_session(layout, session, index)
+        layout.operator("token_beam.add_session", icon="ADD")
+        layout.prop(state, "color_backend", text="Colors")
+
+        mailbox = TokenBeamRuntime.mailbox
+        if mailbox.superseded or mailbox.dropped:
+            layout.label(
+                text=f"Skipped payloads: {mailbox.superseded} superseded, {mailbox.dropped} dropped"
+            )
+
+        tracer = TokenBeamRuntime.tracer
+        if tracer.enabled:
+            box = layout.box()
+            box.label(text="Sync stages (p50 / p95 / p99 ms)")
+            column = box.column(align=True)
+            for stage, samples, p50, p95, p99 in tracer.percentiles():
+                column.label(text=f"{stage}: {p50:.1f} / {p95:.1f} / {p99:.1f}  ({samples})")
+            box.operator("token_beam.export_trace", icon="EXPORT")
 
         layout.separator()
 
@@ -449,45 +2411,69 @@ class TOKENBEAM_PT_panel(bpy.types.Panel):
         else:
             layout.label(text="Synced colors")
 
-        box = layout.box()
         if num_colors == 0:
+            box = layout.box()
             box.label(text="No colors synced")
         else:
-            for index, item in enumerate(scene.token_beam_colors):
-                row = box.row(align=True)
-                swatch = row.row(align=True)
-                swatch.ui_units_x = 2
-                swatch.prop(item, "value", text="")
-                row.label(text=item.token_name)
-                apply_op = row.operator("token_beam.apply_color", text="", icon="FORWARD")
-                apply_op.color_index = index
+            _draw_filters(layout, scene, state)
+            layout.template_list(
+                "TOKENBEAM_UL_colors", "", scene, "token_beam_colors",
+                state, "active_color_index", rows=8,
+            )
 
         # Show native Blender palette grid if available (paint modes only)
         try:
-            palette = bpy.data.palettes.get(PALETTE_NAME)
-            if palette and len(palette.colors) > 0:
-                ts = context.tool_settings
-                paint_settings = None
-                for attr in ("image_paint", "vertex_paint", "gpencil_paint"):
-                    ps = getattr(ts, attr, None)
-                    if ps is not None and ps.palette == palette:
-                        paint_settings = ps
-                        break
-                if paint_settings is not None:
-                    layout.separator()
-                    layout.label(text=f"Palette: {PALETTE_NAME}")
-                    layout.template_palette(paint_settings, "palette", color=True)
+            names = {PALETTE_NAME}
+            names.update(_palette_name(_session_namespace(session)) for session in sessions)
+            ts = context.tool_settings
+            paint_settings = None
+            for attr in ("image_paint", "vertex_paint", "gpencil_paint"):
+                ps = getattr(ts, attr, None)
+                if ps is not None and ps.palette is not None and ps.palette.name in names:
+                    paint_settings = ps
+                    break
+            if paint_settings is not None and len(paint_settings.palette.colors) > 0:
+                layout.separator()
+                layout.label(text=f"Palette: {paint_settings.palette.name}")
+                layout.template_palette(paint_settings, "palette", color=True)
         except Exception:
             pass
 
 
+class TOKENBEAM_OT_export_trace(bpy.types.Operator):
+    bl_idname = "token_beam.export_trace"
+    bl_label = "Export Trace"
+    bl_description = "Save the recorded sync stages as a Chrome trace (open it in Perfetto)"
+
+    filepath: bpy.props.StringProperty(subtype="FILE_PATH", default="token-beam-trace.json")
+    filter_glob: bpy.props.StringProperty(default="*.json", options={"HIDDEN"})
+
+    @classmethod
+    def poll(cls, context):
+        return TokenBeamRuntime.tracer.enabled
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {"RUNNING_MODAL"}
+
+    def execute(self, context):
+        path = bpy.path.ensure_ext(self.filepath, ".json")
+        try:
+            TokenBeamRuntime.tracer.write_chrome_trace(path)
+        except OSError as error:
+            self.report({"ERROR"}, f"Could not write trace: {error}")
+            return {"CANCELLED"}
+        self.report({"INFO"}, f"Saved trace to {path}")
+        return {"FINISHED"}
+
+
 class TOKENBEAM_OT_apply_color(bpy.types.Operator):
     bl_idname = "token_beam.apply_color"
     bl_label = "Apply Color"
     bl_description = (
         "Apply this color to the active mesh. "
-        "If the mesh already has a material, sets its Base Color (like the eyedropper). "
-        "If no material exists, assigns a new one"
+        "If the mesh already has a material, sets its Base Color (like the eyedropper) "
+        "and keeps it in sync with the token. If no material exists, assigns a new one"
     )
 
     color_index: bpy.props.IntProperty(default=-1)
@@ -497,15 +2483,6 @@ class TOKENBEAM_OT_apply_color(bpy.types.Operator):
         obj = context.active_object
         return obj is not None and obj.type == "MESH"
 
-    def _find_principled(self, material):
-        """Find the Principled BSDF node in a material's node tree."""
-        if not material or not material.use_nodes or not material.node_tree:
-            return None
-        for node in material.node_tree.nodes:
-            if node.type == "BSDF_PRINCIPLED":
-                return node
-        return None
-
     def execute(self, context):
         scene = context.scene
         if self.color_index < 0 or self.color_index >= len(scene.token_beam_colors):
@@ -523,17 +2500,39 @@ class TOKENBEAM_OT_apply_color(bpy.types.Operator):
             if not existing_mat.use_nodes:
                 existing_mat.use_nodes = True
 
-            principled = self._find_principled(existing_mat)
+            principled = _principled_node(existing_mat)
+            TokenBeamMaterialIndex.mark_written(existing_mat)
+            linked = False
             if principled is not None:
                 principled.inputs["Base Color"].default_value = rgba
+                tree = None
+                if _use_node_groups(scene):
+                    tree = _token_node_group(
+                        color_item.collection, color_item.mode, color_item.token_name,
+                        self._namespace(scene, color_item),
+                    )
+                if tree is not None:
+                    # Link to the token's socket so later syncs reach it
+                    linked = _link_token_socket(
+                        existing_mat, principled, tree,
+                        _token_socket_name(color_item.token_name),
+                    )
+                if linked:
+                    _unbind_material(scene, existing_mat, principled.name)
+                else:
+                    _bind_color(scene, existing_mat, principled, "Base Color", color_item)
             existing_mat.diffuse_color = rgba
-            self.report({"INFO"}, f"Set {color_item.token_name} on {existing_mat.name}")
+            verb = "Linked" if linked else "Set"
+            self.report({"INFO"}, f"{verb} {color_item.token_name} on {existing_mat.name}")
             return {"FINISHED"}
 
         # No material on the object — create/assign a Token Beam material
-        material_name = color_item.material_name or _ensure_token_material(
-            color_item.token_name, color_item.value, color_item.collection, color_item.mode
-        )
+        material_name = color_item.material_name
+        if not material_name:
+            material_name = _ensure_token_material(
+                color_item.token_name, color_item.value, color_item.collection,
+                color_item.mode, self._namespace(scene, color_item),
+            )
         material = bpy.data.materials.get(material_name)
         if material is None:
             self.report({"WARNING"}, "Token material not found")
@@ -543,60 +2542,209 @@ class TOKENBEAM_OT_apply_color(bpy.types.Operator):
         self.report({"INFO"}, f"Applied {color_item.token_name}")
         return {"FINISHED"}
 
+    @staticmethod
+    def _namespace(scene, color_item):
+        for session in scene.token_beam_sessions:
+            if session.uid == color_item.session:
+                return _session_namespace(session)
+        return ""
+
+
+class TOKENBEAM_OT_unbind_color(bpy.types.Operator):
+    bl_idname = "token_beam.unbind_color"
+    bl_label = "Stop Syncing Colors"
+    bl_description = (
+        "Stop updating the colors applied to the active material when their tokens change. "
+        "The current colors are kept"
+    )
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and obj.active_material is not None
+
+    def execute(self, context):
+        material = context.active_object.active_material
+        removed = _unbind_material(context.scene, material)
+        self.report({"INFO"}, f"Unbound {removed} color(s) from {material.name}")
+        return {"FINISHED"}
+
 
 def _drain_events():
+    if (
+        not TokenBeamRuntime.mailbox.pending
+        and not TokenBeamRuntime.applies
+        and not TokenBeamRuntime.tracer.enabled
+        and all(connection.alive for connection in TokenBeamRuntime.connections.values())
+    ):
+        # Idle tick: nothing arrived since the last one
+        if not TokenBeamRuntime.connections:
+            return None
+        TokenBeamRuntime.drain_interval = min(
+            TokenBeamRuntime.drain_interval * 2.0, DRAIN_INTERVAL_MAX
+        )
+        return TokenBeamRuntime.drain_interval
+
     scene = bpy.context.scene if bpy.context else None
     if scene is None:
-        return 0.5
+        return TokenBeamRuntime.drain_interval
+
+    sessions = {session.uid: session for session in scene.token_beam_sessions}
+    connections = TokenBeamRuntime.connections
+    events, colors, statuses = TokenBeamRuntime.mailbox.take()
+    for session_uid, kind, value in events:
+        session = sessions.get(session_uid)
+        if session is not None and kind == "connected":
+            session.is_connected = bool(value)
+
+    tracer = TokenBeamRuntime.tracer
+    applies = TokenBeamRuntime.applies
+    for session_uid, (session_colors, posted_at, sync_id) in colors.items():
+        session = sessions.get(session_uid)
+        if session is None:
+            continue
+        taken = time.perf_counter()
+        tracer.add(sync_id, "queue", posted_at, taken, "mailbox")
+        # A newer payload supersedes one still being applied, unless that
+        # one is committing already
+        job = TokenBeamApply(session_uid, _session_namespace(session), session_colors, sync_id)
+        stale = applies.pop(session_uid, None)
+        if stale is not None and not stale.cancel():
+            stale.then = job
+            job = stale
+        applies[session_uid] = job
+        connection = connections.get(session_uid)
+        if connection is not None:
+            connection.last_wait_ms = (taken - posted_at) * 1000.0
+
+    budget = _apply_budget(bpy.context)
+    deadline = time.perf_counter() + budget if budget is not None else float("inf")
+    for session_uid in list(applies):
+        if time.perf_counter() >= deadline:
+            break
+        job = applies.pop(session_uid)
+        if session_uid not in sessions:
+            job.cancel(force=True)
+            continue
+        if not job.run(scene, deadline):
+            # Unfinished jobs go to the back, so sessions take turns
+            applies[session_uid] = job
+            continue
+        if job.then is not None:
+            applies[session_uid] = job.then
+        connection = connections.get(session_uid)
+        if connection is not None and connection.first_colors_ms is None:
+            elapsed = time.perf_counter() - connection.connect_started
+            connection.first_colors_ms = elapsed * 1000.0
+    _show_apply_progress(bpy.context)
+
+    for session_uid, text in statuses.items():
+        session = sessions.get(session_uid)
+        if session is not None:
+            session.status = text
+
+    pingable = []
+    for session_uid, connection in list(connections.items()):
+        session = sessions.get(session_uid)
+        if not connection.alive:
+            del connections[session_uid]
+            if session is not None and session.is_connected:
+                session.is_connected = False
+                session.status = "Disconnected"
+        elif session is not None and session.is_connected:
+            pingable.append(connection)
+
+    if tracer.enabled and pingable:
+        now = time.perf_counter()
+        if now - TokenBeamRuntime.last_ping >= PING_INTERVAL:
+            # The tracer times one outstanding ping, so sessions take turns
+            TokenBeamRuntime.last_ping = now
+            TokenBeamRuntime.ping_turn += 1
+            connection = pingable[TokenBeamRuntime.ping_turn % len(pingable)]
+            try:
+                tracer.ping_sent()
+                connection.send(json.dumps({"type": "ping"}))
+            except Exception:
+                pass
 
-    state = scene.token_beam_state
-    if state.is_connected and not _runtime_is_connected():
-        state.is_connected = False
-        state.status = "Disconnected"
-        TokenBeamRuntime.ws_app = None
-        TokenBeamRuntime.ws_thread = None
+    if applies:
+        # Yield to Blender for a redraw, then carry on applying
+        TokenBeamRuntime.drain_interval = DRAIN_INTERVAL_MIN
+        return 0.0
+    if events or colors or statuses:
+        TokenBeamRuntime.drain_interval = DRAIN_INTERVAL_MIN
+    elif not connections:
+        # Nothing left to deliver; TOKENBEAM_OT_connect registers us again
+        return None
+    else:
+        TokenBeamRuntime.drain_interval = min(
+            TokenBeamRuntime.drain_interval * 2.0, DRAIN_INTERVAL_MAX
+        )
+    return TokenBeamRuntime.drain_interval
 
-    while True:
-        try:
-            kind, value = TokenBeamRuntime.event_queue.get_nowait()
-        except queue.Empty:
-            break
 
-        if kind == "status":
-            state.status = value
-        elif kind == "connected":
-            state.is_connected = bool(value)
-        elif kind == "colors":
-            scene.token_beam_colors.clear()
-            for color in value:
-                material_name = _ensure_token_material(
-                    color["name"], color["value"], color.get("collection", ""), color.get("mode", "")
-                )
-                item = scene.token_beam_colors.add()
-                item.token_name = color["name"]
-                item.value = color["value"]
-                item.collection = color["collection"]
-                item.mode = color["mode"]
-                item.material_name = material_name
-            _sync_palette(value)
+@persistent
+def _on_load_post(*_args):
+    # Connections and syncs belong to the sessions of the file that was closed
+    _close_all_connections()
+    _cancel_applies()
+    _show_apply_progress(bpy.context)
+    TokenBeamMaterialIndex.clear()
+    TokenBeamNodeGroups.clear()
+    TokenBeamBindingIndex.clear()
+    TokenBeamRuntime.color_list_cache.clear()
+
 
-    return 0.5
+@persistent
+def _on_undo_redo(*_args):
+    # Undo reallocates IDs, so every cached reference is dangling
+    TokenBeamMaterialIndex.clear()
+    TokenBeamNodeGroups.clear()
+    TokenBeamBindingIndex.clear()
+    _restart_applies(force=True)
+
+
+@persistent
+def _on_depsgraph_update_post(_scene, depsgraph):
+    TokenBeamMaterialIndex.prune(depsgraph)
+
+
+_handlers = (
+    ("load_post", _on_load_post),
+    ("undo_post", _on_undo_redo),
+    ("redo_post", _on_undo_redo),
+    ("depsgraph_update_post", _on_depsgraph_update_post),
+)
 
 
 def _ensure_timer(_context):
-    if TokenBeamRuntime.timer_running:
+    TokenBeamRuntime.drain_interval = DRAIN_INTERVAL_MIN
+    if bpy.app.timers.is_registered(_drain_events):
         return
-    bpy.app.timers.register(_drain_events, persistent=True)
-    TokenBeamRuntime.timer_running = True
+    bpy.app.timers.register(_drain_events, first_interval=0.0, persistent=True)
+
+
+def _stop_timer():
+    if bpy.app.timers.is_registered(_drain_events):
+        bpy.app.timers.unregister(_drain_events)
 
 
 classes = (
     TokenBeamColor,
+    TokenBeamRampBinding,
+    TokenBeamColorBinding,
+    TokenBeamSession,
     TokenBeamState,
+    TokenBeamPreferences,
     TOKENBEAM_OT_connect,
     TOKENBEAM_OT_disconnect,
+    TOKENBEAM_OT_add_session,
+    TOKENBEAM_OT_remove_session,
     TOKENBEAM_OT_apply_color,
+    TOKENBEAM_OT_unbind_color,
+    TOKENBEAM_OT_export_trace,
     TOKENBEAM_OT_add_color_ramp,
+    TOKENBEAM_UL_colors,
     TOKENBEAM_PT_panel,
     TOKENBEAM_PT_shader_panel,
 )
@@ -608,19 +2756,41 @@ def register():
 
     bpy.types.Scene.token_beam_state = bpy.props.PointerProperty(type=TokenBeamState)
     bpy.types.Scene.token_beam_colors = bpy.props.CollectionProperty(type=TokenBeamColor)
+    bpy.types.Scene.token_beam_ramps = bpy.props.CollectionProperty(type=TokenBeamRampBinding)
+    bpy.types.Scene.token_beam_bindings = bpy.props.CollectionProperty(type=TokenBeamColorBinding)
+    bpy.types.Scene.token_beam_sessions = bpy.props.CollectionProperty(type=TokenBeamSession)
+
+    for name, handler in _handlers:
+        handlers = getattr(bpy.app.handlers, name)
+        if handler not in handlers:
+            handlers.append(handler)
+
+    _refresh_tracing(_addon_preferences(bpy.context))
 
 
 def unregister():
-    if TokenBeamRuntime.ws_app is not None:
-        try:
-            TokenBeamRuntime.ws_app.close()
-        except Exception:
-            pass
+    _close_all_connections()
+    _cancel_applies()
+    _stop_timer()
+
+    for name, handler in _handlers:
+        handlers = getattr(bpy.app.handlers, name)
+        if handler in handlers:
+            handlers.remove(handler)
+    TokenBeamMaterialIndex.clear()
+    TokenBeamNodeGroups.clear()
+    TokenBeamBindingIndex.clear()
 
     if hasattr(bpy.types.Scene, "token_beam_state"):
         del bpy.types.Scene.token_beam_state
     if hasattr(bpy.types.Scene, "token_beam_colors"):
         del bpy.types.Scene.token_beam_colors
+    if hasattr(bpy.types.Scene, "token_beam_ramps"):
+        del bpy.types.Scene.token_beam_ramps
+    if hasattr(bpy.types.Scene, "token_beam_bindings"):
+        del bpy.types.Scene.token_beam_bindings
+    if hasattr(bpy.types.Scene, "token_beam_sessions"):
+        del bpy.types.Scene.token_beam_sessions
 
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
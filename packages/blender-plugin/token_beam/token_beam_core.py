@@ -0,0 +1,554 @@
+# Token Beam shared Python core
+#
+# Dependency-free helpers used by both the Blender add-on and the Krita
+# plugin. This file is the canonical copy; each plugin ships a vendored copy
+# next to its own sources. Edit it here and run `npm run vendor:python-core`
+# from the repository root to refresh them.
+
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import time
+from collections import deque
+from itertools import compress
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# A collection or mode written name first, as the sync server sends them:
+# the name, and which list follows it
+_NAMED_LIST = re.compile(
+    r'[ \t\n\r]*\{[ \t\n\r]*"name"[ \t\n\r]*:[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*,'
+    r'[ \t\n\r]*"(modes|tokens)"[ \t\n\r]*:[ \t\n\r]*(?=\[)'
+)
+# The close of such an object when nothing follows the list
+_OBJECT_END = re.compile(r"[ \t\n\r]*\}")
+_SESSION_TOKEN = re.compile(r"^[0-9a-fA-F]+$")
+_HEX_CHARS = frozenset("0123456789abcdefABCDEF")
+_decoder = json.JSONDecoder()
+
+# Any non-empty value turns on SyncTracer in both plugins
+TRACE_ENV = "TOKEN_BEAM_TRACE"
+
+# Overrides the sync server endpoint of both plugins, e.g. for load tests
+# against bench/standin_server.py
+SYNC_URL_ENV = "TOKEN_BEAM_SYNC_URL"
+
+
+# ---------------------------------------------------------------------------
+# Validation
+# ---------------------------------------------------------------------------
+
+def normalize_session_token(raw):
+    """Validate and normalise a session token. Returns None on failure."""
+    stripped = raw.strip().replace("beam://", "")
+    if not _SESSION_TOKEN.match(stripped):
+        return None
+    return "beam://" + stripped.upper()
+
+
+def resolve_server_url(default, configured=""):
+    """Pick the sync server endpoint.
+
+    ``$TOKEN_BEAM_SYNC_URL`` wins over ``configured`` (a plugin setting),
+    which wins over ``default``. Raises ValueError unless the chosen URL
+    is a ``ws://`` or ``wss://`` URL.
+    """
+    url = (os.environ.get(SYNC_URL_ENV) or configured or default).strip()
+    if not url.startswith(("ws://", "wss://")) or len(url.split("://", 1)[1]) == 0:
+        raise ValueError(f"Not a WebSocket URL: {url!r}")
+    return url
+
+
+def expand_hex(hex_value):
+    """Expand #rgb, #rgba, #rrggbb or #rrggbbaa to 8 characters, or None.
+
+    Only the length is checked; use normalize_hex() to validate the digits.
+    """
+    value = hex_value.strip().lstrip("#")
+    length = len(value)
+    if length == 8:
+        return value
+    if length == 6:
+        return value + "FF"
+    if length == 3:
+        return value[0] * 2 + value[1] * 2 + value[2] * 2 + "FF"
+    if length == 4:
+        return value[0] * 2 + value[1] * 2 + value[2] * 2 + value[3] * 2
+    return None
+
+
+def normalize_hex(hex_value):
+    """Expand and validate a hex color to 8 hex digits (RRGGBBAA), or None."""
+    value = expand_hex(hex_value)
+    if value is None or not _HEX_CHARS.issuperset(value):
+        return None
+    return value
+
+
+def hex_to_rgba8(hex_value):
+    """Parse a hex color into ``(r, g, b, a)`` bytes, or None when invalid."""
+    value = normalize_hex(hex_value)
+    if value is None:
+        return None
+    packed = int(value, 16)
+    return packed >> 24, (packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF
+
+
+def message_fingerprint(raw):
+    """Cheap digest of a raw message, used to spot byte-identical resends."""
+    data = raw.encode("utf-8") if isinstance(raw, str) else raw
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+# ---------------------------------------------------------------------------
+# Streaming sync message reader
+# ---------------------------------------------------------------------------
+
+class _Cursor:
+    """Position in a JSON document, advanced by the reader functions.
+
+    ``members()`` and ``elements()`` are generators that stop at each key or
+    element with the cursor on its value; the caller has to consume that
+    value (``value()``, ``skip()`` or a nested walk) before resuming them.
+    ``more_members()`` picks an object up after a member read some other way.
+    """
+
+    __slots__ = ("text", "pos")
+
+    def __init__(self, text, pos=0):
+        self.text = text
+        self.pos = pos
+
+    def peek(self):
+        self.pos = _WHITESPACE.match(self.text, self.pos).end()
+        return self.text[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        value, self.pos = _decoder.raw_decode(self.text, _WHITESPACE.match(self.text, self.pos).end())
+        return value
+
+    skip = value
+
+    def members(self):
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        yield self._key()
+        yield from self.more_members()
+
+    def more_members(self):
+        while True:
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or '}}' at offset {self.pos - 1}")
+            yield self._key()
+
+    def _key(self):
+        key = self.value()
+        if not isinstance(key, str):
+            raise ValueError(f"Expected an object key at offset {self.pos}")
+        self.expect(":")
+        return key
+
+    def elements(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' at offset {self.pos - 1}")
+
+
+def read_envelope(raw):
+    """Read the top-level fields of a sync-server message.
+
+    Returns ``(fields, payload_at)``. An object payload is not decoded:
+    ``payload_at`` is its offset in ``raw``, ready for iter_color_groups(),
+    and None when there is no object payload. Reading stops at the payload
+    once the message type is known; servers send ``type`` first.
+
+    ``raw`` is a ``str`` for JSON text messages and ``bytes`` for binary
+    ones in the BINARY_ENCODING layout.
+    """
+    if not isinstance(raw, str):
+        return _read_binary_envelope(raw)
+    cursor = _Cursor(raw)
+    fields = {}
+    payload_at = None
+    for key in cursor.members():
+        if key == "payload" and cursor.peek() == "{":
+            payload_at = cursor.pos
+            if "type" in fields:
+                break
+            cursor.skip()
+        else:
+            fields[key] = cursor.value()
+    return fields, payload_at
+
+
+def iter_color_groups(raw, payload_at):
+    """Yield ``(collection, mode, tokens)`` for each mode of a sync payload.
+
+    ``tokens`` is a tuple of ``(name, hex value)`` pairs for the mode's
+    color tokens; values are not validated. The payload is walked in place
+    and each mode's token array is decoded on its own and reduced to color
+    pairs right away, so neither the payload tree nor the non-color tokens
+    of other modes are ever held in memory. Raises ValueError on malformed
+    JSON. Binary messages are read from their string table instead.
+    """
+    if not isinstance(raw, str):
+        yield from _binary_color_groups(raw, payload_at)
+        return
+    cursor = _Cursor(raw, payload_at)
+    for key in cursor.members():
+        if key != "collections" or cursor.peek() != "[":
+            cursor.skip()
+            continue
+        for _ in cursor.elements():
+            if cursor.peek() != "{":
+                cursor.skip()
+                continue
+            yield from _collection_groups(cursor)
+
+
+def _collection_groups(cursor):
+    pending = []
+    match = _NAMED_LIST.match(cursor.text, cursor.pos)
+    if match is not None and match.group(2) == "modes":
+        name = match.group(1)
+        cursor.pos = match.end()
+        for mode_name, tokens in _mode_groups(cursor):
+            yield name, mode_name, tokens
+        members = cursor.more_members()
+    else:
+        name = None
+        members = cursor.members()
+    for key in members:
+        if key == "name":
+            name = _as_name(cursor.value(), "")
+        elif key == "modes" and cursor.peek() == "[":
+            for mode_name, tokens in _mode_groups(cursor):
+                if name is None:
+                    # "modes" came before "name"; hold on until it is known
+                    pending.append((mode_name, tokens))
+                else:
+                    yield name, mode_name, tokens
+        else:
+            cursor.skip()
+    for mode_name, tokens in pending:
+        yield name or "", mode_name, tokens
+
+
+def _mode_groups(cursor):
+    for _ in cursor.elements():
+        match = _NAMED_LIST.match(cursor.text, cursor.pos)
+        if match is not None and match.group(2) == "tokens":
+            name = match.group(1)
+            tokens, cursor.pos = _decoder.raw_decode(cursor.text, match.end())
+            tokens = _color_tokens(tokens)
+            end = _OBJECT_END.match(cursor.text, cursor.pos)
+            if end is not None:
+                cursor.pos = end.end()
+                yield name, tokens
+                continue
+            members = cursor.more_members()
+        elif cursor.peek() == "{":
+            name = ""
+            tokens = ()
+            members = cursor.members()
+        else:
+            cursor.skip()
+            continue
+        for key in members:
+            if key == "name":
+                name = _as_name(cursor.value(), "")
+            elif key == "tokens":
+                tokens = _color_tokens(cursor.value())
+            else:
+                cursor.skip()
+        yield name, tokens
+
+
+def _color_tokens(tokens):
+    if not isinstance(tokens, list):
+        return ()
+    return tuple([
+        (_as_name(token.get("name"), "unnamed"), str(token.get("value", "")))
+        for token in tokens
+        if isinstance(token, dict) and token.get("type") == "color"
+    ])
+
+
+def _as_name(value, default):
+    if value is None:
+        return default
+    return value if isinstance(value, str) else str(value)
+
+
+# ---------------------------------------------------------------------------
+# Binary sync messages
+# ---------------------------------------------------------------------------
+#
+# Clients that list BINARY_ENCODING in the ``encodings`` of their ``pair``
+# message get syncs as binary WebSocket messages in a columnar layout,
+# encoded once per sync by the server (packages/sync-server/src/encoding.ts).
+# All integers are unsigned 32-bit little-endian:
+#
+#   magic        b"TBC1"
+#   header       length, then UTF-8 JSON: the envelope without ``payload``
+#   counts       length n, then n integers: the number of collections, and
+#                for each collection its number of modes followed by the
+#                token count of each of those modes
+#   strings      byte length, then UTF-8 strings joined by NUL: for each
+#                collection its name, then for each mode its name, the
+#                names of its tokens and their values
+#   types        one byte per token, in string order (BINARY_TOKEN_TYPES)
+#
+# Values are strings; numbers and booleans are written as JSON. Payloads
+# with a NUL in any string are sent as JSON instead.
+
+BINARY_ENCODING = "columnar-1"
+BINARY_MAGIC = b"TBC1"
+BINARY_TOKEN_TYPES = ("color", "number", "string", "boolean")
+_U32 = struct.Struct("<I")
+# Maps token type bytes to 1 for colors, 0 for everything else
+_COLOR_SELECTORS = bytes([1]) + bytes(255)
+
+
+def _read_binary_envelope(data):
+    if data[:4] != BINARY_MAGIC:
+        raise ValueError("Not a Token Beam binary message")
+    try:
+        (length,) = _U32.unpack_from(data, 4)
+    except struct.error:
+        raise ValueError("Truncated binary message") from None
+    end = 8 + length
+    fields = json.loads(str(data[8:end], "utf-8"))
+    if not isinstance(fields, dict) or end > len(data):
+        raise ValueError("Malformed binary message header")
+    return fields, end if end < len(data) else None
+
+
+def _binary_color_groups(data, pos):
+    try:
+        (length,) = _U32.unpack_from(data, pos)
+        counts = struct.unpack_from(f"<{length}I", data, pos + 4)
+        pos += 4 + 4 * length
+        (size,) = _U32.unpack_from(data, pos)
+    except struct.error:
+        raise ValueError("Truncated binary message") from None
+    pos += 4
+    strings = str(data[pos:pos + size], "utf-8").split("\x00")
+    types = bytes(data[pos + size:])
+
+    # Check the layout before yielding anything
+    index = 1
+    expected_strings = 0
+    expected_tokens = 0
+    try:
+        for _ in range(counts[0]):
+            modes = counts[index]
+            expected_strings += 1 + modes
+            for count in counts[index + 1:index + 1 + modes]:
+                expected_strings += 2 * count
+                expected_tokens += count
+            index += 1 + modes
+    except IndexError:
+        raise ValueError("Truncated binary message counts") from None
+    if (index != len(counts) or len(types) != expected_tokens
+            or len(strings) != max(expected_strings, 1)):
+        raise ValueError("Malformed binary message")
+
+    index = 1
+    at = 0
+    kind_at = 0
+    for _ in range(counts[0]):
+        modes = counts[index]
+        collection = strings[at]
+        at += 1
+        for count in counts[index + 1:index + 1 + modes]:
+            mode = strings[at]
+            names = strings[at + 1:at + 1 + count]
+            values = strings[at + 1 + count:at + 1 + 2 * count]
+            kinds = types[kind_at:kind_at + count]
+            at += 1 + 2 * count
+            kind_at += count
+            if kinds.count(0) == count:
+                tokens = tuple(zip(names, values))
+            else:
+                tokens = tuple(compress(zip(names, values),
+                                        kinds.translate(_COLOR_SELECTORS)))
+            yield collection, mode, tokens
+        index += 1 + modes
+
+
+# ---------------------------------------------------------------------------
+# Sync tracing
+# ---------------------------------------------------------------------------
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a non-empty sample list."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+class _Span:
+    __slots__ = ("tracer", "sync_id", "stage", "start")
+
+    def __init__(self, tracer, sync_id, stage):
+        self.tracer = tracer
+        self.sync_id = sync_id
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc):
+        self.tracer.add(self.sync_id, self.stage, self.start, time.perf_counter())
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class SyncTracer:
+    """Opt-in timings of every stage of every sync.
+
+    Spans are ``perf_counter`` intervals tagged with a sync ID and a track:
+    the thread that recorded them, or a named track such as ``network`` for
+    time spent outside the plugin. The latest ``max_spans`` are kept for
+    export as Chrome trace events (open the file in Perfetto or
+    chrome://tracing); the latest ``window`` durations of each stage feed
+    the rolling percentiles. Safe to use from several threads; a disabled
+    tracer does nothing.
+    """
+
+    def __init__(self, enabled=None, max_spans=50000, window=200):
+        if enabled is None:
+            enabled = bool(os.environ.get(TRACE_ENV))
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._spans = deque(maxlen=max_spans)
+        self._durations = {}
+        self._tracks = {}
+        self._window = window
+        self._next_id = 0
+        self._ping_sent = None
+        self._origin = time.perf_counter()
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self._durations.clear()
+            self._ping_sent = None
+
+    def next_sync_id(self):
+        with self._lock:
+            self._next_id += 1
+            return self._next_id
+
+    def add(self, sync_id, stage, start, end, track=None):
+        """Record ``stage`` of ``sync_id`` from ``start`` to ``end`` (perf_counter)."""
+        if not self.enabled:
+            return
+        if track is None:
+            track = threading.current_thread().name
+        with self._lock:
+            tid = self._tracks.setdefault(track, len(self._tracks) + 1)
+            self._spans.append((sync_id, stage, start, end, tid))
+            durations = self._durations.get(stage)
+            if durations is None:
+                durations = self._durations[stage] = deque(maxlen=self._window)
+            durations.append((end - start) * 1000.0)
+
+    def add_since_epoch(self, sync_id, stage, epoch_ms, end, track="network"):
+        """Record a span that began at a wall-clock time in milliseconds,
+        such as the ``sentAt`` stamp of a stand-in server sync."""
+        start = epoch_ms / 1000.0 - (time.time() - time.perf_counter())
+        self.add(sync_id, stage, min(start, end), end, track)
+
+    def span(self, sync_id, stage):
+        """Context manager timing its body as ``stage`` of ``sync_id``."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, sync_id, stage)
+
+    def ping_sent(self):
+        self._ping_sent = time.perf_counter()
+
+    def ping_received(self):
+        """Record the round trip of an outstanding ping.
+
+        Returns False when no ping was outstanding, i.e. the message was
+        not a reply to ours.
+        """
+        sent, self._ping_sent = self._ping_sent, None
+        if sent is None:
+            return False
+        self.add(None, "ping-rtt", sent, time.perf_counter(), "network")
+        return True
+
+    def percentiles(self):
+        """Return ``[(stage, samples, p50, p95, p99)]`` in first-seen order."""
+        with self._lock:
+            stages = [(stage, list(durations)) for stage, durations in self._durations.items()]
+        return [
+            (stage, len(samples), percentile(samples, 0.50), percentile(samples, 0.95),
+             percentile(samples, 0.99))
+            for stage, samples in stages if samples
+        ]
+
+    def chrome_trace(self):
+        """The recorded spans in Chrome trace-event format."""
+        with self._lock:
+            spans = list(self._spans)
+            tracks = dict(self._tracks)
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+            for name, tid in tracks.items()
+        ]
+        # Spans that began before the tracer did (e.g. network time) would
+        # get negative timestamps
+        origin = min([self._origin] + [span[2] for span in spans])
+        for sync_id, stage, start, end, tid in spans:
+            event = {
+                "name": stage, "cat": "sync", "ph": "X", "pid": 1, "tid": tid,
+                "ts": round((start - origin) * 1e6, 3),
+                "dur": round((end - start) * 1e6, 3),
+            }
+            if sync_id is not None:
+                event["args"] = {"sync": sync_id}
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
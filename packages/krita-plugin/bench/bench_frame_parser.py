@@ -0,0 +1,113 @@
+"""Micro-benchmark for the Krita WebSocket frame parser.
+
+Feeds single text messages of 1 KB to 10 MB to the parser in chunk sizes
+typical for a socket read (one TCP segment, one TLS record, a large read)
+and compares FrameParser with the previous copy-the-whole-buffer loop.
+
+    python3 packages/krita-plugin/bench/bench_frame_parser.py
+"""
+
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "token_beam"))
+
+from websocket_frames import FrameParser  # noqa: E402
+
+MESSAGE_SIZES = (1_024, 10_240, 102_400, 1_048_576, 10_485_760)
+CHUNK_SIZES = (1_460, 16_384, 65_536)
+# The legacy loop copies the whole buffer per read; skip runs that would
+# copy more than this many bytes in total
+LEGACY_COPY_BUDGET = 2_000_000_000
+
+
+def _text_frame(payload):
+    length = len(payload)
+    if length < 126:
+        header = bytes([0x81, length])
+    elif length < 65536:
+        header = bytes([0x81, 126]) + struct.pack("!H", length)
+    else:
+        header = bytes([0x81, 127]) + struct.pack("!Q", length)
+    return header + payload
+
+
+class LegacyParser:
+    """The QByteArray loop SimpleWebSocket used before, with bytes in place of Qt."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        frames = []
+        while True:
+            data = bytes(self._buffer)
+            if len(data) < 2:
+                return frames
+            payload_len = data[1] & 0x7F
+            offset = 2
+            if payload_len == 126:
+                if len(data) < 4:
+                    return frames
+                payload_len = struct.unpack("!H", data[2:4])[0]
+                offset = 4
+            elif payload_len == 127:
+                if len(data) < 10:
+                    return frames
+                payload_len = struct.unpack("!Q", data[2:10])[0]
+                offset = 10
+            if len(data) < offset + payload_len:
+                return frames
+            frames.append(data[offset:offset + payload_len])
+            self._buffer = bytearray(data[offset + payload_len:])
+
+
+def _run_frame_parser(wire, chunk_size):
+    parser = FrameParser()
+    received = 0
+    for start in range(0, len(wire), chunk_size):
+        parser.feed(wire[start:start + chunk_size])
+        while True:
+            frame = parser.next_frame()
+            if frame is None:
+                break
+            received += len(frame[3])
+    return received
+
+
+def _run_legacy(wire, chunk_size):
+    parser = LegacyParser()
+    received = 0
+    for start in range(0, len(wire), chunk_size):
+        for payload in parser.feed(wire[start:start + chunk_size]):
+            received += len(payload)
+    return received
+
+
+def _time(func, wire, chunk_size, expected):
+    started = time.perf_counter()
+    received = func(wire, chunk_size)
+    elapsed = time.perf_counter() - started
+    assert received == expected, (received, expected)
+    return elapsed * 1000.0
+
+
+def main():
+    print(f"{'message':>10} {'chunk':>7} {'parser ms':>10} {'legacy ms':>10}")
+    for size in MESSAGE_SIZES:
+        payload = b"x" * size
+        wire = _text_frame(payload)
+        for chunk_size in CHUNK_SIZES:
+            parser_ms = _time(_run_frame_parser, wire, chunk_size, size)
+            if (size // chunk_size + 1) * size <= LEGACY_COPY_BUDGET:
+                legacy = f"{_time(_run_legacy, wire, chunk_size, size):>10.2f}"
+            else:
+                legacy = f"{'skipped':>10}"
+            print(f"{size:>10} {chunk_size:>7} {parser_ms:>10.2f} {legacy}")
+
+
+if __name__ == "__main__":
+    main()
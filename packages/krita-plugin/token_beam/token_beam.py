@@ -2,50 +2,116 @@
 # Syncs design tokens (colors) from any web app to Krita palettes in real-time
 
 import json
+from array import array
+from collections import OrderedDict, namedtuple
 import os
 import re
 import struct
 import sys
 import math
+import tempfile
+import threading
+import time
+import zlib
 
-from PyQt5.QtCore import QUrl, Qt, QTimer, QByteArray, QObject, pyqtSignal, QSize
-from PyQt5.QtGui import QFont, QIcon, QColor, QPainter, QCursor
+from PyQt5.QtCore import QUrl, Qt, QTimer, QByteArray, QObject, QEvent, QRect, pyqtSignal, QSize
+from PyQt5.QtGui import QFont, QIcon, QColor, QPainter, QCursor, QPixmap
 from PyQt5.QtNetwork import QTcpSocket, QAbstractSocket, QSslSocket
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QScrollArea,
-    QLineEdit, QPushButton, QLabel, QToolTip, QSizePolicy, QSpinBox
+    QWidget, QVBoxLayout, QHBoxLayout, QScrollArea,
+    QLineEdit, QPushButton, QLabel, QToolTip, QSizePolicy, QSpinBox,
+    QCheckBox, QFileDialog
 )
 
 from krita import DockWidget, DockWidgetFactory, DockWidgetFactoryBase, \
     Krita, ManagedColor
 
+from .token_beam_core import (
+    BINARY_ENCODING, TRACE_ENV, SyncTracer, hex_to_rgba8, iter_color_groups, message_fingerprint,
+    normalize_session_token, read_envelope, resolve_server_url
+)
+from .websocket_frames import DEFLATE_TAIL, MAX_MESSAGE_SIZE, FrameParser, MessageAssembler
+
 
 SYNC_SERVER_URL = "wss://tokenbeam.dev"
 
 
+# Outgoing messages smaller than this are sent uncompressed
+COMPRESSION_THRESHOLD = 1024
+
+# Quiet period after the last sync before auto-save writes the palette
+AUTOSAVE_DELAY_MS = 1500
+
+# Interval between round-trip pings while tracing
+PING_INTERVAL_MS = 2000
+
+# A sync is rendered once no newer one has arrived for this long; syncs
+# that arrive in the meantime replace it and restart the wait
+RENDER_DELAY_MS = 33
+
+# A steady stream of syncs still renders at least this often
+RENDER_MAX_WAIT_MS = 100
+
+def parse_deflate_extension(header_value):
+    """Parse a Sec-WebSocket-Extensions response header.
+
+    Returns the permessage-deflate parameters as a dict, or None when the
+    server did not accept the extension.
+    """
+    for extension in header_value.split(","):
+        parts = [part.strip() for part in extension.split(";")]
+        if parts[0].lower() != "permessage-deflate":
+            continue
+        params = {}
+        for part in parts[1:]:
+            name, _, value = part.partition("=")
+            params[name.strip().lower()] = value.strip().strip('"')
+        return params
+    return None
+
+
+def window_bits(params, name):
+    """LZ77 window size of a permessage-deflate parameter, 15 if absent."""
+    value = (params or {}).get(name)
+    return int(value) if value else 15
+
+
 # ---------------------------------------------------------------------------
 # Minimal WebSocket client using QTcpSocket
 # (Krita doesn't ship PyQt5.QtWebSockets)
 # ---------------------------------------------------------------------------
 
 class SimpleWebSocket(QObject):
-    """Bare-bones RFC 6455 WebSocket client over QTcpSocket."""
+    """Bare-bones RFC 6455 WebSocket client over QTcpSocket.
+
+    Only the handshake is handled on the UI thread. Every byte read after
+    it goes to a FrameDecoder, which parses frames, reassembles and
+    inflates messages (RFC 7692 permessage-deflate is negotiated) and runs
+    them through ``decode`` on a background thread; its results are
+    emitted as ``messageDecoded``. Messages over ``max_message_size``
+    bytes are discarded as they stream in.
+    """
 
     connected = pyqtSignal()
-    textMessageReceived = pyqtSignal(str)
+    messageDecoded = pyqtSignal(object)
     disconnected = pyqtSignal()
     error = pyqtSignal(str)
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, max_message_size=MAX_MESSAGE_SIZE, decode=None):
         super().__init__(parent)
         self._socket = QSslSocket(self)
         self._host = ""
         self._port = 80
         self._path = "/"
         self._handshake_done = False
-        self._buffer = QByteArray()
+        self._handshake = bytearray()
+        self._max_message_size = max_message_size
+        self._decode = decode if decode is not None else list
+        self._decoder = None
         self._closing = False
         self._using_ssl = False
+        self._deflate = None
+        self._deflater = None
 
         self._socket.connected.connect(self._on_tcp_connected)
         self._socket.encrypted.connect(self._on_tcp_connected)
@@ -58,9 +124,12 @@ class SimpleWebSocket(QObject):
 
     def open(self, url_str):
         self._handshake_done = False
-        self._buffer = QByteArray()
+        self._handshake = bytearray()
+        self._stop_decoder()
         self._closing = False
         self._using_ssl = False
+        self._deflate = None
+        self._deflater = None
 
         if url_str.startswith("wss://"):
             self._using_ssl = True
@@ -93,11 +162,16 @@ class SimpleWebSocket(QObject):
         if not self._handshake_done:
             return
         payload = text.encode("utf-8")
-        frame = self._build_frame(0x1, payload)
+        compressed = False
+        if self._deflate is not None and len(payload) >= COMPRESSION_THRESHOLD:
+            payload = self._compress(payload)
+            compressed = True
+        frame = self._build_frame(0x1, payload, compressed)
         self._socket.write(frame)
 
     def close(self):
         self._closing = True
+        self._stop_decoder()
         if self._handshake_done:
             try:
                 self._socket.write(self._build_frame(0x8, b""))
@@ -123,68 +197,77 @@ class SimpleWebSocket(QObject):
             "Connection: Upgrade\r\n"
             "Sec-WebSocket-Key: {key}\r\n"
             "Sec-WebSocket-Version: 13\r\n"
+            "Sec-WebSocket-Extensions: permessage-deflate; client_max_window_bits\r\n"
             "\r\n"
         ).format(path=self._path, host=self._host,
                  port=self._port, key=self._ws_key)
         self._socket.write(QByteArray(handshake.encode("ascii")))
 
     def _on_data(self):
-        self._buffer.append(self._socket.readAll())
-        if not self._handshake_done:
-            data = bytes(self._buffer)
-            idx = data.find(b"\r\n\r\n")
-            if idx == -1:
-                return
-            header_block = data[:idx].decode("ascii", errors="replace")
-            if "101" in header_block.split("\r\n")[0]:
-                self._handshake_done = True
-                self._buffer = QByteArray(data[idx + 4:])
-                self.connected.emit()
-            else:
-                self.error.emit("WebSocket handshake failed")
-                self._socket.disconnectFromHost()
-                return
-        self._parse_frames()
-
-    def _parse_frames(self):
-        while True:
-            data = bytes(self._buffer)
-            if len(data) < 2:
-                return
-            opcode = data[0] & 0x0F
-            masked = (data[1] >> 7) & 1
-            payload_len = data[1] & 0x7F
-            offset = 2
-            if payload_len == 126:
-                if len(data) < 4:
-                    return
-                payload_len = struct.unpack("!H", data[2:4])[0]
-                offset = 4
-            elif payload_len == 127:
-                if len(data) < 10:
-                    return
-                payload_len = struct.unpack("!Q", data[2:10])[0]
-                offset = 10
-            if masked:
-                offset += 4
-            if len(data) < offset + payload_len:
-                return
-            payload = data[offset:offset + payload_len]
-            self._buffer = QByteArray(data[offset + payload_len:])
-            if opcode == 0x1:
-                try:
-                    self.textMessageReceived.emit(payload.decode("utf-8"))
-                except Exception:
-                    pass
-            elif opcode == 0x8:
-                self._socket.disconnectFromHost()
-                return
-            elif opcode == 0x9:
-                self._socket.write(self._build_frame(0xA, payload))
+        read_at = time.perf_counter()
+        data = self._socket.readAll().data()
+        if self._decoder is not None:
+            self._decoder.feed(data, read_at)
+            return
+        if self._handshake_done:
+            return
+        self._handshake += data
+        end = self._handshake.find(b"\r\n\r\n")
+        if end < 0:
+            return
+        header = bytes(self._handshake[:end])
+        rest = bytes(self._handshake[end + 4:])
+        self._handshake = bytearray()
+        header_lines = header.decode("ascii", errors="replace").split("\r\n")
+        if "101" not in header_lines[0]:
+            self.error.emit("WebSocket handshake failed")
+            self._socket.disconnectFromHost()
+            return
+        self._handshake_done = True
+        for line in header_lines[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "sec-websocket-extensions":
+                self._deflate = parse_deflate_extension(value)
+        decoder = FrameDecoder(self._decode, self._deflate, self._max_message_size, self)
+        decoder.decoded.connect(self._on_decoded)
+        decoder.control.connect(self._on_control_frame)
+        decoder.failed.connect(self._on_decode_failed)
+        self._decoder = decoder
+        self.connected.emit()
+        if rest:
+            decoder.feed(rest, read_at)
+
+    def _on_decoded(self, result):
+        self.messageDecoded.emit(result)
+
+    def _on_control_frame(self, opcode, payload):
+        if opcode == 0x8:
+            self._socket.disconnectFromHost()
+        elif opcode == 0x9 and self._handshake_done:
+            self._socket.write(self._build_frame(0xA, payload))
+
+    def _on_decode_failed(self, message, fatal):
+        self.error.emit(message)
+        if fatal:
+            self.close()
+
+    def _stop_decoder(self):
+        if self._decoder is not None:
+            self._decoder.stop()
+            self._decoder = None
+
+    def _compress(self, payload):
+        if self._deflater is None or "client_no_context_takeover" in self._deflate:
+            self._deflater = zlib.compressobj(
+                zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED,
+                -window_bits(self._deflate, "client_max_window_bits"),
+            )
+        data = self._deflater.compress(payload) + self._deflater.flush(zlib.Z_SYNC_FLUSH)
+        return data[:-len(DEFLATE_TAIL)]
 
-    def _build_frame(self, opcode, payload):
+    def _build_frame(self, opcode, payload, compressed=False):
         frame = bytearray()
-        frame.append(0x80 | opcode)
+        frame.append(0x80 | (0x40 if compressed else 0) | opcode)
         length = len(payload)
         if length < 126:
             frame.append(0x80 | length)
@@ -202,6 +285,7 @@ class SimpleWebSocket(QObject):
 
     def _on_tcp_disconnected(self):
         self._handshake_done = False
+        self._stop_decoder()
         self.disconnected.emit()
 
     def _on_tcp_error(self, socket_error):
@@ -210,90 +294,563 @@ class SimpleWebSocket(QObject):
 
 
 # ---------------------------------------------------------------------------
-# Color swatch widget — clickable colored square
+# Frame decoder — parses and decodes messages off the UI thread
+# ---------------------------------------------------------------------------
+
+# A complete message with its transfer stats: ``data`` is a ``str`` for
+# text and ``bytes`` for binary syncs; ``started`` and ``received`` are the
+# perf_counter times its first bytes were read and it was reassembled
+ReceivedMessage = namedtuple(
+    "ReceivedMessage", "data wire_bytes message_bytes inflate_ms started received")
+
+
+class FrameDecoder(QObject):
+    """Turns the bytes of a WebSocket connection into decoded messages on a
+    background thread.
+
+    SimpleWebSocket feeds it everything it reads after the handshake. One
+    thread, started with the decoder and ended by ``stop()``, waits for
+    bytes, parses frames, reassembles and inflates messages and passes
+    each batch of complete messages to ``decode``, which returns the
+    results to emit. Bytes that arrive while a batch is being decoded make
+    up the next batch, so a burst of messages is decoded together.
+    Results, control frames and errors come back through the signals,
+    which Qt delivers on the UI thread.
+    """
+
+    decoded = pyqtSignal(object)
+    # opcode and payload of a close or ping frame, for the socket to answer
+    control = pyqtSignal(int, bytes)
+    # message, whether the connection has to be closed
+    failed = pyqtSignal(str, bool)
+
+    def __init__(self, decode, deflate=None, max_message_size=MAX_MESSAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self._decode = decode
+        self._deflate = deflate
+        self._parser = FrameParser()
+        self._message = MessageAssembler(max_message_size)
+        self._inflater = None
+        if deflate is not None:
+            self._inflater = zlib.decompressobj(-window_bits(deflate, "server_max_window_bits"))
+        self._read_at = None
+        self._message_started = None
+        self._batch = []
+        self._wakeup = threading.Condition()
+        self._chunks = []
+        self._stopped = False
+        threading.Thread(target=self._run, name="token-beam-decode", daemon=True).start()
+
+    def feed(self, data, read_at):
+        """Queue bytes read from the socket at ``read_at`` (perf_counter)."""
+        with self._wakeup:
+            if self._stopped:
+                return
+            self._chunks.append((data, read_at))
+            self._wakeup.notify()
+
+    def stop(self):
+        """Drop queued bytes and end the thread; nothing is emitted once the
+        current batch ends."""
+        with self._wakeup:
+            self._stopped = True
+            self._chunks = []
+            self._wakeup.notify()
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not (self._chunks or self._stopped):
+                    self._wakeup.wait()
+                if self._stopped:
+                    return
+                chunks = self._chunks
+                self._chunks = []
+            for data, read_at in chunks:
+                self._read_at = read_at
+                self._parser.feed(data)
+                if not self._parse_frames():
+                    self.stop()
+                    break
+            batch = self._batch
+            self._batch = []
+            if batch:
+                for result in self._decode(batch):
+                    if self._stopped:
+                        break
+                    self.decoded.emit(result)
+
+    def _parse_frames(self):
+        """Consume every complete frame; False once the stream has ended."""
+        parser = self._parser
+        message = self._message
+        while True:
+            if parser.discarding:
+                # Rest of a discarded frame is still arriving
+                return True
+            if message.skipped_final:
+                self._message_done(message.finish())
+
+            header = parser.peek_header()
+            if header is None:
+                return True
+            fin, rsv1, opcode, payload_len = header
+
+            if opcode & 0x8:
+                # Control frames are never fragmented and may arrive
+                # between the fragments of a message
+                frame = parser.next_frame()
+                if frame is None:
+                    return True
+                if opcode == 0x8:
+                    self.control.emit(0x8, b"")
+                    return False
+                if opcode == 0x9:
+                    self.control.emit(0x9, bytes(frame[3]))
+                continue
+
+            if (opcode == 0x0) != message.active:
+                self.failed.emit("WebSocket protocol error: unexpected fragment", True)
+                return False
+            inflater = self._inflater if rsv1 else None
+
+            if not message.accepts(opcode, payload_len):
+                if opcode != 0x0:
+                    self._message_started = self._read_at
+                    message.start(opcode, inflater)
+                # A message already being discarded (e.g. for invalid UTF-8)
+                # keeps its reason; otherwise this frame is over the limit
+                message.discard(fin, oversized=not message.discarding)
+                parser.discard_frame(message.skip)
+                continue
+
+            frame = parser.next_frame()
+            if frame is None:
+                return True
+            if opcode != 0x0:
+                self._message_started = self._read_at
+                message.start(opcode, inflater)
+            data = message.add(frame[3], fin)
+            if fin:
+                self._message_done(data)
+
+    def _message_done(self, data):
+        message = self._message
+        if message.compressed and "server_no_context_takeover" in self._deflate:
+            self._inflater = zlib.decompressobj(
+                -window_bits(self._deflate, "server_max_window_bits"))
+        if message.oversized:
+            self.failed.emit("Dropped a {:.1f} MB message (limit {:.1f} MB)".format(
+                message.wire_bytes / 1048576.0, message.max_size / 1048576.0), False)
+            return
+        if message.opcode not in (0x1, 0x2) or data is None:
+            # Binary messages are syncs in BINARY_ENCODING
+            return
+        self._batch.append(ReceivedMessage(
+            data, message.wire_bytes, message.message_bytes, message.inflate_ms,
+            self._message_started, time.perf_counter()))
+
+
+# ---------------------------------------------------------------------------
+# Color swatch grid — one widget painting every swatch
 # ---------------------------------------------------------------------------
 
-class ColorSwatch(QWidget):
-    """A single clickable color tile."""
+class ColorSwatchGrid(QWidget):
+    """Grid of clickable square color tiles drawn by a single widget.
+
+    Colors are kept as a packed ARGB array and painted in horizontal tiles
+    that are cached as pixmaps, so only tiles intersecting the exposed area
+    are rendered and scrolling just blits them. The cache is dropped when
+    the width, column count or colors change. Clicks and tooltips are
+    resolved to a swatch index from the cursor position.
+    """
 
-    def __init__(self, hex_value, name, parent=None):
+    SPACING = 2
+    # Height of one cached pixmap tile, in device-independent pixels
+    TILE_HEIGHT = 256
+    # Tiles kept around at most; old ones are evicted first
+    MAX_TILES = 32
+
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self._hex = hex_value
-        self._name = name
-        self._qcolor = QColor(hex_value)
+        self._columns = 8
+        self._argb = array("I")
+        self._names = []
+        self._hex_values = []
+        self._tiles = OrderedDict()
         self.setCursor(QCursor(Qt.PointingHandCursor))
-        self.setToolTip("{}\n{}".format(name, hex_value))
-        # Expanding to fill available width, maintain square aspect ratio
-        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.setMinimumSize(20, 20)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
+
+    # -- data --------------------------------------------------------------
+
+    def set_colors(self, colors):
+        self._argb = array("I", (
+            (a << 24) | (r << 16) | (g << 8) | b for r, g, b, a in (c["rgba"] for c in colors)))
+        self._names = [c["name"] for c in colors]
+        self._hex_values = [c["value"] for c in colors]
+        self._invalidate()
+
+    def set_columns(self, columns):
+        if columns == self._columns:
+            return
+        self._columns = columns
+        self._invalidate()
+
+    def _invalidate(self):
+        self._tiles.clear()
+        self._update_height()
+        self.update()
+
+    # -- geometry ----------------------------------------------------------
+
+    def _pitch(self, width=None):
+        """Horizontal and vertical distance between swatch origins."""
+        if width is None:
+            width = self.width()
+        return (width + self.SPACING) / float(self._columns)
+
+    def _rows(self):
+        return (len(self._argb) + self._columns - 1) // self._columns
+
+    def hasHeightForWidth(self):
+        return True
+
+    def heightForWidth(self, width):
+        rows = self._rows()
+        if not rows:
+            return 0
+        # Keep swatches square
+        return int(round(rows * self._pitch(width))) - self.SPACING
+
+    def sizeHint(self):
+        width = max(self.width(), 32 * self._columns)
+        return QSize(width, self.heightForWidth(width))
+
+    def _update_height(self):
+        self.setMinimumHeight(self.heightForWidth(self.width()))
+        self.updateGeometry()
+
+    def resizeEvent(self, event):
+        if event.oldSize().width() != event.size().width():
+            self._tiles.clear()
+            self._update_height()
+        super().resizeEvent(event)
+
+    def index_at(self, pos):
+        """Swatch index under ``pos`` or -1 for gaps and empty cells."""
+        pitch = self._pitch()
+        if pitch <= self.SPACING or pos.x() < 0 or pos.y() < 0:
+            return -1
+        col = int(pos.x() / pitch)
+        row = int(pos.y() / pitch)
+        if col >= self._columns:
+            return -1
+        if pos.x() >= round((col + 1) * pitch) - self.SPACING or \
+                pos.y() >= round((row + 1) * pitch) - self.SPACING:
+            return -1
+        index = row * self._columns + col
+        return index if index < len(self._argb) else -1
+
+    # -- painting ----------------------------------------------------------
 
     def paintEvent(self, event):
+        if not self._argb:
+            return
+        exposed = event.rect()
+        first = max(0, exposed.top() // self.TILE_HEIGHT)
+        last = exposed.bottom() // self.TILE_HEIGHT
         p = QPainter(self)
+        for tile in range(first, last + 1):
+            p.drawPixmap(0, tile * self.TILE_HEIGHT, self._tile(tile))
+        p.end()
+
+    def _tile(self, tile):
+        pixmap = self._tiles.get(tile)
+        if pixmap is not None:
+            self._tiles.move_to_end(tile)
+            return pixmap
+
+        ratio = self.devicePixelRatioF()
+        width = max(1, self.width())
+        pixmap = QPixmap(int(width * ratio), int(self.TILE_HEIGHT * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+
+        top = tile * self.TILE_HEIGHT
+        pitch = self._pitch()
+        columns = self._columns
+        argb = self._argb
+        count = len(argb)
+        first_row = max(0, int(top / pitch))
+        last_row = min(self._rows() - 1, int((top + self.TILE_HEIGHT) / pitch))
+        p = QPainter(pixmap)
         p.setRenderHint(QPainter.Antialiasing, False)
-        p.fillRect(self.rect(), self._qcolor)
+        p.translate(0, -top)
+        for row in range(first_row, last_row + 1):
+            y = int(round(row * pitch))
+            height = int(round((row + 1) * pitch)) - self.SPACING - y
+            start = row * columns
+            for col in range(min(columns, count - start)):
+                x = int(round(col * pitch))
+                w = int(round((col + 1) * pitch)) - self.SPACING - x
+                p.fillRect(QRect(x, y, w, height), QColor.fromRgba(argb[start + col]))
         p.end()
 
+        self._tiles[tile] = pixmap
+        if len(self._tiles) > self.MAX_TILES:
+            self._tiles.popitem(last=False)
+        return pixmap
+
+    # -- interaction -------------------------------------------------------
+
+    def event(self, event):
+        if event.type() == QEvent.ToolTip:
+            index = self.index_at(event.pos())
+            if index < 0:
+                QToolTip.hideText()
+                event.ignore()
+            else:
+                QToolTip.showText(event.globalPos(), "{}\n{}".format(
+                    self._names[index], self._hex_values[index]), self)
+            return True
+        return super().event(event)
+
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
-            self._set_foreground()
+            index = self.index_at(event.pos())
+            if index >= 0:
+                set_foreground_color(QColor.fromRgba(self._argb[index]))
         super().mousePressEvent(event)
 
-    def _set_foreground(self):
-        """Set this color as Krita's foreground color."""
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def set_foreground_color(qcolor):
+    """Set ``qcolor`` as Krita's foreground color."""
+    try:
+        app = Krita.instance()
+        view = app.activeWindow().activeView()
+        # Use F32 for more accurate color representation
+        mc = ManagedColor("RGBA", "F32", "sRGB-elle-V2-srgbtrc.icc")
+        mc.setComponents([
+            qcolor.redF(),
+            qcolor.greenF(),
+            qcolor.blueF(),
+            1.0
+        ])
+        view.setForeGroundColor(mc)
+    except Exception:
+        pass
+
+
+def extract_colors(raw, payload_at):
+    """Pull color tokens out of the payload of a raw sync message.
+
+    Returns ``(colors, skipped)``: color dicts whose hex value is
+    canonicalised to ``#rrggbb`` (``#rrggbbaa`` when translucent) and
+    parsed into ``rgba`` bytes, and the number of tokens skipped for an
+    invalid hex value.
+    """
+    colors = []
+    skipped = 0
+    for collection, mode, tokens in iter_color_groups(raw, payload_at):
+        for name, value in tokens:
+            rgba = hex_to_rgba8(value)
+            if rgba is None:
+                skipped += 1
+                continue
+            if rgba[3] == 255:
+                value = "#{:02x}{:02x}{:02x}".format(*rgba[:3])
+            else:
+                value = "#{:02x}{:02x}{:02x}{:02x}".format(*rgba)
+            colors.append({
+                "name": name,
+                "value": value,
+                "rgba": rgba,
+                "collection": collection,
+                "mode": mode
+            })
+    return colors, skipped
+
+
+# What the decode thread hands the docker for one message: the envelope
+# fields and, for a sync, its extracted colors (None otherwise), the number
+# of invalid colors skipped, an error for a malformed payload, the trace
+# sync ID, ``(wire_bytes, message_bytes, inflate_ms)`` and the
+# perf_counter time decoding finished
+DecodedMessage = namedtuple(
+    "DecodedMessage", "fields colors skipped error sync_id stats decoded")
+
+
+class SyncDecoder:
+    """Decodes batches of received messages on FrameDecoder's thread.
+
+    Only the newest sync of a batch is extracted; the ones before it would
+    be replaced before they could be shown. Syncs that repeat the last one,
+    byte for byte or color for color, are dropped. Other messages are
+    passed on in order with their envelope fields.
+    """
+
+    def __init__(self, tracer):
+        self._tracer = tracer
+        self._last_fingerprint = None
+        self._last_colors = None
+
+    def __call__(self, messages):
+        envelopes = []
+        newest_sync = None
+        for message in messages:
+            fingerprint = message_fingerprint(message.data)
+            if fingerprint == self._last_fingerprint:
+                # Byte-identical resend of the last sync
+                continue
+            try:
+                fields, payload_at = read_envelope(message.data)
+            except ValueError:
+                continue
+            if fields.get("type") == "sync":
+                self._last_fingerprint = fingerprint
+                newest_sync = len(envelopes)
+            envelopes.append((message, fields, payload_at, time.perf_counter()))
+
+        results = []
+        for index, (message, fields, payload_at, parsed) in enumerate(envelopes):
+            stats = (message.wire_bytes, message.message_bytes, message.inflate_ms)
+            if fields.get("type") != "sync":
+                results.append(DecodedMessage(fields, None, 0, None, None, stats, parsed))
+            elif index == newest_sync:
+                result = self._decode_sync(message, fields, payload_at, parsed, stats)
+                if result is not None:
+                    results.append(result)
+        return results
+
+    def _decode_sync(self, message, fields, payload_at, parsed, stats):
+        tracer = self._tracer
+        sync_id = None
+        if tracer.enabled:
+            sync_id = tracer.next_sync_id()
+            sent_at = fields.get("sentAt")
+            if isinstance(sent_at, (int, float)):
+                tracer.add_since_epoch(sync_id, "network", sent_at, message.received)
+            if message.started is not None:
+                tracer.add(sync_id, "receive", message.started, message.received)
+            tracer.add(sync_id, "parse", message.received, parsed)
+
+        colors, skipped, error = [], 0, None
+        if payload_at is not None:
+            try:
+                with tracer.span(sync_id, "extract"):
+                    colors, skipped = extract_colors(message.data, payload_at)
+            except ValueError:
+                error = "Malformed sync message"
+        if colors and colors == self._last_colors:
+            # Only non-color tokens changed; nothing to redraw
+            return None
+        if colors:
+            self._last_colors = colors
+        return DecodedMessage(fields, colors, skipped, error, sync_id, stats, time.perf_counter())
+
+
+def palette_name(colors):
+    """Palette name for a color list: its first collection, if any."""
+    if colors and colors[0].get("collection"):
+        return colors[0]["collection"]
+    return "Token Beam"
+
+
+def format_gpl(name, columns, colors):
+    """Render colors as the text of a GIMP .gpl palette."""
+    lines = ["GIMP Palette", "Name: {}".format(name), "Columns: {}".format(columns), "#"]
+    for c_data in colors:
+        r, g, b, _a = c_data["rgba"]
+        lines.append("{:>3} {:>3} {:>3}\t{}".format(r, g, b, c_data["name"]))
+    lines.append("")
+    return "\n".join(lines)
+
+
+def write_text_atomic(path, text):
+    """Write ``text`` to ``path`` unless it already holds exactly that.
+
+    The data goes to a temporary file in the same directory that is then
+    renamed over ``path``, so readers never see a partial file. Returns
+    False when the write was skipped.
+    """
+    data = text.encode("utf-8")
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".token-beam-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
         try:
-            app = Krita.instance()
-            view = app.activeWindow().activeView()
-            # Use F32 for more accurate color representation
-            mc = ManagedColor("RGBA", "F32", "sRGB-elle-V2-srgbtrc.icc")
-            mc.setComponents([
-                self._qcolor.redF(),
-                self._qcolor.greenF(),
-                self._qcolor.blueF(),
-                1.0
-            ])
-            view.setForeGroundColor(mc)
-        except Exception:
+            os.remove(tmp_path)
+        except OSError:
             pass
-
-    def sizeHint(self):
-        return QSize(32, 32)
-    
-    def hasHeightForWidth(self):
-        return True
-    
-    def heightForWidth(self, width):
-        # Keep swatches square
-        return width
+        raise
+    return True
 
 
 # ---------------------------------------------------------------------------
-# Helpers
+# Palette writer — formats and writes .gpl files off the UI thread
 # ---------------------------------------------------------------------------
 
-def extract_colors(payload):
-    """Pull color tokens out of a DTCG-style sync payload."""
-    colors = []
-    if not payload or "collections" not in payload:
-        return colors
-    for collection in payload["collections"]:
-        for mode in collection.get("modes", []):
-            for token in mode.get("tokens", []):
-                if token.get("type") == "color":
-                    colors.append({
-                        "name": token["name"],
-                        "value": token["value"],
-                        "collection": collection.get("name", ""),
-                        "mode": mode.get("name", "")
-                    })
-    return colors
-
-
-def validate_token(raw):
-    """Validate and normalise a session token. Returns None on failure."""
-    stripped = raw.strip().replace("beam://", "")
-    if not re.match(r"^[0-9a-fA-F]+$", stripped):
-        return None
-    return "beam://" + stripped.upper()
+class PaletteWriter(QObject):
+    """Writes palettes on a background thread, one file at a time.
+
+    Requests made while a write is running are coalesced: only the most
+    recent one is written next. Results come back through the signals,
+    which Qt delivers on the UI thread.
+    """
+
+    # name, elapsed ms, whether the file changed
+    saved = pyqtSignal(str, float, bool)
+    # name, error message
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._pending = None
+        self._busy = False
+
+    def write(self, path, name, columns, colors):
+        with self._lock:
+            self._pending = (path, name, columns, colors)
+            if self._busy:
+                return
+            self._busy = True
+        threading.Thread(target=self._run, name="token-beam-palette", daemon=True).start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                job = self._pending
+                self._pending = None
+                if job is None:
+                    self._busy = False
+                    return
+            path, name, columns, colors = job
+            started = time.perf_counter()
+            try:
+                changed = write_text_atomic(path, format_gpl(name, columns, colors))
+            except (OSError, ValueError) as exc:
+                self.failed.emit(name, str(exc))
+                continue
+            self.saved.emit(name, (time.perf_counter() - started) * 1000.0, changed)
 
 
 # ---------------------------------------------------------------------------
@@ -311,6 +868,11 @@ class TokenBeamDocker(DockWidget):
         self._is_paired = False
         self._session_token = None
         self._columns = 8  # Default column count
+        self._last_stats = (0, 0, 0.0)
+        self._pending_sync = None
+        self._pending_since = None
+        self._tracer = SyncTracer(enabled=bool(os.environ.get(TRACE_ENV))
+                                  or self._read_setting("traceSyncs") == "true")
 
         # --- UI ---------------------------------------------------------------
         root = QWidget()
@@ -339,6 +901,17 @@ class TokenBeamDocker(DockWidget):
         token_row.addWidget(self._connect_btn)
         layout.addLayout(token_row)
 
+        # Sync server endpoint; empty uses SYNC_SERVER_URL
+        server_row = QHBoxLayout()
+        server_row.setSpacing(4)
+        server_row.addWidget(QLabel("Server:"))
+        self._server_input = QLineEdit()
+        self._server_input.setPlaceholderText(SYNC_SERVER_URL)
+        self._server_input.setText(self._read_setting("serverUrl"))
+        self._server_input.editingFinished.connect(self._on_server_changed)
+        server_row.addWidget(self._server_input, 1)
+        layout.addLayout(server_row)
+
         # Status
         self._status_label = QLabel("Disconnected")
         self._status_label.setWordWrap(True)
@@ -360,15 +933,11 @@ class TokenBeamDocker(DockWidget):
         layout.addLayout(col_row)
 
         # Color grid (scrollable)
-        self._color_grid_widget = QWidget()
-        self._color_grid = QGridLayout()
-        self._color_grid.setSpacing(2)
-        self._color_grid.setContentsMargins(0, 0, 0, 0)
-        self._color_grid_widget.setLayout(self._color_grid)
+        self._swatch_grid = ColorSwatchGrid()
 
         scroll = QScrollArea()
         scroll.setWidgetResizable(True)
-        scroll.setWidget(self._color_grid_widget)
+        scroll.setWidget(self._swatch_grid)
         scroll.setMinimumHeight(40)
         scroll.setFrameShape(scroll.NoFrame)
         layout.addWidget(scroll, 1)
@@ -379,8 +948,47 @@ class TokenBeamDocker(DockWidget):
         self._save_btn.setVisible(False)
         layout.addWidget(self._save_btn)
 
+        # Auto-save: rewrite the palette once syncs settle down
+        self._autosave_check = QCheckBox("Auto-save palette")
+        self._autosave_check.setChecked(self._read_setting("autoSavePalette") == "true")
+        self._autosave_check.toggled.connect(self._on_autosave_toggled)
+        layout.addWidget(self._autosave_check)
+
+        self._autosave_timer = QTimer(self)
+        self._autosave_timer.setSingleShot(True)
+        self._autosave_timer.setInterval(AUTOSAVE_DELAY_MS)
+        self._autosave_timer.timeout.connect(self._write_gpl_palette)
+
+        self._palette_writer = PaletteWriter(self)
+        self._palette_writer.saved.connect(self._on_palette_saved)
+        self._palette_writer.failed.connect(self._on_palette_failed)
+
         self._last_colors = None
 
+        # Tracing: per-stage percentiles and Chrome trace export
+        self._trace_check = QCheckBox("Trace syncs")
+        self._trace_check.setChecked(self._tracer.enabled)
+        self._trace_check.toggled.connect(self._on_trace_toggled)
+        layout.addWidget(self._trace_check)
+
+        self._trace_label = QLabel("")
+        self._trace_label.setWordWrap(True)
+        layout.addWidget(self._trace_label)
+
+        self._export_trace_btn = QPushButton("Export Trace...")
+        self._export_trace_btn.clicked.connect(self._on_export_trace)
+        layout.addWidget(self._export_trace_btn)
+
+        self._ping_timer = QTimer(self)
+        self._ping_timer.setInterval(PING_INTERVAL_MS)
+        self._ping_timer.timeout.connect(self._send_ping)
+
+        # Coalesces bursts of syncs: only the newest is rendered when it fires
+        self._render_timer = QTimer(self)
+        self._render_timer.setSingleShot(True)
+        self._render_timer.timeout.connect(self._render_pending_sync)
+        self._update_trace_widgets()
+
         root.setLayout(layout)
         self.setWidget(root)
 
@@ -400,34 +1008,47 @@ class TokenBeamDocker(DockWidget):
             self._set_status("Enter a session token")
             return
 
-        token = validate_token(raw)
+        token = normalize_session_token(raw)
         if token is None:
             self._set_status("Invalid token format")
             return
 
+        try:
+            url = resolve_server_url(SYNC_SERVER_URL, self._server_input.text())
+        except ValueError:
+            self._set_status("Invalid server URL")
+            return
+
         self._session_token = token
         self._token_input.setText(token)
-        self._connect(token)
+        self._connect(token, url)
+
+    def _on_server_changed(self):
+        self._write_setting("serverUrl", self._server_input.text().strip())
 
-    def _connect(self, token):
+    def _connect(self, token, url):
         self._generation += 1
         gen = self._generation
+        self._render_timer.stop()
+        self._pending_sync = None
+        self._pending_since = None
 
         self._set_status("Connecting...")
         self._connect_btn.setText("Cancel")
 
-        ws = SimpleWebSocket(self)
+        ws = SimpleWebSocket(self, decode=SyncDecoder(self._tracer))
         ws.connected.connect(lambda: self._on_open(gen))
-        ws.textMessageReceived.connect(lambda msg: self._on_message(msg, gen))
+        ws.messageDecoded.connect(lambda result: self._on_message(result, gen))
         ws.disconnected.connect(lambda: self._on_close(gen))
         ws.error.connect(lambda err: self._on_error(err, gen))
 
         self._ws = ws
-        ws.open(SYNC_SERVER_URL)
+        ws.open(url)
 
     def _disconnect(self):
         self._generation += 1
         self._is_paired = False
+        self._ping_timer.stop()
         old = self._ws
         self._ws = None
         self._session_token = None
@@ -445,32 +1066,35 @@ class TokenBeamDocker(DockWidget):
         self._ws.sendTextMessage(json.dumps({
             "type": "pair",
             "clientType": "krita",
-            "sessionToken": self._session_token
+            "sessionToken": self._session_token,
+            "encodings": [BINARY_ENCODING]
         }))
 
-    def _on_message(self, raw_msg, gen):
+    def _on_message(self, result, gen):
         if gen != self._generation or not self._ws:
             return
-        try:
-            msg = json.loads(raw_msg)
-        except json.JSONDecodeError:
-            return
-
+        msg = result.fields
         msg_type = msg.get("type")
+        tracer = self._tracer
 
         if msg_type == "pair":
             origin = msg.get("origin", "unknown")
             self._is_paired = True
             self._set_status("Paired with {} - waiting for data...".format(origin))
             self._connect_btn.setText("Disconnect")
+            if tracer.enabled:
+                self._ping_timer.start()
 
         elif msg_type == "sync":
-            colors = extract_colors(msg.get("payload"))
-            if colors:
-                self._apply_colors(colors)
-                self._set_status("{} colors synced".format(len(colors)))
-            else:
-                self._set_status("No colors found in payload")
+            # Decoded on the decode thread; a sync that arrives before the
+            # timer fires replaces this one and restarts the timer, up to
+            # RENDER_MAX_WAIT_MS after the first one that is still pending
+            self._pending_sync = result
+            now = time.perf_counter()
+            if self._pending_since is None:
+                self._pending_since = now
+            left_ms = RENDER_MAX_WAIT_MS - (now - self._pending_since) * 1000.0
+            self._render_timer.start(int(max(0, min(RENDER_DELAY_MS, left_ms))))
 
         elif msg_type == "error":
             err = msg.get("error", "Unknown error")
@@ -483,6 +1107,10 @@ class TokenBeamDocker(DockWidget):
                 self._set_status("Error: " + err)
 
         elif msg_type == "ping":
+            if tracer.ping_received():
+                # The server's reply to our own round-trip ping
+                self._update_trace_widgets()
+                return
             try:
                 self._ws.sendTextMessage(json.dumps({"type": "pong"}))
             except Exception:
@@ -493,6 +1121,7 @@ class TokenBeamDocker(DockWidget):
             return
         self._ws = None
         self._is_paired = False
+        self._ping_timer.stop()
         self._connect_btn.setText("Connect")
         self._set_status("Disconnected")
 
@@ -503,11 +1132,36 @@ class TokenBeamDocker(DockWidget):
 
     # -- color application -----------------------------------------------------
 
-    def _apply_colors(self, colors):
+    def _render_pending_sync(self):
+        result = self._pending_sync
+        self._pending_sync = None
+        self._pending_since = None
+        if result is None or not self._ws:
+            return
+        tracer = self._tracer
+        tracer.add(result.sync_id, "queue", result.decoded, time.perf_counter())
+        self._last_stats = result.stats
+        if result.error:
+            self._set_status(result.error)
+        elif result.colors:
+            with tracer.span(result.sync_id, "apply"):
+                self._apply_colors(result.colors, result.sync_id)
+            invalid = " ({} invalid skipped)".format(result.skipped) if result.skipped else ""
+            self._set_status("{} colors synced{}{}".format(
+                len(result.colors), invalid, self._transfer_summary()))
+        else:
+            self._set_status("No colors found in payload")
+        self._update_trace_widgets()
+
+    def _apply_colors(self, colors, sync_id=None):
         """Display synced colors in the grid."""
         self._last_colors = colors
-        self._rebuild_color_grid(colors)
+        with self._tracer.span(sync_id, "swatch-grid"):
+            self._swatch_grid.set_colors(colors)
         self._save_btn.setVisible(True)
+        if self._autosave_check.isChecked():
+            # Restarting the timer debounces bursts of syncs
+            self._autosave_timer.start()
 
         try:
             app = Krita.instance()
@@ -522,74 +1176,49 @@ class TokenBeamDocker(DockWidget):
         """Save the current synced colors as a .gpl palette file."""
         if not self._last_colors:
             return
-        self._write_gpl_palette(self._last_colors)
-        name = "Token Beam"
-        if self._last_colors and self._last_colors[0].get("collection"):
-            name = self._last_colors[0]["collection"]
-        self._set_status("Saved palette '{}' — restart Krita to see it "
-                         "in the Palette docker".format(name))
+        self._autosave_timer.stop()
+        self._write_gpl_palette()
+
+    def _on_autosave_toggled(self, checked):
+        self._write_setting("autoSavePalette", "true" if checked else "false")
+        if checked and self._last_colors:
+            self._autosave_timer.start()
+        elif not checked:
+            self._autosave_timer.stop()
+
+    def _on_palette_saved(self, name, elapsed_ms, changed):
+        if not changed:
+            self._set_status("Palette '{}' is up to date".format(name))
+            return
+        self._set_status("Saved palette '{}' in {:.1f} ms — restart Krita to "
+                         "see it in the Palette docker".format(name, elapsed_ms))
+
+    def _on_palette_failed(self, name, error):
+        self._set_status("Could not save palette '{}': {}".format(name, error))
 
     def _on_columns_changed(self, value):
-        """Update column count and rebuild grid if colors exist."""
+        """Update the column count; the grid repaints without rebuilding."""
         self._columns = value
-        if self._last_colors:
-            self._rebuild_color_grid(self._last_colors)
-
-    def _rebuild_color_grid(self, colors):
-        """Replace the color grid with new swatches."""
-        # Clear existing swatches
-        while self._color_grid.count():
-            item = self._color_grid.takeAt(0)
-            w = item.widget()
-            if w:
-                w.deleteLater()
-        
-        # Clear previous column stretches
-        for col in range(32):  # Clear up to max possible columns
-            self._color_grid.setColumnStretch(col, 0)
-
-        # Use the user-specified column count
-        cols = self._columns
-
-        for i, c_data in enumerate(colors):
-            row = i // cols
-            col = i % cols
-            swatch = ColorSwatch(c_data["value"], c_data["name"], self)
-            self._color_grid.addWidget(swatch, row, col)
-        
-        # Set equal column stretches for uniform width distribution
-        for col in range(cols):
-            self._color_grid.setColumnStretch(col, 1)
-
-    def _write_gpl_palette(self, colors):
-        """Persist colors as a .gpl file for next Krita startup."""
-        name = "Token Beam"
-        if colors and colors[0].get("collection"):
-            name = colors[0]["collection"]
-
-        lines = ["GIMP Palette", "Name: {}".format(name), "Columns: {}".format(self._columns), "#"]
-        for c_data in colors:
-            h = c_data["value"].lstrip("#")
-            if len(h) == 3:
-                h = "".join(ch * 2 for ch in h)
-            r = int(h[0:2], 16)
-            g = int(h[2:4], 16)
-            b = int(h[4:6], 16)
-            lines.append("{:>3} {:>3} {:>3}\t{}".format(r, g, b, c_data["name"]))
+        self._swatch_grid.set_columns(value)
+        if self._last_colors and self._autosave_check.isChecked():
+            self._autosave_timer.start()
 
+    def _write_gpl_palette(self):
+        """Persist the synced colors as a .gpl file for next Krita startup.
+
+        Formatting and writing happen on the palette writer's thread.
+        """
+        colors = self._last_colors
+        if not colors:
+            return
         palette_dir = self._get_palette_dir()
         if not palette_dir:
             return
 
+        name = palette_name(colors)
         safe_name = re.sub(r"[^a-zA-Z0-9_\- ]", "", name).strip() or "token-beam"
         filepath = os.path.join(palette_dir, safe_name + ".gpl")
-
-        try:
-            os.makedirs(palette_dir, exist_ok=True)
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write("\n".join(lines) + "\n")
-        except Exception:
-            pass
+        self._palette_writer.write(filepath, name, self._columns, colors)
 
     def _get_palette_dir(self):
         """Return the writable palettes directory for the current platform."""
@@ -614,11 +1243,75 @@ class TokenBeamDocker(DockWidget):
                              os.path.join(home, ".local", "share"))
         return os.path.join(xdg, "krita", "palettes")
 
+    # -- tracing ---------------------------------------------------------------
+
+    def _send_ping(self):
+        if not self._ws or not self._is_paired or not self._tracer.enabled:
+            self._ping_timer.stop()
+            return
+        self._tracer.ping_sent()
+        self._ws.sendTextMessage(json.dumps({"type": "ping"}))
+
+    def _on_trace_toggled(self, checked):
+        self._write_setting("traceSyncs", "true" if checked else "false")
+        tracer = self._tracer
+        if checked and not tracer.enabled:
+            tracer.clear()
+        tracer.enabled = checked or bool(os.environ.get(TRACE_ENV))
+        if tracer.enabled and self._is_paired:
+            self._ping_timer.start()
+        elif not tracer.enabled:
+            self._ping_timer.stop()
+        self._update_trace_widgets()
+
+    def _update_trace_widgets(self):
+        enabled = self._tracer.enabled
+        self._trace_label.setVisible(enabled)
+        self._export_trace_btn.setVisible(enabled)
+        if not enabled:
+            return
+        lines = ["Sync stages (p50 / p95 / p99 ms)"]
+        for stage, samples, p50, p95, p99 in self._tracer.percentiles():
+            lines.append("{}: {:.1f} / {:.1f} / {:.1f}  ({})".format(stage, p50, p95, p99, samples))
+        self._trace_label.setText("\n".join(lines))
+
+    def _on_export_trace(self):
+        path, _selected = QFileDialog.getSaveFileName(
+            self, "Export Trace", "token-beam-trace.json", "Chrome trace (*.json)")
+        if not path:
+            return
+        try:
+            self._tracer.write_chrome_trace(path)
+        except OSError as exc:
+            self._set_status("Could not write trace: {}".format(exc))
+            return
+        self._set_status("Saved trace to {}".format(path))
+
     # -- UI helpers ------------------------------------------------------------
 
+    def _transfer_summary(self):
+        """Describe how the last sync crossed the wire, if compressed."""
+        wire_bytes, message_bytes, inflate_ms = self._last_stats
+        if not wire_bytes or wire_bytes == message_bytes:
+            return ""
+        return " ({:.1f} KB on wire, {:.1f}x, inflate {:.1f} ms)".format(
+            wire_bytes / 1024.0, message_bytes / float(wire_bytes), inflate_ms)
+
     def _set_status(self, text):
         self._status_label.setText(text)
 
+    def _read_setting(self, name, default=""):
+        try:
+            return Krita.instance().readSetting("tokenBeam", name, default)
+        except Exception:
+            return default
+
+    def _write_setting(self, name, value):
+        try:
+            Krita.instance().writeSetting("tokenBeam", name, value)
+        except Exception:
+            pass
+
 
 # ---------------------------------------------------------------------------
 # Register
@@ -0,0 +1,310 @@
+# Token Beam for Krita
+# Incremental WebSocket frame parsing and message reassembly, kept free of
+# Qt so it can be benchmarked and reused outside Krita
+
+import codecs
+import struct
+import time
+
+
+# Largest message accepted, matching the sync server's maxPayload
+MAX_MESSAGE_SIZE = 10 * 1024 * 1024
+
+# RFC 7692: a compressed message is a raw DEFLATE stream whose final
+# empty stored block (these four bytes) is left off on the wire
+DEFLATE_TAIL = b"\x00\x00\xff\xff"
+
+# Inflated output of a discarded message is produced and dropped in
+# pieces of at most this size
+_DISCARD_CHUNK = 64 * 1024
+
+
+class FrameParser:
+    """Incremental RFC 6455 frame parser over a single growing buffer.
+
+    Incoming bytes are appended to one ``bytearray`` and consumed by
+    advancing a read offset, so each byte is copied in once and a payload
+    is copied out once. A frame header that has been parsed is remembered
+    while its payload is still arriving, and consumed bytes are only
+    discarded once they make up a large part of the buffer.
+    """
+
+    # Drop consumed bytes once at least this many have piled up
+    COMPACT_THRESHOLD = 64 * 1024
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._offset = 0
+        self._header = None
+        self._skip = 0
+        self._skip_sink = None
+
+    @property
+    def discarding(self):
+        """True while the payload of a discarded frame is still arriving."""
+        return self._skip > 0
+
+    def feed(self, data):
+        if self._skip:
+            count = min(self._skip, len(data))
+            self._drop(data[:count])
+            data = data[count:]
+        self._buffer += data
+
+    def peek_header(self):
+        """Parse the next frame header without consuming the frame.
+
+        Returns ``(fin, rsv1, opcode, payload_len)`` or None while the
+        header is still arriving, so callers can reject a frame before its
+        payload is buffered.
+        """
+        header = self._read_header()
+        if header is None:
+            return None
+        fin, rsv1, opcode, _masked, _header_len, payload_len = header
+        return fin, rsv1, opcode, payload_len
+
+    def next_frame(self):
+        """Return the next complete frame or None if it is still arriving.
+
+        Frames are ``(fin, rsv1, opcode, payload)`` tuples; ``payload`` is
+        unmasked ``bytes``.
+        """
+        header = self._read_header()
+        if header is None:
+            return None
+        fin, rsv1, opcode, masked, header_len, payload_len = header
+        buffer = self._buffer
+        if len(buffer) - self._offset < header_len + payload_len:
+            return None
+
+        start = self._offset + header_len
+        with memoryview(buffer) as view:
+            payload = bytes(view[start:start + payload_len])
+            if masked:
+                payload = _unmask(payload, bytes(view[start - 4:start]))
+        self._header = None
+        self._offset = start + payload_len
+        self._maybe_compact()
+        return fin, rsv1, opcode, payload
+
+    def discard_frame(self, sink=None):
+        """Drop the frame returned by peek_header() without buffering it.
+
+        Payload bytes already received are dropped now and the rest as
+        feed() receives them; ``discarding`` stays True until the last one
+        has passed. ``sink`` is called with each piece of the raw payload
+        before it is dropped.
+        """
+        _fin, _rsv1, _opcode, _masked, header_len, payload_len = self._header
+        self._header = None
+        self._offset += header_len
+        self._skip = payload_len
+        self._skip_sink = sink
+        count = min(payload_len, len(self._buffer) - self._offset)
+        if count:
+            with memoryview(self._buffer) as view:
+                self._drop(bytes(view[self._offset:self._offset + count]))
+            self._offset += count
+        self._maybe_compact()
+
+    def _read_header(self):
+        if self._header is not None:
+            return self._header
+        buffer = self._buffer
+        offset = self._offset
+        available = len(buffer) - offset
+        if available < 2:
+            return None
+        first = buffer[offset]
+        second = buffer[offset + 1]
+        payload_len = second & 0x7F
+        header_len = 2
+        if payload_len == 126:
+            if available < 4:
+                return None
+            payload_len = struct.unpack_from("!H", buffer, offset + 2)[0]
+            header_len = 4
+        elif payload_len == 127:
+            if available < 10:
+                return None
+            payload_len = struct.unpack_from("!Q", buffer, offset + 2)[0]
+            header_len = 10
+        masked = bool(second & 0x80)
+        if masked:
+            header_len += 4
+        self._header = (
+            bool(first & 0x80),
+            bool(first & 0x40),
+            first & 0x0F,
+            masked,
+            header_len,
+            payload_len,
+        )
+        return self._header
+
+    def _drop(self, data):
+        self._skip -= len(data)
+        sink = self._skip_sink
+        if not self._skip:
+            self._skip_sink = None
+        if sink is not None and data:
+            sink(data)
+
+    def _maybe_compact(self):
+        offset = self._offset
+        if offset == len(self._buffer):
+            # Everything consumed: start over without moving any bytes
+            self._buffer.clear()
+        elif offset < self.COMPACT_THRESHOLD or offset * 2 < len(self._buffer):
+            return
+        else:
+            del self._buffer[:offset]
+        self._offset = 0
+
+
+def _unmask(payload, mask):
+    length = len(payload)
+    if not length:
+        return payload
+    key = int.from_bytes((mask * (length // 4 + 1))[:length], "big")
+    return (int.from_bytes(payload, "big") ^ key).to_bytes(length, "big")
+
+
+class MessageAssembler:
+    """Reassembles fragmented data messages under a size limit.
+
+    Fragments are decoded as they arrive: compressed payloads go through the
+    connection's inflater and text goes through an incremental UTF-8
+    decoder, so continuation frames can split a multi-byte character or a
+    DEFLATE block anywhere. A message that grows past ``max_size``, on the
+    wire or once inflated, is discarded instead: later fragments are only
+    counted, except that compressed ones still pass through the inflater
+    (output thrown away) so the shared context stays valid for the next
+    message.
+    """
+
+    def __init__(self, max_size=MAX_MESSAGE_SIZE):
+        self.max_size = max_size
+        self.reset()
+
+    def reset(self):
+        self.active = False
+        self.discarding = False
+        self.oversized = False
+        self.skipped_final = False
+        self.wire_bytes = 0
+        self.message_bytes = 0
+        self.inflate_ms = 0.0
+        self.opcode = None
+        self._inflater = None
+        self._decoder = None
+        self._parts = []
+
+    @property
+    def compressed(self):
+        return self._inflater is not None
+
+    def accepts(self, opcode, payload_len):
+        """Whether a frame should be read rather than discarded.
+
+        False for continuations of a discarded message and for frames that
+        would push the message past ``max_size``.
+        """
+        if opcode != 0x0:
+            return payload_len <= self.max_size
+        return not self.discarding and self.wire_bytes + payload_len <= self.max_size
+
+    def start(self, opcode, inflater=None):
+        """Begin a message; ``inflater`` is given when its RSV1 bit is set."""
+        self.reset()
+        self.active = True
+        self.opcode = opcode
+        self._inflater = inflater
+        if opcode == 0x1:
+            self._decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def add(self, payload, fin):
+        """Append one fragment.
+
+        Returns the finished message (``str`` for text, ``bytes`` otherwise)
+        when ``fin`` completes it, or None while incomplete or discarded.
+        """
+        self.wire_bytes += len(payload)
+        if self.discarding:
+            self._skip_inflate(payload)
+        else:
+            data = payload
+            if self._inflater is not None:
+                data = self._inflate(payload, fin)
+            if data is not None:
+                self._append(data, fin)
+        if not fin:
+            return None
+        return self.finish()
+
+    def discard(self, fin, oversized=True):
+        """Discard the rest of the message, starting with the current frame.
+
+        Feed the frame's payload to ``skip``; once the frame marked ``fin``
+        has passed, ``skipped_final`` is set and ``finish()`` ends the
+        message.
+        """
+        self.discarding = True
+        self.oversized = self.oversized or oversized
+        self.skipped_final = fin
+        self._parts = []
+        self._decoder = None
+
+    def skip(self, data):
+        """Sink for the payload of a discarded frame."""
+        self.wire_bytes += len(data)
+        self._skip_inflate(data)
+
+    def finish(self):
+        """End the message; returns it, or None if it was discarded."""
+        self.active = False
+        self.skipped_final = False
+        if self.discarding:
+            self._skip_inflate(DEFLATE_TAIL)
+            return None
+        parts = self._parts
+        self._parts = []
+        if self._decoder is not None:
+            return "".join(parts)
+        return b"".join(parts)
+
+    def _append(self, data, fin):
+        self.message_bytes += len(data)
+        if self._decoder is None:
+            self._parts.append(data)
+            return
+        try:
+            self._parts.append(self._decoder.decode(data, fin))
+        except UnicodeDecodeError:
+            self.discard(fin, oversized=False)
+
+    def _inflate(self, payload, fin):
+        inflater = self._inflater
+        started = time.perf_counter()
+        # Ask for one byte more than the budget so overflow is detectable
+        # without inflating the whole message
+        budget = self.max_size - self.message_bytes + 1
+        data = inflater.decompress(payload, budget)
+        if fin and not inflater.unconsumed_tail and len(data) < budget:
+            data += inflater.decompress(DEFLATE_TAIL, budget - len(data))
+        self.inflate_ms += (time.perf_counter() - started) * 1000.0
+        if inflater.unconsumed_tail or len(data) >= budget:
+            tail = inflater.unconsumed_tail
+            self.discard(fin)
+            self._skip_inflate(tail)
+            return None
+        return data
+
+    def _skip_inflate(self, data):
+        inflater = self._inflater
+        if inflater is None:
+            return
+        while data:
+            inflater.decompress(data, _DISCARD_CHUNK)
+            data = inflater.unconsumed_tail
@@ -7,6 +7,10 @@ export interface SyncMessage<T = unknown> {
   clientType?: string;
   origin?: string;
   icon?: SyncIcon;
+  /** Sync encodings a target client can decode besides JSON, in order of preference (`pair` only). */
+  encodings?: string[];
+  /** The encoding the server picked from `encodings` (`pair` reply only). */
+  encoding?: string;
   payload?: T;
   error?: string;
   warning?: string;
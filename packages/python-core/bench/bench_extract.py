@@ -0,0 +1,104 @@
+"""Compare the streaming color extractor with json.loads plus a walk.
+
+Builds synthetic sync messages where a quarter of the tokens are not
+colors (numbers with nested extensions), then reports the best-of time
+and the tracemalloc peak for both approaches, and for the same messages
+in the binary encoding. Message sizes are given raw and deflated the
+way permessage-deflate sends them.
+
+    python3 packages/python-core/bench/bench_extract.py
+"""
+
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from payloads import make_binary_message, make_message  # noqa: E402
+from token_beam_core import iter_color_groups, read_envelope  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000)
+# Best-of count for 100,000 tokens; smaller messages get proportionally more
+REPEATS = 15
+
+
+def _loads_and_walk(raw):
+    groups = []
+    for collection in json.loads(raw)["payload"].get("collections", []):
+        for mode in collection.get("modes", []):
+            groups.append((
+                collection.get("name", ""),
+                mode.get("name", ""),
+                tuple(
+                    (token.get("name", "unnamed"), str(token.get("value", "")))
+                    for token in mode.get("tokens", [])
+                    if token.get("type") == "color"
+                ),
+            ))
+    return groups
+
+
+def _streaming(raw):
+    _fields, payload_at = read_envelope(raw)
+    return list(iter_color_groups(raw, payload_at))
+
+
+def _best_ms(runs, repeats):
+    """Best-of time of each ``(func, raw)`` in ``runs``, in ms.
+
+    The runs are interleaved, each after a full collection, so that drift in
+    machine speed and garbage left by one extractor do not favour another.
+    """
+    best = [float("inf")] * len(runs)
+    for _ in range(repeats):
+        for index, (func, raw) in enumerate(runs):
+            gc.collect()
+            started = time.perf_counter()
+            func(raw)
+            best[index] = min(best[index], time.perf_counter() - started)
+    return [value * 1000.0 for value in best]
+
+
+def _peak_kb(func, raw):
+    tracemalloc.start()
+    result = func(raw)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024.0, result
+
+
+def _deflated_kb(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) / 1024.0
+
+
+def main():
+    print(f"{'tokens':>8} {'JSON KB':>8} {'bin KB':>7} {'JSON zKB':>9} {'bin zKB':>8} "
+          f"{'loads ms':>9} {'stream ms':>10} {'binary ms':>10} "
+          f"{'loads KB':>9} {'stream KB':>10} {'binary KB':>10}")
+    for size in SIZES:
+        raw = make_message(size)
+        binary = make_binary_message(size)
+        loads_ms, stream_ms, binary_ms = _best_ms(
+            [(_loads_and_walk, raw), (_streaming, raw), (_streaming, binary)],
+            max(REPEATS, REPEATS * SIZES[-1] // size))
+        loads_kb, expected = _peak_kb(_loads_and_walk, raw)
+        stream_kb, result = _peak_kb(_streaming, raw)
+        assert result == expected
+        binary_kb, result = _peak_kb(_streaming, binary)
+        assert result == expected
+        print(f"{size:>8} {len(raw) / 1024.0:>8.0f} {len(binary) / 1024.0:>7.0f} "
+              f"{_deflated_kb(raw):>9.0f} {_deflated_kb(binary):>8.0f} "
+              f"{loads_ms:>9.2f} {stream_ms:>10.2f} {binary_ms:>10.2f} "
+              f"{loads_kb:>9.0f} {stream_kb:>10.0f} {binary_kb:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
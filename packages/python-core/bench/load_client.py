@@ -0,0 +1,206 @@
+"""Headless receiver clients for stress-testing against the stand-in server.
+
+Opens ``--clients`` connections that pair like the plugins do, then run
+every sync through the plugins' shared extraction path (read_envelope,
+iter_color_groups and hex validation) and report throughput and latency
+percentiles:
+
+    python3 packages/python-core/bench/standin_server.py --storm --token ABC123 --rate 0
+    python3 packages/python-core/bench/load_client.py --token ABC123 --clients 4
+
+Latency is measured from the ``sentAt`` stamp storm syncs carry, so both
+processes have to share a clock; ``network`` ends when the message has
+been reassembled and ``end-to-end`` when its colors are decoded.
+``--slow-reader`` sleeps after every message to push backpressure onto
+the server, and ``--reconnect`` pairs again after a disconnect.
+``--binary`` asks for syncs in the binary encoding instead of JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(1, os.path.dirname(HERE))
+
+from token_beam_core import (  # noqa: E402
+    BINARY_ENCODING, hex_to_rgba8, iter_color_groups, normalize_session_token, percentile,
+    read_envelope, resolve_server_url,
+)
+from ws_asyncio import ConnectionClosed, ProtocolError, connect  # noqa: E402
+
+DEFAULT_URL = "ws://127.0.0.1:8765"
+
+
+class ClientStats:
+    def __init__(self):
+        self.syncs = 0
+        self.colors = 0
+        self.message_bytes = 0
+        self.gaps = 0
+        self.reconnects = 0
+        self.errors = []
+        self.network_ms = []
+        self.end_to_end_ms = []
+        self.decode_ms = []
+        self.ping_ms = []
+        self.last_seq = None
+
+
+def _decode(raw):
+    """Run a message through the plugins' extraction path."""
+    fields, payload_at = read_envelope(raw)
+    colors = 0
+    if fields.get("type") == "sync" and payload_at is not None:
+        for _collection, _mode, tokens in iter_color_groups(raw, payload_at):
+            colors += sum(1 for _name, value in tokens if hex_to_rgba8(value) is not None)
+    return fields, colors
+
+
+async def _pinger(ws, interval, pending):
+    while True:
+        await asyncio.sleep(interval)
+        pending.append(time.perf_counter())
+        await ws.send(json.dumps({"type": "ping"}))
+
+
+async def run_client(url, token, client_type, stats, options, deadline):
+    while time.time() < deadline:
+        try:
+            ws = await connect(url, deflate=not options.no_deflate)
+        except (OSError, ProtocolError) as exc:
+            stats.errors.append(str(exc))
+            return
+        pinger = None
+        pending_pings = []
+        try:
+            pair = {"type": "pair", "clientType": client_type, "sessionToken": token}
+            if options.binary:
+                pair["encodings"] = [BINARY_ENCODING]
+            await ws.send(json.dumps(pair))
+            if options.ping_interval > 0:
+                pinger = asyncio.ensure_future(_pinger(ws, options.ping_interval, pending_pings))
+            while time.time() < deadline:
+                remaining = deadline - time.time()
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                received = time.time()
+                started = time.perf_counter()
+                fields, colors = _decode(raw)
+                decoded = time.perf_counter()
+                kind = fields.get("type")
+                if kind == "sync":
+                    stats.syncs += 1
+                    stats.colors += colors
+                    stats.message_bytes += len(raw)
+                    stats.decode_ms.append((decoded - started) * 1000.0)
+                    sent_at = fields.get("sentAt")
+                    if isinstance(sent_at, (int, float)):
+                        stats.network_ms.append(received * 1000.0 - sent_at)
+                        stats.end_to_end_ms.append(
+                            received * 1000.0 - sent_at + (decoded - started) * 1000.0)
+                    seq = fields.get("seq")
+                    if isinstance(seq, int):
+                        if stats.last_seq is not None and seq > stats.last_seq + 1:
+                            stats.gaps += seq - stats.last_seq - 1
+                        stats.last_seq = seq
+                    if options.slow_reader > 0:
+                        await asyncio.sleep(options.slow_reader / 1000.0)
+                    if options.count and stats.syncs >= options.count:
+                        await ws.close()
+                        return
+                elif kind == "ping" and pending_pings:
+                    stats.ping_ms.append((time.perf_counter() - pending_pings.pop(0)) * 1000.0)
+                elif kind == "error":
+                    stats.errors.append(str(fields.get("error")))
+                    if fields.get("error") == "Invalid session token":
+                        await ws.close()
+                        return
+            await ws.close()
+            return
+        except (ConnectionClosed, ProtocolError):
+            pass
+        finally:
+            if pinger is not None:
+                pinger.cancel()
+        if not options.reconnect:
+            return
+        stats.reconnects += 1
+        # Storm seqs restart on a new connection
+        stats.last_seq = None
+        await asyncio.sleep(options.reconnect_delay / 1000.0)
+
+
+def _summary(label, samples):
+    if not samples:
+        return f"  {label:<12} no samples"
+    return (f"  {label:<12} p50 {percentile(samples, 0.50):8.2f} ms   "
+            f"p95 {percentile(samples, 0.95):8.2f} ms   "
+            f"p99 {percentile(samples, 0.99):8.2f} ms   max {max(samples):8.2f} ms")
+
+
+def report(all_stats, elapsed):
+    syncs = sum(stats.syncs for stats in all_stats)
+    message_bytes = sum(stats.message_bytes for stats in all_stats)
+    print(f"{len(all_stats)} clients, {elapsed:.1f} s: {syncs} syncs "
+          f"({syncs / elapsed:.1f}/s), {message_bytes / elapsed / 1048576.0:.2f} MB/s decoded, "
+          f"{sum(stats.colors for stats in all_stats)} colors")
+    print(f"  gaps {sum(stats.gaps for stats in all_stats)} syncs, "
+          f"reconnects {sum(stats.reconnects for stats in all_stats)}")
+    merged = lambda name: [sample for stats in all_stats for sample in getattr(stats, name)]
+    print(_summary("network", merged("network_ms")))
+    print(_summary("decode", merged("decode_ms")))
+    print(_summary("end-to-end", merged("end_to_end_ms")))
+    print(_summary("ping rtt", merged("ping_ms")))
+    errors = merged("errors")
+    if errors:
+        print(f"  errors: {len(errors)} (first: {errors[0]})")
+
+
+async def run(options):
+    url = resolve_server_url(DEFAULT_URL, options.url or "")
+    token = normalize_session_token(options.token)
+    if token is None:
+        raise SystemExit(f"Invalid session token: {options.token!r}")
+    all_stats = [ClientStats() for _ in range(options.clients)]
+    started = time.time()
+    deadline = started + options.duration
+    await asyncio.gather(*(
+        run_client(url, token, options.client_type, stats, options, deadline)
+        for stats in all_stats
+    ))
+    report(all_stats, max(time.time() - started, 1e-9))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help=f"sync server (default: $TOKEN_BEAM_SYNC_URL or {DEFAULT_URL})")
+    parser.add_argument("--token", required=True, help="session token to pair with")
+    parser.add_argument("--clients", type=int, default=1)
+    parser.add_argument("--client-type", default="blender")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run at most")
+    parser.add_argument("--count", type=int, default=0,
+                        help="stop each client after this many syncs")
+    parser.add_argument("--slow-reader", type=float, default=0.0,
+                        help="milliseconds to sleep after each sync")
+    parser.add_argument("--ping-interval", type=float, default=1.0,
+                        help="seconds between pings, 0 to disable")
+    parser.add_argument("--reconnect", action="store_true", help="pair again after a disconnect")
+    parser.add_argument("--reconnect-delay", type=float, default=250.0,
+                        help="milliseconds to wait before reconnecting")
+    parser.add_argument("--no-deflate", action="store_true", help="do not offer permessage-deflate")
+    parser.add_argument("--binary", action="store_true",
+                        help=f"ask for syncs in the {BINARY_ENCODING} encoding")
+    options = parser.parse_args(argv)
+    asyncio.run(run(options))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Synthetic sync messages shared by the benchmarks.
+
+Tokens are spread over several collections and modes. A quarter of them
+are not colors: numbers with nested extensions that the extractors have
+to skip.
+"""
+
+import json
+import os
+import random
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from token_beam_core import BINARY_MAGIC, BINARY_TOKEN_TYPES  # noqa: E402
+
+_TYPE_CODES = {name: code for code, name in enumerate(BINARY_TOKEN_TYPES)}
+
+COLLECTIONS = 4
+MODES = 3
+
+
+def make_payload(count, collections=COLLECTIONS, modes=MODES, seed=None, changed=0.0,
+                 revision=0):
+    """Build the payload of a sync message with about ``count`` tokens.
+
+    ``changed`` is the fraction of color values that differ from the
+    payload built with the same arguments and ``changed=0``, for timing
+    incremental updates. Each ``revision`` changes a different subset.
+    """
+    seed = count if seed is None else seed
+    rng = random.Random(seed)
+    drift = random.Random(-1 - seed - revision * 1_000_003)
+    per_mode = max(1, count // (collections * modes))
+    result = []
+    for c in range(collections):
+        mode_list = []
+        for m in range(modes):
+            tokens = []
+            for i in range(per_mode):
+                if i % 4 == 3:
+                    tokens.append({
+                        "name": f"space/{i}",
+                        "type": "number",
+                        "value": i * 4,
+                        "$extensions": {"scale": [1, 2, 4, 8], "note": "x" * 24},
+                    })
+                    continue
+                value = rng.randrange(1 << 24)
+                if changed and drift.random() < changed:
+                    value ^= 0x010101
+                tokens.append({
+                    "name": f"color/{c}/{m}/{i}",
+                    "type": "color",
+                    "value": f"#{value:06x}",
+                })
+            mode_list.append({"name": f"Mode {m}", "tokens": tokens})
+        result.append({"name": f"Collection {c}", "modes": mode_list})
+    return {"collections": result}
+
+
+def make_message(count, **options):
+    """Serialise make_payload() as a raw sync-server message."""
+    return json.dumps({"type": "sync", "payload": make_payload(count, **options)})
+
+
+def encode_binary(fields, payload):
+    """Encode a sync as a BINARY_ENCODING message, as the sync server does.
+
+    ``fields`` is the envelope without ``payload``. Returns None when the
+    payload cannot be encoded (a NUL in one of its strings), in which case
+    the server sends JSON.
+    """
+    counts = [len(payload["collections"])]
+    strings = []
+    types = bytearray()
+    for collection in payload["collections"]:
+        counts.append(len(collection["modes"]))
+        strings.append(collection["name"])
+        for mode in collection["modes"]:
+            tokens = mode["tokens"]
+            counts.append(len(tokens))
+            strings.append(mode["name"])
+            strings.extend(token["name"] for token in tokens)
+            for token in tokens:
+                value = token["value"]
+                strings.append(value if isinstance(value, str)
+                               else json.dumps(value, separators=(",", ":")))
+                types.append(_TYPE_CODES[token["type"]])
+    if any("\x00" in string for string in strings):
+        return None
+    header = json.dumps(fields, separators=(",", ":")).encode("utf-8")
+    blob = "\x00".join(strings).encode("utf-8")
+    return b"".join((
+        BINARY_MAGIC, struct.pack("<I", len(header)), header,
+        struct.pack(f"<{len(counts) + 1}I", len(counts), *counts),
+        struct.pack("<I", len(blob)), blob, bytes(types),
+    ))
+
+
+def make_binary_message(count, **options):
+    """make_message(), encoded with encode_binary()."""
+    return encode_binary({"type": "sync"}, make_payload(count, **options))
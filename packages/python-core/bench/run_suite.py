@@ -0,0 +1,373 @@
+"""Headless benchmark suite for the Blender and Krita plugins.
+
+Loads both plugins against the stub ``bpy``, ``krita`` and PyQt5 modules
+in ``stubs/`` and times each stage of a sync, from the session token to
+the palette file, on synthetic payloads. The stubs model the cost
+structure of RNA collections and widget painting, not their absolute
+speed, so compare numbers between commits on the same machine rather
+than with timings taken inside Blender or Krita.
+
+    python3 packages/python-core/bench/run_suite.py
+    python3 packages/python-core/bench/run_suite.py --output new.json --compare old.json
+
+Every stage runs its setup outside the timed region. The garbage
+collector is disabled while timing, as ``timeit`` does.
+"""
+
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PACKAGES = os.path.dirname(os.path.dirname(HERE))
+
+sys.path.insert(0, os.path.join(HERE, "stubs"))
+sys.path.insert(1, os.path.dirname(HERE))
+
+import bpy  # noqa: E402
+from PyQt5.QtCore import QRect  # noqa: E402
+
+from payloads import make_binary_message, make_message  # noqa: E402
+from token_beam_core import (  # noqa: E402
+    SyncTracer,
+    iter_color_groups,
+    normalize_session_token,
+    read_envelope,
+)
+
+SIZES = (100, 1_000, 10_000, 100_000)
+REPEATS = 5
+# Fraction of colors that differ in the incremental update payload
+UPDATE_RATIO = 0.1
+# Session tokens are validated one at a time; time a batch per repeat
+TOKEN_BATCH = 10_000
+# Visible part of the Krita docker's swatch grid
+VIEWPORT = (320, 600)
+# Regressions smaller than this are treated as noise in --compare
+NOISE_MS = 0.05
+
+
+def _load_plugin(name, directory):
+    """Import a plugin package under ``name``; both are called token_beam."""
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(directory, "__init__.py"), submodule_search_locations=[directory])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+blender = _load_plugin("token_beam_blender", os.path.join(PACKAGES, "blender-plugin", "token_beam"))
+krita = _load_plugin("token_beam_krita", os.path.join(PACKAGES, "krita-plugin", "token_beam"))
+blender.register()
+
+
+def _time(setup, run, repeats):
+    """Best and median wall time of ``run(setup())`` in milliseconds."""
+    samples = []
+    for _ in range(repeats):
+        state = setup()
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            run(state)
+            samples.append((time.perf_counter() - started) * 1000.0)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+    return min(samples), statistics.median(samples)
+
+
+# ---------------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------------
+
+def _groups(raw):
+    _fields, payload_at = read_envelope(raw)
+    return list(iter_color_groups(raw, payload_at))
+
+
+def _flatten(decoded):
+    return [color for group in decoded for color in group]
+
+
+def _blender_reset():
+    bpy.reset()
+    # The default session, which the mailbox routes untagged colors to
+    bpy.context.scene.token_beam_sessions.add()
+    blender.TokenBeamMaterialIndex.clear()
+    blender.TokenBeamBindingIndex.clear()
+    blender._cancel_applies()
+    blender.TokenBeamRuntime.mailbox.reset()
+    blender.TokenBeamRuntime.color_list_cache.clear()
+
+
+def _primed_sync_cache(groups):
+    cache = blender.TokenBeamSyncCache()
+    cache.extract(groups)
+    return cache
+
+
+def _blender_drain_all():
+    # A large sync is applied over several drain ticks
+    blender._drain_events()
+    while blender.TokenBeamRuntime.applies:
+        blender._drain_events()
+
+
+def _blender_drain(colors, previous=None, backend="MATERIALS"):
+    def setup():
+        _blender_reset()
+        bpy.context.scene.token_beam_state.color_backend = backend
+        if previous is not None:
+            blender._apply_colors(bpy.context.scene, previous)
+        blender.TokenBeamRuntime.mailbox.put_colors(colors)
+
+    def run(_state):
+        _blender_drain_all()
+    return setup, run
+
+
+def _blender_bound(colors, previous, every=10):
+    """Re-sync with every ``every``-th token applied to its own user material."""
+    def setup():
+        _blender_reset()
+        scene = bpy.context.scene
+        blender._apply_colors(scene, previous)
+        for item in list(scene.token_beam_colors)[::every]:
+            material = bpy.data.materials.new(f"User {item.token_name}")
+            material.use_nodes = True
+            blender._bind_color(scene, material, blender._principled_node(material),
+                                "Base Color", item)
+        blender.TokenBeamRuntime.mailbox.put_colors(colors)
+
+    def run(_state):
+        _blender_drain_all()
+    return setup, run
+
+
+def _blender_palette(colors, previous=None):
+    def setup():
+        _blender_reset()
+        if previous is not None:
+            blender._sync_palette(previous)
+
+    def run(_state):
+        blender._sync_palette(colors)
+    return setup, run
+
+
+class _PaintEvent:
+    def __init__(self, rect):
+        self._rect = rect
+
+    def rect(self):
+        return self._rect
+
+
+def _krita_decode(*raws):
+    """Decode a batch of received syncs the way the decode thread does."""
+    messages = [krita.ReceivedMessage(raw, len(raw), len(raw), 0.0, None, 0.0) for raw in raws]
+
+    def setup():
+        return krita.SyncDecoder(SyncTracer(False))
+
+    return setup, lambda decoder: decoder(messages)
+
+
+def _krita_grid(colors):
+    width, height = VIEWPORT
+
+    def setup():
+        grid = krita.ColorSwatchGrid()
+        grid.resize(width, height)
+        return grid
+
+    def run(grid):
+        grid.set_colors(colors)
+        grid.paintEvent(_PaintEvent(QRect(0, 0, width, height)))
+    return setup, run
+
+
+def _krita_gpl(directory, colors, unchanged):
+    path = os.path.join(directory, "Token Beam.gpl")
+    name = krita.palette_name(colors)
+
+    def setup():
+        if unchanged:
+            krita.write_text_atomic(path, krita.format_gpl(name, 8, colors))
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def run(_state):
+        krita.write_text_atomic(path, krita.format_gpl(name, 8, colors))
+    return setup, run
+
+
+def _stages(size, directory):
+    """Yield ``(plugin, stage, tokens, setup, run)`` for one payload size."""
+    raw = make_message(size)
+    binary = make_binary_message(size)
+    updated_raw = make_message(size, changed=UPDATE_RATIO)
+    groups = _groups(raw)
+    colors = _flatten(blender._decode_groups(groups))
+    updated = _flatten(blender._decode_groups(_groups(updated_raw)))
+    hex_values = [value for _c, _m, tokens in groups for _name, value in tokens]
+    _fields, payload_at = read_envelope(raw)
+    krita_colors, _skipped = krita.extract_colors(raw, payload_at)
+    tokens = size
+
+    def none():
+        return None
+
+    yield "core", "extract", tokens, none, lambda _state: _groups(raw)
+    yield "core", "extract-binary", tokens, none, lambda _state: _groups(binary)
+    yield ("blender", "decode-hex", tokens, none,
+           lambda _state: blender._decode_groups(groups))
+    yield ("blender", "sync-cache-update", tokens,
+           lambda: _primed_sync_cache(groups),
+           lambda cache: cache.extract(_groups(updated_raw)))
+    yield ("blender", "drain-apply-initial", tokens) + _blender_drain(colors)
+    yield ("blender", "drain-apply-update", tokens) + _blender_drain(updated, colors)
+    yield ("blender", "drain-apply-update-bound", tokens) + _blender_bound(updated, colors)
+    yield ("blender", "drain-apply-initial-nodegroup", tokens) + _blender_drain(
+        colors, None, "NODE_GROUP")
+    yield ("blender", "drain-apply-update-nodegroup", tokens) + _blender_drain(
+        updated, colors, "NODE_GROUP")
+    yield ("blender", "sync-palette-initial", tokens) + _blender_palette(colors)
+    yield ("blender", "sync-palette-update", tokens) + _blender_palette(updated, colors)
+    yield ("krita", "extract-colors", tokens, none,
+           lambda _state: krita.extract_colors(raw, payload_at))
+    yield ("krita", "decode-sync", tokens) + _krita_decode(raw)
+    yield ("krita", "decode-sync-binary", tokens) + _krita_decode(binary)
+    yield ("krita", "decode-sync-burst", tokens) + _krita_decode(raw, raw, updated_raw)
+    yield ("krita", "decode-hex", tokens, none,
+           lambda _state: [krita.hex_to_rgba8(value) for value in hex_values])
+    yield ("krita", "swatch-grid", tokens) + _krita_grid(krita_colors)
+    yield ("krita", "write-gpl", tokens) + _krita_gpl(directory, krita_colors, False)
+    yield ("krita", "write-gpl-unchanged", tokens) + _krita_gpl(directory, krita_colors, True)
+
+
+def _token_stage():
+    candidates = [
+        "beam://{:08X}".format(index * 2654435761 & 0xFFFFFFFF) if index % 3 else
+        " {:08x} ".format(index) for index in range(TOKEN_BATCH)
+    ]
+
+    def run(_state):
+        for candidate in candidates:
+            normalize_session_token(candidate)
+    return "core", "session-token", TOKEN_BATCH, lambda: None, run
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, repeats):
+    results = []
+    print(f"{'plugin':<8} {'stage':<29} {'tokens':>8} {'best ms':>10} {'median ms':>10}")
+
+    def record(plugin, stage, tokens, setup, run):
+        best, median = _time(setup, run, repeats)
+        results.append({
+            "plugin": plugin,
+            "stage": stage,
+            "tokens": tokens,
+            "best_ms": round(best, 4),
+            "median_ms": round(median, 4),
+        })
+        print(f"{plugin:<8} {stage:<29} {tokens:>8} {best:>10.3f} {median:>10.3f}")
+
+    record(*_token_stage())
+    directory = tempfile.mkdtemp(prefix="token-beam-bench-")
+    try:
+        for size in sizes:
+            for stage in _stages(size, directory):
+                record(*stage)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+        _blender_reset()
+
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "repeats": repeats,
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Print stages slower than ``baseline`` by more than ``threshold``.
+
+    Returns the number of regressions.
+    """
+    previous = {
+        (entry["plugin"], entry["stage"], entry["tokens"]): entry["best_ms"]
+        for entry in baseline["results"]
+    }
+    regressions = 0
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} "
+          f"(threshold {threshold:.0%}):")
+    for entry in report["results"]:
+        old = previous.get((entry["plugin"], entry["stage"], entry["tokens"]))
+        if old is None:
+            continue
+        new = entry["best_ms"]
+        if new > old * (1.0 + threshold) and new - old > NOISE_MS:
+            regressions += 1
+            print(f"  REGRESSION {entry['plugin']}/{entry['stage']} @ {entry['tokens']}: "
+                  f"{old:.3f} -> {new:.3f} ms ({new / old - 1.0:+.0%})")
+    if not regressions:
+        print("  no regressions")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default=",".join(str(size) for size in SIZES),
+                        help="comma-separated payload sizes in tokens")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="relative slowdown reported as a regression (default 0.15)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    report = run_suite(sizes, max(1, args.repeats))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,432 @@
+"""Local asyncio stand-in for the Token Beam sync server.
+
+Speaks the ``pair`` / ``sync`` / ``ping`` / ``error`` protocol of
+packages/sync-server/src/server.ts over plain ``ws://``: sources
+(``web``, ``receiver``) open sessions, targets join them with the session
+token, and syncs are relayed between them. Rate limiting, origin
+blocking and payload schema validation are left out.
+
+With ``--storm`` the server also opens a session of its own and replays
+synthetic syncs to every target that joins it, so the plugins and
+``load_client.py`` can be stress-tested offline:
+
+    python3 packages/python-core/bench/standin_server.py --storm --rate 20 --tokens 5000
+    TOKEN_BEAM_SYNC_URL=ws://127.0.0.1:8765 blender
+
+Storm syncs carry ``seq`` and ``sentAt`` (wall-clock milliseconds) next to
+``type``, ahead of the payload, so clients on the same machine can measure
+end-to-end latency.
+
+Targets that list ``columnar-1`` in the ``encodings`` of their ``pair``
+message get syncs in the binary encoding, which each sync is encoded in
+once however many targets receive it.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from payloads import encode_binary, make_payload  # noqa: E402
+from token_beam_core import BINARY_ENCODING, BINARY_MAGIC  # noqa: E402
+from ws_asyncio import ConnectionClosed, MAX_MESSAGE_SIZE, ProtocolError, accept  # noqa: E402
+
+SOURCE_CLIENT_TYPES = ("web", "receiver")
+MAX_TARGETS_PER_SESSION = 10
+# Distinct storm payloads; consecutive syncs always differ
+STORM_VARIANTS = 8
+
+
+def _log(text):
+    print(f"[{time.strftime('%H:%M:%S')}] {text}", flush=True)
+
+
+def _validate_client_type(client_type):
+    if len(client_type) > 32:
+        return "clientType must be 32 characters or fewer"
+    if not all(char.isalnum() or char in " _-" for char in client_type):
+        return "clientType must contain only letters, numbers, spaces, hyphens, or underscores"
+    return None
+
+
+class StormConfig:
+    """How the built-in source replays syncs to each target."""
+
+    def __init__(self, tokens=1000, rate=10.0, count=100, changed=0.1, fragment=0,
+                 link_rate=0, backpressure="buffer", high_water=1 << 20,
+                 disconnect_after=0, abort_after=0):
+        self.tokens = tokens
+        # Syncs per second; 0 sends back to back
+        self.rate = rate
+        # Syncs per target; 0 keeps going until the target leaves
+        self.count = count
+        self.changed = changed
+        self.fragment = fragment
+        # Bytes per second on the server-to-target link; 0 is unthrottled
+        self.link_rate = link_rate
+        # "buffer" queues like Node's ws.send, "wait" drains the write
+        # buffer before each sync, "skip" drops syncs while it is over
+        # ``high_water``
+        self.backpressure = backpressure
+        self.high_water = high_water
+        # Close the connection cleanly, or drop it, after this many syncs
+        self.disconnect_after = disconnect_after
+        self.abort_after = abort_after
+        self.payloads = []
+        self.binary_payloads = []
+
+    def prepare(self):
+        """Serialise the payload variants once, outside the send loop."""
+        payloads = [make_payload(self.tokens, changed=self.changed, revision=revision)
+                    for revision in range(STORM_VARIANTS)]
+        self.payloads = [json.dumps(payload, separators=(",", ":")) for payload in payloads]
+        # Binary messages without their magic and header, which carries seq
+        header_end = len(BINARY_MAGIC) + 4 + len(b"{}")
+        self.binary_payloads = [encode_binary({}, payload)[header_end:] for payload in payloads]
+
+    def message(self, seq, encoding=None):
+        index = seq % len(self.payloads)
+        if encoding == BINARY_ENCODING:
+            header = b'{"type":"sync","seq":%d,"sentAt":%.3f}' % (seq, time.time() * 1000.0)
+            return b"".join((BINARY_MAGIC, len(header).to_bytes(4, "little"), header,
+                             self.binary_payloads[index]))
+        return '{"type":"sync","seq":%d,"sentAt":%.3f,"payload":%s}' % (
+            seq, time.time() * 1000.0, self.payloads[index])
+
+
+class Session:
+    def __init__(self, token):
+        self.token = token
+        self.source = None
+        self.source_type = None
+        self.source_origin = None
+        self.targets = []
+        self.storm = False
+
+
+class StandinServer:
+    def __init__(self, host="127.0.0.1", port=8765, deflate=True, storm=None,
+                 storm_token=None, verbose=False):
+        self.host = host
+        self.port = port
+        self.deflate = deflate
+        self.storm = storm
+        self.verbose = verbose
+        self.sessions = {}
+        self.client_sessions = {}
+        self.client_types = {}
+        self.encodings = {}
+        self.storm_token = None
+        if storm is not None:
+            storm.prepare()
+            self.storm_token = storm_token or self._generate_token()
+            session = Session(self.storm_token)
+            session.source_type = "storm"
+            session.storm = True
+            self.sessions[session.token] = session
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=2 ** 20)
+        _log(f"Stand-in sync server on ws://{self.host}:{self.port}")
+        if self.storm_token:
+            _log(f"Storm session token: {self.storm_token}")
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    # -- connections -------------------------------------------------------
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            ws = await accept(reader, writer, deflate=self.deflate)
+        except ProtocolError:
+            return
+        try:
+            while True:
+                try:
+                    raw = await ws.recv()
+                except ProtocolError as exc:
+                    await self._send_error(ws, str(exc))
+                    await ws.close(1009)
+                    return
+                if len(raw) > MAX_MESSAGE_SIZE:
+                    await self._send_error(ws, "Message too large")
+                    continue
+                try:
+                    message = json.loads(raw)
+                    if not isinstance(message, dict):
+                        raise ValueError
+                except ValueError:
+                    await self._send_error(ws, "Invalid message format")
+                    continue
+                await self._handle_message(ws, message)
+        except ConnectionClosed:
+            pass
+        finally:
+            await self._handle_disconnect(ws)
+
+    async def _handle_message(self, ws, message):
+        kind = message.get("type")
+        if kind == "pair":
+            await self._handle_pair(ws, message)
+        elif kind == "sync":
+            await self._handle_sync(ws, message)
+        elif kind == "ping":
+            await self._send(ws, {"type": "ping"})
+        else:
+            await self._send_error(ws, "Unknown message type")
+
+    async def _handle_pair(self, ws, message):
+        client_type = str(message.get("clientType") or "").strip()
+        if not client_type:
+            await self._send_error(ws, "clientType is required")
+            return
+        error = _validate_client_type(client_type)
+        if error:
+            await self._send_error(ws, f"Invalid clientType: {error}")
+            return
+        self.client_types[ws] = client_type
+        token = message.get("sessionToken")
+
+        if client_type in SOURCE_CLIENT_TYPES:
+            session = self.sessions.get(token) if token else None
+            if session is None or session.source is not None or session.storm:
+                session = Session(self._generate_token())
+                self.sessions[session.token] = session
+            session.source = ws
+            session.source_type = client_type
+            session.source_origin = message.get("origin")
+            self.client_sessions[ws] = session
+            await self._send(ws, {"type": "pair", "sessionToken": session.token,
+                                  "clientType": client_type})
+            for target in session.targets:
+                await self._send(target, {"type": "pair", "clientType": client_type,
+                                          "origin": session.source_origin})
+            _log(f"Source client ({client_type}) paired with token: {session.token}")
+            return
+
+        session = self.sessions.get(token) if token else None
+        if session is None:
+            await self._send_error(ws, "Invalid session token" if token else "Invalid pair request")
+            return
+        if len(session.targets) >= MAX_TARGETS_PER_SESSION:
+            await self._send_error(ws, "Too many target clients for this session")
+            return
+        session.targets.append(ws)
+        self.client_sessions[ws] = session
+        encodings = message.get("encodings")
+        reply = {"type": "pair", "sessionToken": session.token, "clientType": client_type,
+                 "origin": session.source_origin or session.source_type}
+        if isinstance(encodings, list) and BINARY_ENCODING in encodings:
+            self.encodings[ws] = reply["encoding"] = BINARY_ENCODING
+        await self._send(ws, reply)
+        if session.source is not None:
+            await self._send(session.source, {"type": "pair", "clientType": client_type,
+                                              "origin": message.get("origin")})
+        _log(f"Target client ({client_type}) joined session: {session.token} "
+             f"({len(session.targets)} target clients)")
+        if session.storm:
+            asyncio.ensure_future(self._run_storm(ws, client_type, self.encodings.get(ws)))
+
+    async def _handle_sync(self, ws, message):
+        session = self.client_sessions.get(ws)
+        if session is None:
+            await self._send_error(ws, "No active session")
+            return
+        payload = message.get("payload")
+        if not isinstance(payload, dict):
+            await self._send_error(ws, "Invalid payload structure")
+            return
+        relayed = {"type": "sync", "payload": payload}
+        if ws is session.source:
+            # Each encoding is serialised once, for all the targets using it
+            frames = {}
+            sent = 0
+            for target in session.targets:
+                encoding = self.encodings.get(target)
+                if encoding not in frames:
+                    frames[encoding] = self._encode_sync(relayed, encoding)
+                if await self._send_frame(target, frames[encoding]):
+                    sent += 1
+            if self.verbose:
+                _log(f"Synced from source to {sent} target client(s)")
+        elif session.source is not None:
+            await self._send(session.source, relayed)
+        elif not session.storm:
+            await self._send_error(ws, "Source client not connected")
+
+    async def _handle_disconnect(self, ws):
+        session = self.client_sessions.pop(ws, None)
+        client_type = self.client_types.pop(ws, "unknown")
+        self.encodings.pop(ws, None)
+        if session is None:
+            return
+        if ws is session.source:
+            session.source = None
+            for target in session.targets:
+                await self._send(target, {"type": "peer-disconnected", "clientType": client_type,
+                                          "reason": f"{client_type} client disconnected"})
+        else:
+            session.targets = [target for target in session.targets if target is not ws]
+            if session.source is not None:
+                await self._send(session.source, {
+                    "type": "peer-disconnected", "clientType": client_type,
+                    "reason": f"{client_type} client disconnected"})
+        if session.source is None and not session.targets and not session.storm:
+            del self.sessions[session.token]
+        _log(f"{client_type} client disconnected from session {session.token}")
+
+    # -- storm -------------------------------------------------------------
+
+    async def _run_storm(self, ws, client_type, encoding=None):
+        storm = self.storm
+        interval = 1.0 / storm.rate if storm.rate > 0 else 0.0
+        wait = storm.backpressure == "wait"
+        sent = skipped = 0
+        wire_bytes = 0
+        peak_buffered = 0
+        stalled = 0.0
+        started = time.perf_counter()
+        next_at = started
+        seq = 0
+        reason = "done"
+        try:
+            while not ws.closed and (not storm.count or seq < storm.count):
+                if interval:
+                    delay = next_at - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    next_at += interval
+                if storm.backpressure == "skip" and ws.buffered > storm.high_water:
+                    skipped += 1
+                    seq += 1
+                    continue
+                before = ws.wire_bytes_out
+                send_started = time.perf_counter()
+                await ws.send(storm.message(seq, encoding), fragment_size=storm.fragment,
+                              link_rate=storm.link_rate, wait=wait)
+                stalled += time.perf_counter() - send_started
+                wire_bytes += ws.wire_bytes_out - before
+                peak_buffered = max(peak_buffered, ws.buffered)
+                sent += 1
+                seq += 1
+                if not interval:
+                    # Let the reader side of every connection run
+                    await asyncio.sleep(0)
+                if storm.abort_after and sent >= storm.abort_after:
+                    reason = "aborted"
+                    ws.abort()
+                    break
+                if storm.disconnect_after and sent >= storm.disconnect_after:
+                    reason = "closed"
+                    await ws.close()
+                    break
+        except ConnectionClosed:
+            reason = "target left"
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        _log(f"Storm to {client_type} ({encoding or 'json'}) {reason}: {sent} syncs sent, {skipped} skipped, "
+             f"{sent / elapsed:.1f} syncs/s, {wire_bytes / elapsed / 1048576.0:.2f} MB/s on wire, "
+             f"peak write buffer {peak_buffered / 1024.0:.0f} KB, "
+             f"{stalled * 1000.0:.0f} ms blocked in send")
+
+    # -- helpers -----------------------------------------------------------
+
+    async def _send(self, ws, message):
+        return await self._send_frame(ws, json.dumps(message))
+
+    async def _send_frame(self, ws, frame):
+        if ws.closed:
+            return False
+        try:
+            await ws.send(frame)
+        except ConnectionClosed:
+            return False
+        return True
+
+    @staticmethod
+    def _encode_sync(message, encoding):
+        if encoding == BINARY_ENCODING:
+            try:
+                fields = {"type": message["type"]}
+                frame = encode_binary(fields, message["payload"])
+            except (KeyError, TypeError):
+                # Not a well-formed token payload; the real server rejects it
+                frame = None
+            if frame is not None:
+                return frame
+        return json.dumps(message)
+
+    async def _send_error(self, ws, error):
+        await self._send(ws, {"type": "error", "error": error})
+
+    @staticmethod
+    def _generate_token():
+        return "beam://" + secrets.token_hex(6).upper()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-deflate", action="store_true",
+                        help="refuse permessage-deflate")
+    parser.add_argument("--verbose", action="store_true", help="log every relayed sync")
+    storm = parser.add_argument_group("storm")
+    storm.add_argument("--storm", action="store_true",
+                       help="replay synthetic syncs to every target of the storm session")
+    storm.add_argument("--token", help="storm session token (default: random)")
+    storm.add_argument("--tokens", type=int, default=1000, help="tokens per payload")
+    storm.add_argument("--rate", type=float, default=10.0,
+                       help="syncs per second per target, 0 for back to back")
+    storm.add_argument("--count", type=int, default=100,
+                       help="syncs per target, 0 to keep going")
+    storm.add_argument("--changed", type=float, default=0.1,
+                       help="fraction of colors that differ between syncs")
+    storm.add_argument("--fragment", type=int, default=0,
+                       help="split syncs into frames of at most this many bytes")
+    storm.add_argument("--link-rate", type=int, default=0,
+                       help="throttle each target's link to this many bytes per second")
+    storm.add_argument("--backpressure", choices=("buffer", "wait", "skip"), default="buffer",
+                       help="what to do when a target reads slower than syncs are sent")
+    storm.add_argument("--high-water", type=int, default=1 << 20,
+                       help="write buffer size above which --backpressure skip drops syncs")
+    storm.add_argument("--disconnect-after", type=int, default=0,
+                       help="close each target's connection after this many syncs")
+    storm.add_argument("--abort-after", type=int, default=0,
+                       help="drop each target's TCP connection after this many syncs")
+    args = parser.parse_args(argv)
+
+    config = None
+    if args.storm:
+        config = StormConfig(
+            tokens=args.tokens, rate=args.rate, count=args.count, changed=args.changed,
+            fragment=args.fragment, link_rate=args.link_rate,
+            backpressure=args.backpressure, high_water=args.high_water,
+            disconnect_after=args.disconnect_after, abort_after=args.abort_after)
+    token = None
+    if args.token:
+        token = "beam://" + args.token.replace("beam://", "").upper()
+    server = StandinServer(args.host, args.port, deflate=not args.no_deflate, storm=config,
+                           storm_token=token, verbose=args.verbose)
+
+    async def run():
+        await server.start()
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""QtCore stand-ins: objects, signals, timers and geometry."""
+
+
+class _Names:
+    """Enum namespace; any member resolves to its own name."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return "{}.{}".format(self._name, name)
+
+
+Qt = _Names("Qt")
+
+
+class _BoundSignal:
+    def __init__(self):
+        self._slots = []
+
+    def connect(self, slot):
+        self._slots.append(slot)
+
+    def disconnect(self, slot=None):
+        if slot is None:
+            self._slots.clear()
+        else:
+            self._slots.remove(slot)
+
+    def emit(self, *args):
+        for slot in list(self._slots):
+            slot(*args)
+
+
+class pyqtSignal:
+    def __init__(self, *types):
+        self._types = types
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        signals = obj.__dict__.setdefault("_signals", {})
+        try:
+            return signals[id(self)]
+        except KeyError:
+            signal = signals[id(self)] = _BoundSignal()
+            return signal
+
+
+class QObject:
+    def __init__(self, parent=None):
+        self._parent = parent
+
+    def parent(self):
+        return self._parent
+
+
+class QTimer(QObject):
+    timeout = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._active = False
+        self._single_shot = False
+        self._interval = 0
+
+    def setSingleShot(self, single_shot):
+        self._single_shot = single_shot
+
+    def setInterval(self, interval):
+        self._interval = interval
+
+    def start(self, interval=None):
+        if interval is not None:
+            self._interval = interval
+        self._active = True
+
+    def stop(self):
+        self._active = False
+
+    def isActive(self):
+        return self._active
+
+    def fire(self):
+        """Benchmark hook: deliver the timeout now."""
+        if self._single_shot:
+            self._active = False
+        self.timeout.emit()
+
+    @staticmethod
+    def singleShot(_interval, callback):
+        callback()
+
+
+class QEvent:
+    ToolTip = "QEvent.ToolTip"
+
+    def __init__(self, event_type):
+        self._type = event_type
+
+    def type(self):
+        return self._type
+
+    def ignore(self):
+        pass
+
+
+class QSize:
+    def __init__(self, width=0, height=0):
+        self._width = width
+        self._height = height
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+
+class QPoint:
+    def __init__(self, x=0, y=0):
+        self._x = x
+        self._y = y
+
+    def x(self):
+        return self._x
+
+    def y(self):
+        return self._y
+
+
+class QRect:
+    def __init__(self, x=0, y=0, width=0, height=0):
+        self._x = x
+        self._y = y
+        self._width = width
+        self._height = height
+
+    def left(self):
+        return self._x
+
+    def top(self):
+        return self._y
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def bottom(self):
+        return self._y + self._height - 1
+
+    def right(self):
+        return self._x + self._width - 1
+
+
+class QByteArray(bytes):
+    def data(self):
+        return bytes(self)
+
+
+class QUrl:
+    def __init__(self, url=""):
+        self._url = url
+
+    def toString(self):
+        return self._url
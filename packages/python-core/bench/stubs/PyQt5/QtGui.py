@@ -0,0 +1,98 @@
+"""QtGui stand-ins: colors, pixmaps and a primitive-counting painter."""
+
+
+class QColor:
+    def __init__(self, *args):
+        self._rgba = 0xFF000000
+        if len(args) == 1 and isinstance(args[0], str):
+            value = args[0].lstrip("#")
+            if len(value) == 3:
+                value = "".join(ch * 2 for ch in value)
+            if len(value) == 8:
+                # Qt reads 8 digits as #AARRGGBB
+                self._rgba = int(value, 16)
+            elif len(value) == 6:
+                self._rgba = 0xFF000000 | int(value, 16)
+        elif len(args) >= 3:
+            alpha = args[3] if len(args) > 3 else 255
+            self._rgba = (alpha << 24) | (args[0] << 16) | (args[1] << 8) | args[2]
+
+    @classmethod
+    def fromRgba(cls, rgba):
+        color = cls()
+        color._rgba = rgba & 0xFFFFFFFF
+        return color
+
+    def rgba(self):
+        return self._rgba
+
+    def rgb(self):
+        return self._rgba | 0xFF000000
+
+    def redF(self):
+        return ((self._rgba >> 16) & 0xFF) / 255.0
+
+    def greenF(self):
+        return ((self._rgba >> 8) & 0xFF) / 255.0
+
+    def blueF(self):
+        return (self._rgba & 0xFF) / 255.0
+
+    def alphaF(self):
+        return (self._rgba >> 24) / 255.0
+
+
+class QPixmap:
+    def __init__(self, width=0, height=0):
+        self._width = width
+        self._height = height
+        self._ratio = 1.0
+        self.primitives = 0
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def setDevicePixelRatio(self, ratio):
+        self._ratio = ratio
+
+    def fill(self, _color=None):
+        self.primitives += 1
+
+
+class QPainter:
+    Antialiasing = "QPainter.Antialiasing"
+
+    def __init__(self, device=None):
+        self._device = device
+
+    def setRenderHint(self, _hint, _on=True):
+        pass
+
+    def translate(self, _dx, _dy):
+        pass
+
+    def fillRect(self, _rect, _color):
+        self._device.primitives = getattr(self._device, "primitives", 0) + 1
+
+    def drawPixmap(self, _x, _y, _pixmap):
+        self._device.primitives = getattr(self._device, "primitives", 0) + 1
+
+    def end(self):
+        self._device = None
+
+
+class QFont:
+    def setBold(self, _bold):
+        pass
+
+
+class QIcon:
+    pass
+
+
+class QCursor:
+    def __init__(self, shape=None):
+        self._shape = shape
@@ -0,0 +1,33 @@
+"""QtNetwork stand-ins; the benchmarks never open a connection."""
+
+from .QtCore import QObject, pyqtSignal
+
+
+class QAbstractSocket(QObject):
+    connected = pyqtSignal()
+    readyRead = pyqtSignal()
+    disconnected = pyqtSignal()
+    errorOccurred = pyqtSignal(object)
+
+
+class QTcpSocket(QAbstractSocket):
+    pass
+
+
+class QSslSocket(QTcpSocket):
+    encrypted = pyqtSignal()
+
+    def isEncrypted(self):
+        return False
+
+    def connectToHost(self, _host, _port):
+        pass
+
+    def connectToHostEncrypted(self, _host, _port):
+        pass
+
+    def disconnectFromHost(self):
+        pass
+
+    def write(self, data):
+        return len(data)
@@ -0,0 +1,152 @@
+"""QtWidgets stand-ins that track geometry and ignore everything else."""
+
+from .QtCore import QObject, QSize, pyqtSignal
+
+
+class QWidget(QObject):
+    # Painter primitives drawn on this widget, see QtGui.QPainter
+    primitives = 0
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._width = 0
+        self._height = 0
+        self._minimum_height = 0
+
+    def __getattr__(self, name):
+        # Setters and flags the benchmarks do not model
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _ignore
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def resize(self, width, height):
+        old = QSize(self._width, self._height)
+        self._width = width
+        self._height = height
+        self.resizeEvent(_ResizeEvent(old, QSize(width, height)))
+
+    def resizeEvent(self, event):
+        pass
+
+    def setMinimumHeight(self, height):
+        self._minimum_height = height
+
+    def devicePixelRatioF(self):
+        return 1.0
+
+    def event(self, _event):
+        return False
+
+    def mousePressEvent(self, _event):
+        pass
+
+
+def _ignore(*_args, **_kwargs):
+    return None
+
+
+class _ResizeEvent:
+    def __init__(self, old_size, size):
+        self._old = old_size
+        self._size = size
+
+    def oldSize(self):
+        return self._old
+
+    def size(self):
+        return self._size
+
+
+class _Layout:
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _ignore
+
+
+class QVBoxLayout(_Layout):
+    pass
+
+
+class QHBoxLayout(_Layout):
+    pass
+
+
+class QLabel(QWidget):
+    def __init__(self, text="", parent=None):
+        super().__init__(parent)
+        self._text = text
+
+    def setText(self, text):
+        self._text = text
+
+    def text(self):
+        return self._text
+
+
+class QLineEdit(QWidget):
+    returnPressed = pyqtSignal()
+    editingFinished = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._text = ""
+
+    def setText(self, text):
+        self._text = text
+
+    def text(self):
+        return self._text
+
+
+class QPushButton(QLabel):
+    clicked = pyqtSignal()
+
+
+class QCheckBox(QLabel):
+    toggled = pyqtSignal(bool)
+
+    def __init__(self, text="", parent=None):
+        super().__init__(text, parent)
+        self._checked = False
+
+    def setChecked(self, checked):
+        self._checked = bool(checked)
+
+    def isChecked(self):
+        return self._checked
+
+
+class QSpinBox(QWidget):
+    valueChanged = pyqtSignal(int)
+
+
+class QScrollArea(QWidget):
+    NoFrame = "QFrame.NoFrame"
+
+
+class QSizePolicy:
+    Expanding = "QSizePolicy.Expanding"
+    Preferred = "QSizePolicy.Preferred"
+
+
+class QToolTip:
+    @staticmethod
+    def showText(*_args):
+        pass
+
+    @staticmethod
+    def hideText():
+        pass
+
+
+class QFileDialog:
+    @staticmethod
+    def getSaveFileName(*_args):
+        return "", ""
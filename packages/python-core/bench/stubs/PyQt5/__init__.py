@@ -0,0 +1,6 @@
+"""Headless stand-in for the parts of PyQt5 the Krita plugin uses.
+
+Signals call their slots synchronously, widgets only track geometry, and
+painting counts primitives instead of touching pixels, so widget costs
+scale with the number of calls the plugin makes. Benchmarks only.
+"""
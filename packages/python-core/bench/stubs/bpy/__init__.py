@@ -0,0 +1,694 @@
+"""Headless stand-in for Blender's ``bpy`` module, for benchmarks only.
+
+Models what the Token Beam add-on touches, with the cost structure that
+matters for trends rather than Blender's absolute speed:
+
+- attributes of RNA structs are looked up and type-checked on every access;
+- ``CollectionProperty.add`` appends, ``remove``/``move`` shift every later
+  item, and ``foreach_get``/``foreach_set`` are one bulk pass without
+  per-item checks;
+- palette colors live in a linked list, so indexing or removing one
+  searches from the head;
+- ID datablocks are looked up by name and get ``.001`` style names on
+  collision;
+- node sockets are found by name with a scan, and a node group's
+  interface sockets are mirrored on every group node that uses it.
+"""
+
+import sys
+import types as _types
+from itertools import islice
+
+
+# ---------------------------------------------------------------------------
+# Properties and RNA structs
+# ---------------------------------------------------------------------------
+
+class _Property:
+    """Result of ``bpy.props.*Property``; also a descriptor on ``Scene``."""
+
+    def __init__(self, kind, **options):
+        self.kind = kind
+        self.options = options
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        values = obj.__dict__.setdefault("_scene_props", {})
+        try:
+            return values[id(self)]
+        except KeyError:
+            value = values[id(self)] = self.default()
+            return value
+
+    def default(self):
+        kind = self.kind
+        options = self.options
+        if kind == "StringProperty":
+            return options.get("default", "")
+        if kind == "BoolProperty":
+            return bool(options.get("default", False))
+        if kind == "IntProperty":
+            return int(options.get("default", 0))
+        if kind == "FloatProperty":
+            return float(options.get("default", 0.0))
+        if kind == "FloatVectorProperty":
+            size = options.get("size", 3)
+            return tuple(options.get("default", (0.0,) * size))
+        if kind == "CollectionProperty":
+            return Collection(struct_type(options["type"]))
+        if kind == "PointerProperty":
+            target = options["type"]
+            if isinstance(target, type) and issubclass(target, types.PropertyGroup):
+                return struct_type(target)()
+            return None
+        return options.get("default")
+
+    def coerce(self, value):
+        kind = self.kind
+        if kind == "StringProperty":
+            if not isinstance(value, str):
+                raise TypeError("expected a string, not {}".format(type(value).__name__))
+            return value
+        if kind == "FloatVectorProperty":
+            value = tuple(float(channel) for channel in value)
+            if len(value) != self.options.get("size", 3):
+                raise ValueError("sequence length mismatch")
+            return value
+        if kind == "BoolProperty":
+            return bool(value)
+        if kind == "IntProperty":
+            return int(value)
+        if kind == "FloatProperty":
+            return float(value)
+        return value
+
+
+def _property_factory(kind):
+    def factory(**options):
+        return _Property(kind, **options)
+    factory.__name__ = kind
+    return factory
+
+
+class Struct:
+    """An RNA struct instance; every field access goes through the property."""
+
+    _properties = {}
+
+    def __init__(self):
+        object.__setattr__(
+            self, "_values", {name: prop.default() for name, prop in self._properties.items()})
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        prop = self._properties.get(name)
+        if prop is None:
+            raise AttributeError("'{}' has no property '{}'".format(type(self).__name__, name))
+        self._values[name] = prop.coerce(value)
+
+    def as_pointer(self):
+        return id(self)
+
+
+_struct_types = {}
+
+
+def struct_type(group):
+    """The Struct subclass holding instances of a PropertyGroup."""
+    try:
+        return _struct_types[group]
+    except KeyError:
+        pass
+    properties = {
+        name: prop
+        for name, prop in getattr(group, "__annotations__", {}).items()
+        if isinstance(prop, _Property)
+    }
+    cls = _struct_types[group] = type(group.__name__, (Struct,), {"_properties": properties})
+    return cls
+
+
+class Collection:
+    """``bpy_prop_collection`` backed by a Python list."""
+
+    def __init__(self, item_type):
+        self._type = item_type
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def add(self):
+        item = self._type()
+        self._items.append(item)
+        return item
+
+    def remove(self, index):
+        del self._items[index]
+
+    def move(self, source, target):
+        self._items.insert(target, self._items.pop(source))
+
+    def clear(self):
+        self._items.clear()
+
+    def foreach_get(self, attr, seq):
+        flat = []
+        for item in self._items:
+            value = item._values[attr]
+            if isinstance(value, tuple):
+                flat.extend(value)
+            else:
+                flat.append(value)
+        if len(flat) != len(seq):
+            raise RuntimeError("internal error setting the array")
+        seq[:] = flat
+
+    def foreach_set(self, attr, seq):
+        items = self._items
+        if not items:
+            return
+        width = len(seq) // len(items)
+        if width * len(items) != len(seq):
+            raise RuntimeError("internal error setting the array")
+        if width == 1:
+            for item, value in zip(items, seq):
+                item._values[attr] = value
+            return
+        for index, item in enumerate(items):
+            item._values[attr] = tuple(seq[index * width:(index + 1) * width])
+
+
+# ---------------------------------------------------------------------------
+# ID datablocks
+# ---------------------------------------------------------------------------
+
+class ID:
+    def __init__(self, name):
+        self.name = name
+        self.users = 0
+
+    def as_pointer(self):
+        return id(self)
+
+    def update_tag(self):
+        pass
+
+
+class IDCollection:
+    """``bpy.data.<type>``: name lookup plus unique naming on creation."""
+
+    def __init__(self, id_type):
+        self._type = id_type
+        self._by_name = {}
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def __iter__(self):
+        return iter(list(self._by_name.values()))
+
+    def get(self, name, default=None):
+        return self._by_name.get(name, default)
+
+    def new(self, name, type=None):
+        unique = name
+        suffix = 0
+        while unique in self._by_name:
+            suffix += 1
+            unique = "{}.{:03d}".format(name, suffix)
+        block = self._type(unique)
+        self._by_name[unique] = block
+        return block
+
+    def remove(self, block):
+        self._by_name.pop(block.name, None)
+
+    def clear(self):
+        self._by_name.clear()
+
+
+class NodeSocket:
+    def __init__(self, default_value, name="", node=None):
+        self.default_value = default_value
+        self.name = name
+        self.node = node
+        self.links = []
+
+    @property
+    def is_linked(self):
+        return bool(self.links)
+
+
+class Sockets:
+    """Sockets of a node, looked up by index or (with a scan) by name."""
+
+    def __init__(self, node, sockets=None):
+        self._node = node
+        self._sockets = []
+        for name, socket in (sockets or {}).items():
+            self.append(name, socket)
+
+    def __len__(self):
+        return len(self._sockets)
+
+    def __iter__(self):
+        return iter(list(self._sockets))
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._sockets[key]
+        socket = self.get(key)
+        if socket is None:
+            raise KeyError(key)
+        return socket
+
+    def get(self, name, default=None):
+        for socket in self._sockets:
+            if socket.name == name:
+                return socket
+        return default
+
+    def append(self, name, socket):
+        socket.name = name
+        socket.node = self._node
+        self._sockets.append(socket)
+        return socket
+
+    def remove_named(self, name):
+        self._sockets = [socket for socket in self._sockets if socket.name != name]
+
+
+# bl_idname -> Node.type of the nodes the add-on creates
+_NODE_TYPES = {
+    "ShaderNodeRGB": "RGB",
+    "ShaderNodeGroup": "GROUP",
+    "NodeGroupOutput": "GROUP_OUTPUT",
+    "ShaderNodeValToRGB": "VALTORGB",
+}
+
+
+class Node:
+    def __init__(self, node_type, name, inputs=None, outputs=None):
+        self.type = node_type
+        self.name = name
+        self.label = ""
+        self.location = (0.0, 0.0)
+        self.inputs = Sockets(self, inputs)
+        self.outputs = Sockets(self, outputs)
+        self.node_tree = None
+        self.tree = None
+
+
+class Nodes:
+    def __init__(self, tree=None):
+        self._nodes = []
+        self._tree = tree
+
+    def __iter__(self):
+        return iter(self._nodes)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def get(self, name, default=None):
+        for node in self._nodes:
+            if node.name == name:
+                return node
+        return default
+
+    def append(self, node):
+        node.tree = self._tree
+        self._nodes.append(node)
+        return node
+
+    def new(self, bl_idname):
+        node_type = _NODE_TYPES.get(bl_idname, bl_idname)
+        name = node_type.title()
+        unique = name
+        suffix = 0
+        while self.get(unique) is not None:
+            suffix += 1
+            unique = "{}.{:03d}".format(name, suffix)
+        if node_type == "GROUP":
+            node = self.append(GroupNode(unique))
+        elif node_type == "RGB":
+            node = self.append(Node(node_type, unique, outputs={
+                "Color": NodeSocket((0.5, 0.5, 0.5, 1.0)),
+            }))
+        else:
+            node = self.append(Node(node_type, unique))
+        if node_type == "GROUP_OUTPUT" and self._tree is not None:
+            for item in self._tree.interface.outputs:
+                node.inputs.append(item.name, NodeSocket((0.0, 0.0, 0.0, 1.0)))
+        return node
+
+    def remove(self, node):
+        for socket in list(node.inputs) + list(node.outputs):
+            for link in list(socket.links):
+                self._tree.links.remove(link)
+        if node.type == "GROUP" and node.node_tree is not None:
+            node.node_tree.users -= 1
+            _group_nodes[id(node.node_tree)].remove(node)
+        self._nodes.remove(node)
+
+
+class NodeLink:
+    def __init__(self, from_socket, to_socket):
+        self.from_socket = from_socket
+        self.to_socket = to_socket
+        self.from_node = from_socket.node
+        self.to_node = to_socket.node
+
+
+class Links:
+    def __init__(self):
+        self._links = []
+
+    def __len__(self):
+        return len(self._links)
+
+    def __iter__(self):
+        return iter(list(self._links))
+
+    def new(self, from_socket, to_socket):
+        # An input takes a single link
+        for link in list(to_socket.links):
+            self.remove(link)
+        link = NodeLink(from_socket, to_socket)
+        from_socket.links.append(link)
+        to_socket.links.append(link)
+        self._links.append(link)
+        return link
+
+    def remove(self, link):
+        link.from_socket.links.remove(link)
+        link.to_socket.links.remove(link)
+        self._links.remove(link)
+
+
+class InterfaceSocket:
+    def __init__(self, name, in_out, socket_type):
+        self.name = name
+        self.in_out = in_out
+        self.socket_type = socket_type
+        self.item_type = "SOCKET"
+
+
+class _InterfaceItems:
+    def __init__(self, interface):
+        self._interface = interface
+
+    def __len__(self):
+        return len(self._interface._items)
+
+    def __iter__(self):
+        return iter(list(self._interface._items))
+
+    def get(self, name, default=None):
+        for item in self._interface._items:
+            if item.name == name:
+                return item
+        return default
+
+
+class Interface:
+    """``NodeTree.interface``: group sockets, mirrored on every group node."""
+
+    def __init__(self, tree):
+        self._tree = tree
+        self._items = []
+        self.items_tree = _InterfaceItems(self)
+
+    @property
+    def outputs(self):
+        return [item for item in self._items if item.in_out == "OUTPUT"]
+
+    def new_socket(self, name, in_out="INPUT", socket_type="NodeSocketFloat"):
+        item = InterfaceSocket(name, in_out, socket_type)
+        self._items.append(item)
+        if in_out == "OUTPUT":
+            for node in self._tree.nodes:
+                if node.type == "GROUP_OUTPUT":
+                    node.inputs.append(name, NodeSocket((0.0, 0.0, 0.0, 1.0)))
+            for node in _group_nodes.get(id(self._tree), ()):
+                node.outputs.append(name, NodeSocket((0.0, 0.0, 0.0, 1.0)))
+        return item
+
+    def remove(self, item):
+        self._items.remove(item)
+        if item.in_out != "OUTPUT":
+            return
+        owners = [node for node in self._tree.nodes if node.type == "GROUP_OUTPUT"]
+        for node in owners:
+            self._drop_socket(node, "inputs", item.name)
+        for node in _group_nodes.get(id(self._tree), ()):
+            self._drop_socket(node, "outputs", item.name)
+
+    @staticmethod
+    def _drop_socket(node, side, name):
+        socket = getattr(node, side).get(name)
+        if socket is None:
+            return
+        for link in list(socket.links):
+            if node.tree is not None:
+                node.tree.links.remove(link)
+        getattr(node, side).remove_named(name)
+
+
+# id(NodeTree) -> group nodes that instance it, so interface changes reach them
+_group_nodes = {}
+
+
+class NodeTree(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.interface = Interface(self)
+        self.nodes = Nodes(self)
+        self.links = Links()
+
+
+class GroupNode(Node):
+    """``ShaderNodeGroup``: its outputs mirror the group's interface."""
+
+    def __init__(self, name):
+        super().__init__("GROUP", name)
+        self._node_tree = None
+
+    @property
+    def node_tree(self):
+        return self._node_tree
+
+    @node_tree.setter
+    def node_tree(self, tree):
+        self._node_tree = tree
+        self.outputs = Sockets(self)
+        if tree is None:
+            return
+        tree.users += 1
+        _group_nodes.setdefault(id(tree), []).append(self)
+        for item in tree.interface.outputs:
+            self.outputs.append(item.name, NodeSocket((0.0, 0.0, 0.0, 1.0)))
+
+
+class Material(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.node_tree = None
+        self.diffuse_color = (0.8, 0.8, 0.8, 1.0)
+        self._use_nodes = False
+
+    @property
+    def use_nodes(self):
+        return self._use_nodes
+
+    @use_nodes.setter
+    def use_nodes(self, value):
+        self._use_nodes = bool(value)
+        if self._use_nodes and self.node_tree is None:
+            tree = NodeTree("Shader Nodetree")
+            tree.nodes.append(Node("BSDF_PRINCIPLED", "Principled BSDF", {
+                "Base Color": NodeSocket((0.8, 0.8, 0.8, 1.0)),
+            }, {"BSDF": NodeSocket(None)}))
+            tree.nodes.append(Node("OUTPUT_MATERIAL", "Material Output", {
+                "Surface": NodeSocket(None),
+            }))
+            self.node_tree = tree
+
+
+class World(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.node_tree = None
+
+
+class PaletteColor:
+    def __init__(self):
+        self.color = (0.0, 0.0, 0.0)
+
+
+class PaletteColors:
+    """Palette colors are a linked list in Blender: removal walks it."""
+
+    def __init__(self):
+        self._colors = []
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __iter__(self):
+        return iter(list(self._colors))
+
+    def __getitem__(self, index):
+        # Indexing and slicing walk from the head too
+        if isinstance(index, slice):
+            return list(islice(self._colors, index.start, index.stop))
+        return next(islice(self._colors, index, None))
+
+    def new(self):
+        color = PaletteColor()
+        self._colors.append(color)
+        return color
+
+    def remove(self, color):
+        for index, candidate in enumerate(self._colors):
+            if candidate is color:
+                del self._colors[index]
+                return
+        raise ValueError("color not in palette")
+
+    def foreach_get(self, attr, seq):
+        flat = [channel for color in self._colors for channel in getattr(color, attr)]
+        if len(flat) != len(seq):
+            raise RuntimeError("internal error setting the array")
+        seq[:] = flat
+
+    def foreach_set(self, attr, seq):
+        for index, color in enumerate(self._colors):
+            setattr(color, attr, tuple(seq[index * 3:index * 3 + 3]))
+
+
+class Palette(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.colors = PaletteColors()
+
+
+# ---------------------------------------------------------------------------
+# Module layout
+# ---------------------------------------------------------------------------
+
+class _Base:
+    pass
+
+
+types = _types.ModuleType("bpy.types")
+for _name in ("PropertyGroup", "Operator", "Panel", "Menu", "UIList", "AddonPreferences"):
+    setattr(types, _name, type(_name, (_Base,), {}))
+
+
+class _UIListHelpers(_Base):
+    @staticmethod
+    def filter_items_by_name(pattern, bitflag, items, propname="name", flags=None, reverse=False):
+        return [bitflag] * len(items)
+
+    @staticmethod
+    def sort_items_by_name(items, propname="name"):
+        return list(range(len(items)))
+
+
+types.UI_UL_list = _UIListHelpers
+types.Scene = type("Scene", (_Base,), {"as_pointer": lambda self: id(self)})
+types.ID = ID
+types.Material = Material
+types.World = World
+types.NodeTree = NodeTree
+types.Palette = Palette
+
+props = _types.ModuleType("bpy.props")
+for _kind in ("StringProperty", "BoolProperty", "IntProperty", "FloatProperty",
+              "FloatVectorProperty", "EnumProperty", "CollectionProperty", "PointerProperty"):
+    setattr(props, _kind, _property_factory(_kind))
+
+utils = _types.ModuleType("bpy.utils")
+utils.register_class = lambda cls: None
+utils.unregister_class = lambda cls: None
+
+app = _types.ModuleType("bpy.app")
+handlers = _types.ModuleType("bpy.app.handlers")
+handlers.persistent = lambda func: func
+for _name in ("load_post", "undo_post", "redo_post", "depsgraph_update_post"):
+    setattr(handlers, _name, [])
+app.handlers = handlers
+
+
+class _Timers:
+    def __init__(self):
+        self._registered = {}
+
+    def register(self, function, first_interval=0.0, persistent=False):
+        self._registered[function] = first_interval
+
+    def unregister(self, function):
+        self._registered.pop(function, None)
+
+    def is_registered(self, function):
+        return function in self._registered
+
+
+app.timers = _Timers()
+
+data = _types.SimpleNamespace(
+    materials=IDCollection(Material),
+    palettes=IDCollection(Palette),
+    worlds=IDCollection(World),
+    node_groups=IDCollection(NodeTree),
+)
+
+
+def _paint_settings():
+    return _types.SimpleNamespace(palette=None)
+
+
+context = _types.SimpleNamespace(
+    scene=None,
+    tool_settings=_types.SimpleNamespace(
+        image_paint=_paint_settings(),
+        vertex_paint=_paint_settings(),
+        gpencil_paint=_paint_settings(),
+    ),
+)
+
+
+def reset():
+    """Start over with an empty file: fresh scene and no datablocks."""
+    for collection in vars(data).values():
+        collection.clear()
+    _group_nodes.clear()
+    context.scene = types.Scene()
+    for settings in vars(context.tool_settings).values():
+        settings.palette = None
+
+
+reset()
+
+__path__ = []
+sys.modules.update({
+    "bpy.types": types,
+    "bpy.props": props,
+    "bpy.utils": utils,
+    "bpy.app": app,
+    "bpy.app.handlers": handlers,
+})
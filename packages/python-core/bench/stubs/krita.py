@@ -0,0 +1,56 @@
+"""Headless stand-in for Krita's ``krita`` module, for benchmarks only."""
+
+from PyQt5.QtWidgets import QWidget
+
+
+class DockWidget(QWidget):
+    def setWindowTitle(self, _title):
+        pass
+
+    def setWidget(self, widget):
+        self._widget = widget
+
+
+class DockWidgetFactoryBase:
+    DockRight = "DockRight"
+
+
+class DockWidgetFactory:
+    def __init__(self, name, area, widget_class):
+        self.name = name
+        self.area = area
+        self.widget_class = widget_class
+
+
+class ManagedColor:
+    def __init__(self, model, depth, profile):
+        self._components = []
+
+    def setComponents(self, components):
+        self._components = list(components)
+
+
+class Krita:
+    _instance = None
+
+    def __init__(self):
+        self.dock_widget_factories = []
+        self._settings = {}
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def addDockWidgetFactory(self, factory):
+        self.dock_widget_factories.append(factory)
+
+    def readSetting(self, group, name, default):
+        return self._settings.get((group, name), default)
+
+    def writeSetting(self, group, name, value):
+        self._settings[(group, name)] = value
+
+    def activeWindow(self):
+        return None
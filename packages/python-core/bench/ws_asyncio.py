@@ -0,0 +1,339 @@
+"""Minimal asyncio WebSocket endpoints for the stand-in server and load client.
+
+RFC 6455 framing over plain TCP, with RFC 7692 permessage-deflate when
+both ends agree. Just enough to talk to the plugins' clients and to the
+real sync server: no TLS, no subprotocols, no extensions besides deflate.
+"""
+
+import asyncio
+import base64
+import hashlib
+import os
+import struct
+import zlib
+
+_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# RFC 7692: a compressed message is a raw DEFLATE stream whose final
+# empty stored block (these four bytes) is left off on the wire
+DEFLATE_TAIL = b"\x00\x00\xff\xff"
+
+# Messages smaller than this are sent uncompressed, like the sync server
+COMPRESSION_THRESHOLD = 1024
+
+# Largest message accepted, matching the sync server's maxPayload
+MAX_MESSAGE_SIZE = 10 * 1024 * 1024
+
+OP_CONT = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class ConnectionClosed(Exception):
+    """The peer closed the connection, cleanly or not."""
+
+
+class ProtocolError(Exception):
+    """The peer broke RFC 6455 or sent a message over the size limit."""
+
+
+def accept_key(key):
+    digest = hashlib.sha1((key + _GUID).encode("ascii")).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def parse_deflate_extension(header_value):
+    """Return the permessage-deflate parameters of an extension header, or None."""
+    for extension in header_value.split(","):
+        parts = [part.strip() for part in extension.split(";")]
+        if parts[0].lower() != "permessage-deflate":
+            continue
+        params = {}
+        for part in parts[1:]:
+            name, _, value = part.partition("=")
+            params[name.strip().lower()] = value.strip().strip('"')
+        return params
+    return None
+
+
+async def _read_head(reader):
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError) as exc:
+        raise ProtocolError("Incomplete HTTP head") from exc
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+class WebSocket:
+    """One open WebSocket connection.
+
+    ``recv()`` answers pings and reassembles fragmented messages;
+    ``send()`` can split a message into fragments and throttle the link.
+    """
+
+    def __init__(self, reader, writer, *, is_client, deflate=None,
+                 max_message_size=MAX_MESSAGE_SIZE):
+        self.reader = reader
+        self.writer = writer
+        self.is_client = is_client
+        # Negotiated permessage-deflate parameters, or None
+        self.deflate = deflate
+        self.max_message_size = max_message_size
+        self.closed = False
+        self.wire_bytes_in = 0
+        self.wire_bytes_out = 0
+        self._inflater = None
+        own, peer = ("client", "server") if is_client else ("server", "client")
+        self._reset_inflater = deflate is not None and f"{peer}_no_context_takeover" in deflate
+        self._window_bits = max(9, int((deflate or {}).get(f"{own}_max_window_bits") or 15))
+
+    @property
+    def buffered(self):
+        """Bytes written but not yet handed to the kernel."""
+        return self.writer.transport.get_write_buffer_size()
+
+    # -- receiving ---------------------------------------------------------
+
+    async def _read_frame(self):
+        try:
+            head = await self.reader.readexactly(2)
+            fin = head[0] & 0x80
+            rsv1 = head[0] & 0x40
+            opcode = head[0] & 0x0F
+            masked = head[1] & 0x80
+            length = head[1] & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", await self.reader.readexactly(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", await self.reader.readexactly(8))[0]
+            if length > self.max_message_size:
+                raise ProtocolError(f"Frame of {length} bytes is over the limit")
+            mask = await self.reader.readexactly(4) if masked else None
+            payload = await self.reader.readexactly(length)
+        except (asyncio.IncompleteReadError, ConnectionError) as exc:
+            self.closed = True
+            raise ConnectionClosed() from exc
+        self.wire_bytes_in += length + 2
+        if mask is not None:
+            payload = _apply_mask(payload, mask)
+        return bool(fin), bool(rsv1), opcode, payload
+
+    async def recv(self):
+        """Return the next text (str) or binary (bytes) message.
+
+        Raises ConnectionClosed once the peer closes the connection.
+        """
+        opcode = None
+        compressed = False
+        parts = []
+        size = 0
+        while True:
+            fin, rsv1, frame_opcode, payload = await self._read_frame()
+            if frame_opcode == OP_CLOSE:
+                await self.close()
+                raise ConnectionClosed()
+            if frame_opcode == OP_PING:
+                await self._write_frame(OP_PONG, payload)
+                continue
+            if frame_opcode == OP_PONG:
+                continue
+            if (frame_opcode == OP_CONT) != (opcode is not None):
+                raise ProtocolError("Unexpected fragment")
+            if opcode is None:
+                opcode = frame_opcode
+                compressed = rsv1 and self.deflate is not None
+            size += len(payload)
+            if size > self.max_message_size:
+                raise ProtocolError(f"Message over {self.max_message_size} bytes")
+            parts.append(payload)
+            if fin:
+                break
+
+        data = b"".join(parts)
+        if compressed:
+            if self._inflater is None:
+                self._inflater = zlib.decompressobj(-15)
+            data = self._inflater.decompress(data + DEFLATE_TAIL)
+            if self._reset_inflater:
+                self._inflater = None
+        return data.decode("utf-8") if opcode == OP_TEXT else data
+
+    # -- sending -----------------------------------------------------------
+
+    async def send(self, message, *, fragment_size=0, link_rate=0, wait=True):
+        """Send a text (str) or binary (bytes) message.
+
+        ``fragment_size`` splits the payload into continuation frames of at
+        most that many bytes. ``link_rate`` throttles the write to that many
+        bytes per second. With ``wait=False`` the frames are only buffered,
+        the way Node's ``ws.send`` does; otherwise the write buffer is
+        drained to the transport's high-water mark first.
+        """
+        opcode = OP_TEXT if isinstance(message, str) else OP_BINARY
+        payload = message.encode("utf-8") if opcode == OP_TEXT else message
+        compressed = self.deflate is not None and len(payload) >= COMPRESSION_THRESHOLD
+        if compressed:
+            # A fresh compressor per message keeps no context on our side,
+            # which every peer accepts
+            deflater = zlib.compressobj(6, zlib.DEFLATED, -self._window_bits)
+            payload = (deflater.compress(payload) + deflater.flush(zlib.Z_SYNC_FLUSH))[:-4]
+
+        if fragment_size <= 0 or len(payload) <= fragment_size:
+            chunks = [payload]
+        else:
+            chunks = [payload[i:i + fragment_size] for i in range(0, len(payload), fragment_size)]
+        last = len(chunks) - 1
+        for index, chunk in enumerate(chunks):
+            frame_opcode = opcode if index == 0 else OP_CONT
+            frame = _build_frame(frame_opcode, chunk, index == last,
+                                 compressed and index == 0, self.is_client)
+            if link_rate > 0:
+                await self._trickle(frame, link_rate)
+            else:
+                self._write(frame)
+        if wait and link_rate <= 0:
+            await self._drain()
+
+    async def ping(self, payload=b""):
+        await self._write_frame(OP_PING, payload)
+
+    async def close(self, code=1000):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._write(_build_frame(OP_CLOSE, struct.pack("!H", code), True, False, self.is_client))
+            await self._drain()
+            self.writer.close()
+        except ConnectionError:
+            pass
+
+    def abort(self):
+        """Drop the TCP connection without a close frame."""
+        self.closed = True
+        self.writer.transport.abort()
+
+    async def _write_frame(self, opcode, payload):
+        self._write(_build_frame(opcode, payload, True, False, self.is_client))
+        await self._drain()
+
+    def _write(self, frame):
+        if self.writer.is_closing():
+            raise ConnectionClosed()
+        self.writer.write(frame)
+        self.wire_bytes_out += len(frame)
+
+    async def _drain(self):
+        try:
+            await self.writer.drain()
+        except ConnectionError as exc:
+            self.closed = True
+            raise ConnectionClosed() from exc
+
+    async def _trickle(self, frame, link_rate):
+        step = max(1, min(len(frame), link_rate // 20))
+        for start in range(0, len(frame), step):
+            chunk = frame[start:start + step]
+            self._write(chunk)
+            await self._drain()
+            await asyncio.sleep(len(chunk) / link_rate)
+
+
+def _apply_mask(payload, mask):
+    # XOR through big integers; far faster than a per-byte loop in Python
+    length = len(payload)
+    repeated = (mask * (length // 4 + 1))[:length]
+    masked = int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")
+    return masked.to_bytes(length, "big")
+
+
+def _build_frame(opcode, payload, fin, rsv1, masked):
+    length = len(payload)
+    first = (0x80 if fin else 0) | (0x40 if rsv1 else 0) | opcode
+    mask_bit = 0x80 if masked else 0
+    if length < 126:
+        head = struct.pack("!BB", first, mask_bit | length)
+    elif length < 65536:
+        head = struct.pack("!BBH", first, mask_bit | 126, length)
+    else:
+        head = struct.pack("!BBQ", first, mask_bit | 127, length)
+    if not masked:
+        return head + payload
+    mask = os.urandom(4)
+    return head + mask + _apply_mask(payload, mask)
+
+
+# ---------------------------------------------------------------------------
+# Handshakes
+# ---------------------------------------------------------------------------
+
+async def accept(reader, writer, *, deflate=True, max_message_size=MAX_MESSAGE_SIZE):
+    """Answer a client's opening handshake and return the WebSocket."""
+    request_line, headers = await _read_head(reader)
+    key = headers.get("sec-websocket-key")
+    if not request_line.startswith("GET ") or "websocket" not in headers.get("upgrade", "").lower() \
+            or not key:
+        writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+        writer.close()
+        raise ProtocolError("Not a WebSocket upgrade request")
+
+    response = [
+        "HTTP/1.1 101 Switching Protocols",
+        "Upgrade: websocket",
+        "Connection: Upgrade",
+        f"Sec-WebSocket-Accept: {accept_key(key)}",
+    ]
+    params = None
+    offered = parse_deflate_extension(headers.get("sec-websocket-extensions", ""))
+    if deflate and offered is not None:
+        # Neither side keeps context between messages: simplest to honour
+        # and what the Krita client already supports
+        params = {"server_no_context_takeover": "", "client_no_context_takeover": ""}
+        response.append("Sec-WebSocket-Extensions: permessage-deflate; "
+                        "server_no_context_takeover; client_no_context_takeover")
+    writer.write(("\r\n".join(response) + "\r\n\r\n").encode("ascii"))
+    await writer.drain()
+    return WebSocket(reader, writer, is_client=False, deflate=params,
+                     max_message_size=max_message_size)
+
+
+async def connect(url, *, deflate=True, max_message_size=MAX_MESSAGE_SIZE):
+    """Open a ``ws://`` connection and return the WebSocket."""
+    if not url.startswith("ws://"):
+        raise ValueError(f"Only ws:// URLs are supported: {url!r}")
+    host_port, _, path = url[5:].partition("/")
+    host, _, port = host_port.rpartition(":")
+    if not host:
+        host, port = host_port, "80"
+    reader, writer = await asyncio.open_connection(host, int(port), limit=2 ** 20)
+
+    key = base64.b64encode(os.urandom(16)).decode("ascii")
+    request = [
+        f"GET /{path} HTTP/1.1",
+        f"Host: {host_port}",
+        "Upgrade: websocket",
+        "Connection: Upgrade",
+        f"Sec-WebSocket-Key: {key}",
+        "Sec-WebSocket-Version: 13",
+    ]
+    if deflate:
+        request.append("Sec-WebSocket-Extensions: permessage-deflate; client_max_window_bits")
+    writer.write(("\r\n".join(request) + "\r\n\r\n").encode("ascii"))
+    await writer.drain()
+
+    status_line, headers = await _read_head(reader)
+    if " 101 " not in status_line + " " or headers.get("sec-websocket-accept") != accept_key(key):
+        writer.close()
+        raise ProtocolError(f"Handshake failed: {status_line}")
+    params = parse_deflate_extension(headers.get("sec-websocket-extensions", ""))
+    return WebSocket(reader, writer, is_client=True, deflate=params,
+                     max_message_size=max_message_size)
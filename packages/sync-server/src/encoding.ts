@@ -0,0 +1,68 @@
+import type { TokenSyncPayload } from 'token-beam';
+
+/**
+ * Columnar binary layout for syncs, offered to target clients that list it
+ * in the `encodings` of their `pair` message. The Python plugins decode it
+ * without tokenizing JSON; the layout is documented next to their decoder
+ * in packages/python-core/token_beam_core.py.
+ */
+export const BINARY_ENCODING = 'columnar-1';
+
+/** Encodings the server can send syncs in besides JSON. */
+export const SUPPORTED_ENCODINGS: readonly string[] = [BINARY_ENCODING];
+
+const BINARY_MAGIC = Buffer.from('TBC1', 'latin1');
+const TOKEN_TYPE_CODES: Record<string, number> = { color: 0, number: 1, string: 2, boolean: 3 };
+
+/** Pick the first of a client's advertised encodings the server supports. */
+export function negotiateEncoding(encodings: unknown): string | undefined {
+  if (!Array.isArray(encodings)) return undefined;
+  return encodings.find(
+    (encoding): encoding is string =>
+      typeof encoding === 'string' && SUPPORTED_ENCODINGS.includes(encoding),
+  );
+}
+
+/**
+ * Encode a sync in the columnar layout. `fields` is the envelope without
+ * `payload`. Returns null if a string contains a NUL, which the layout
+ * uses as its separator; send JSON instead.
+ */
+export function encodeBinarySync(
+  fields: Record<string, unknown>,
+  payload: TokenSyncPayload,
+): Buffer | null {
+  const counts: number[] = [payload.collections.length];
+  const strings: string[] = [];
+  const types: number[] = [];
+
+  for (const collection of payload.collections) {
+    counts.push(collection.modes.length);
+    strings.push(collection.name);
+    for (const mode of collection.modes) {
+      counts.push(mode.tokens.length);
+      strings.push(mode.name);
+      for (const token of mode.tokens) strings.push(token.name);
+      for (const token of mode.tokens) {
+        strings.push(typeof token.value === 'string' ? token.value : JSON.stringify(token.value));
+        types.push(TOKEN_TYPE_CODES[token.type]);
+      }
+    }
+  }
+  if (strings.some((value) => value.includes('\0'))) return null;
+
+  const header = Buffer.from(JSON.stringify(fields), 'utf8');
+  const blob = Buffer.from(strings.join('\0'), 'utf8');
+  const out = Buffer.allocUnsafe(
+    BINARY_MAGIC.length + 4 + header.length + 4 + 4 * counts.length + 4 + blob.length + types.length,
+  );
+  let offset = BINARY_MAGIC.copy(out, 0);
+  offset = out.writeUInt32LE(header.length, offset);
+  offset += header.copy(out, offset);
+  offset = out.writeUInt32LE(counts.length, offset);
+  for (const count of counts) offset = out.writeUInt32LE(count, offset);
+  offset = out.writeUInt32LE(blob.length, offset);
+  offset += blob.copy(out, offset);
+  Buffer.from(types).copy(out, offset);
+  return out;
+}
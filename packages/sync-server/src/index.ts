@@ -1,3 +1,4 @@
 export { TokenSyncServer } from './server.js';
 export type { SyncSession } from './server.js';
 export type { SyncMessage, SyncIcon } from 'token-beam';
+export { BINARY_ENCODING, encodeBinarySync } from './encoding.js';
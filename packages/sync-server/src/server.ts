@@ -3,14 +3,15 @@ import type { IncomingMessage } from 'http';
 import { createServer, type Server as HTTPServer } from 'http';
 import { randomBytes } from 'crypto';
 import { pluginLinks, validateTokenPayload } from 'token-beam';
-import type { SyncMessage, SyncIcon } from 'token-beam';
+import type { SyncMessage, SyncIcon, TokenSyncPayload } from 'token-beam';
+import { BINARY_ENCODING, encodeBinarySync, negotiateEncoding } from './encoding.js';
 
 export interface SyncSession {
   id: string;
   token: string;
   sourceClient?: WebSocket;
   sourceClientType?: string;
-  targetClients: Array<{ ws: WebSocket; type: string; origin?: string }>;
+  targetClients: Array<{ ws: WebSocket; type: string; origin?: string; encoding?: string }>;
   sourceOrigin?: string;
   sourceIcon?: SyncIcon;
   createdAt: Date;
@@ -30,6 +31,9 @@ export class TokenSyncServer {
   private readonly MAX_SESSIONS = 1000;
   private readonly MAX_TARGETS_PER_SESSION = 10;
   private readonly MAX_SVG_SIZE_BEFORE_SANITIZE = 20 * 1024; // 20KB - reject before running regexes
+  // permessage-deflate (RFC 7692): token JSON compresses 10–20x, but tiny
+  // control messages (pair/ping/errors) are not worth the zlib round trip
+  private readonly COMPRESSION_THRESHOLD = 1024; // bytes
   // Rate limiting: relaxed to keep real-time feel
   private readonly RATE_LIMIT_WINDOW = 1000; // 1 second window
   private readonly RATE_LIMIT_MAX_MESSAGES = 500; // 500 msgs/sec — generous for real-time
@@ -79,6 +83,12 @@ export class TokenSyncServer {
     this.wss = new WebSocketServer({
       server: this.httpServer,
       maxPayload: this.MAX_PAYLOAD_SIZE,
+      perMessageDeflate: {
+        threshold: this.COMPRESSION_THRESHOLD,
+        zlibDeflateOptions: { level: 6 },
+        // Limits concurrent zlib work so a sync storm can't pin the event loop
+        concurrencyLimit: 10,
+      },
       verifyClient: (info: { origin: string; req: IncomingMessage }, cb) => {
         // Check HTTP Origin header (set by browser, harder to fake)
         const origin = info.origin || info.req.headers.origin;
@@ -314,11 +324,14 @@ export class TokenSyncServer {
         return;
       }
 
-      // Add to target clients
+      // Add to target clients; syncs go out as JSON unless the client
+      // advertised an encoding the server supports
+      const encoding = negotiateEncoding(message.encodings);
       session.targetClients.push({
         ws,
         type: clientType,
         origin: message.origin,
+        encoding,
       });
       this.clientToSessionId.set(ws, session.id);
       session.lastActivity = new Date();
@@ -330,6 +343,7 @@ export class TokenSyncServer {
         clientType,
         origin: session.sourceOrigin,
         icon: session.sourceIcon,
+        encoding,
       });
 
       // Notify source client that a new target connected
@@ -371,14 +385,14 @@ export class TokenSyncServer {
         return;
       }
 
-      // Broadcast to all target clients
+      // Broadcast to all target clients, encoding the sync once per format
+      const frames = new Map<string, string | Buffer>();
       let sentCount = 0;
       for (const target of session.targetClients) {
         if (target.ws.readyState === WebSocket.OPEN) {
-          this.send(target.ws, {
-            type: 'sync',
-            payload: message.payload,
-          });
+          target.ws.send(
+            this.encodeSync(frames, target.encoding ?? 'json', message.payload, validation.data),
+          );
           sentCount++;
         }
       }
@@ -499,6 +513,23 @@ export class TokenSyncServer {
     }
   }
 
+  /** Serialize a sync for `encoding`, reusing a frame already built for it. */
+  private encodeSync(
+    frames: Map<string, string | Buffer>,
+    encoding: string,
+    raw: unknown,
+    payload: TokenSyncPayload,
+  ): string | Buffer {
+    let frame = frames.get(encoding);
+    if (frame === undefined) {
+      frame =
+        (encoding === BINARY_ENCODING && encodeBinarySync({ type: 'sync' }, payload)) ||
+        JSON.stringify({ type: 'sync', payload: raw });
+      frames.set(encoding, frame);
+    }
+    return frame;
+  }
+
   private sendError(ws: WebSocket, error: string) {
     this.send(ws, { type: 'error', error });
   }